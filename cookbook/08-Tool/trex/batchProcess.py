@@ -0,0 +1,33 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import argparse
+from trex.batch import batch_process
+
+parser = argparse.ArgumentParser(description="Lint and summarize all the engines under a directory tree.")
+parser.add_argument("root_dir", help="directory tree of engine JSON files (<prefix>graph.json, <prefix>profile.json, ...)")
+parser.add_argument("-o", "--output-dir", default="./batch", help="directory of the consolidated report (default: ./batch)")
+parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+parser.add_argument("--cache-dir", default=None, help="plan cache directory")
+parser.add_argument("--linters", nargs="+", default=None, help="linters to run (default: all)")
+parser.add_argument("--force", action="store_true", help="process all the engines, even if their files did not change")
+args = parser.parse_args()
+
+report = batch_process(args.root_dir, args.output_dir, max_workers=args.jobs, cache_dir=args.cache_dir, linters=args.linters, force=args.force)
+print("\nSucceeded processing %d engines (%d processed, %d unchanged, %d failed)\n\t%s" % (len(report.summary), len(report.processed), len(report.skipped), len(report.failed), args.output_dir))
+for name in report.failed:
+    print("Failed processing %s" % name)
@@ -0,0 +1,283 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Build and profile a set of ONNX models with a set of build configurations.
+
+Each (model, configuration) job runs the same trtexec build and profile
+stages as mainProcess.py, and writes its artifacts to its own directory:
+    <output_dir>/<model name>/<configuration name>/
+
+A stage which completes writes a stamp file with the hash of its inputs
+(input files and command line). A stage is skipped if its stamp matches its
+current inputs and its outputs exist, so an interrupted pipeline resumes
+with the stages which did not complete.
+
+Jobs build concurrently, but a job profiles only while no other job builds,
+so that the measured latencies are not skewed by the builds.
+
+Example:
+    python buildPipeline.py model/a.onnx model/b.onnx -o ./jobs -j 4 \\
+        --config fp16="--fp16" --config int8="--int8 --fp16"
+"""
+
+import os
+import sys
+import json
+import shlex
+import argparse
+import hashlib
+import threading
+import subprocess
+import traceback
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+from parseTrtexecLog import parse_build_log, parse_profiling_log, parse_tactic_timings, parse_build_timeline
+
+BUILD_FLAGS = ["--verbose", "--profilingVerbosity=detailed", "--buildOnly", "--workspace=4096"]
+PROFILE_FLAGS = ["--verbose", "--profilingVerbosity=detailed", "--noDataTransfers", "--useCudaGraph", "--separateProfileRun", "--useSpinWait"]
+
+class BuildConfig(NamedTuple):
+    """A named set of trtexec build flags (e.g. precision and shapes)"""
+    name: str
+    flags: List[str]
+
+class Job(NamedTuple):
+    model: str
+    config: BuildConfig
+    job_dir: str
+
+class JobResult(NamedTuple):
+    model: str
+    config: str
+    job_dir: str
+    ran: List[str]
+    skipped: List[str]
+    error: Optional[str]
+
+class Stage(NamedTuple):
+    name: str
+    inputs: List[str]
+    cmd_line: List[str]
+    log_file: str
+    outputs: List[str]
+
+class StageLock:
+    """Schedule the stages of concurrent jobs.
+
+    Any number of jobs build at the same time, but never while a job
+    profiles, and at most `max_profilers` jobs profile at the same time.
+    Waiting profiling runs have priority over new builds, so that they are
+    not starved by a long queue of builds.
+    """
+
+    def __init__(self, max_profilers: int = 1):
+        self.max_profilers = max_profilers
+        self.condition = threading.Condition()
+        self.builds = 0
+        self.profiles = 0
+        self.waiting_profiles = 0
+
+    @contextlib.contextmanager
+    def build(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.profiles == 0 and self.waiting_profiles == 0)
+            self.builds += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.builds -= 1
+                self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def profile(self):
+        with self.condition:
+            self.waiting_profiles += 1
+            self.condition.wait_for(lambda: self.builds == 0 and self.profiles < self.max_profilers)
+            self.waiting_profiles -= 1
+            self.profiles += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.profiles -= 1
+                self.condition.notify_all()
+
+def parse_config(spec: str) -> BuildConfig:
+    """Parse a NAME=FLAGS configuration (e.g. 'int8=--int8 --fp16')"""
+    name, _, flags = spec.partition("=")
+    if not name:
+        raise ValueError(f"Invalid build configuration: {spec}")
+    return BuildConfig(name, shlex.split(flags))
+
+def model_name(model: str) -> str:
+    return os.path.splitext(os.path.basename(model))[0]
+
+def create_jobs(models: List[str], configs: List[BuildConfig], output_dir: str) -> List[Job]:
+    """Create one job per (model, configuration) pair"""
+    names = [model_name(model) for model in models]
+    if len(set(names)) != len(names):
+        # Disambiguate models which have the same file name.
+        names = [f"{name}_{i}" for i, name in enumerate(names)]
+    return [Job(model, config, os.path.join(output_dir, name, config.name)) for model, name in zip(models, names) for config in configs]
+
+def job_files(job_dir: str) -> Dict[str, str]:
+    """The artifacts of a job (same names as in mainProcess.py)"""
+    names = {
+        "engine": "model.plan",
+        "build_log": "build.log",
+        "build_metadata": "build.metadata.json",
+        "build_tactics": "build.tactics.json",
+        "build_timeline": "build.timeline.json",
+        "timing_cache": "build.timingCache.cache",
+        "profile_log": "profile.log",
+        "profile": "profile.json",
+        "profile_metadata": "profile.metadata.json",
+        "profile_timing": "profile.timing.json",
+        "graph": "graph.json",
+    }
+    return {key: os.path.join(job_dir, name) for key, name in names.items()}
+
+def job_stages(job: Job, trtexec: str) -> List[Stage]:
+    files = job_files(job.job_dir)
+    build = Stage(
+        "build",
+        [job.model],
+        [trtexec] + BUILD_FLAGS + job.config.flags + [f"--onnx={job.model}", f"--saveEngine={files['engine']}", f"--timingCacheFile={files['timing_cache']}"],
+        files["build_log"],
+        [files["engine"], files["build_metadata"], files["build_tactics"], files["build_timeline"]],
+    )
+    profile = Stage(
+        "profile",
+        [files["engine"]],
+        [trtexec] + PROFILE_FLAGS + [f"--loadEngine={files['engine']}", f"--exportProfile={files['profile']}", f"--exportTimes={files['profile_timing']}", f"--exportLayerInfo={files['graph']}"],
+        files["profile_log"],
+        [files["profile"], files["profile_timing"], files["graph"], files["profile_metadata"]],
+    )
+    return [build, profile]
+
+def stage_key(stage: Stage) -> str:
+    """Return a hash of the contents of the stage's input files and of its
+    command line (missing input files are hashed as empty)"""
+    h = hashlib.sha1(json.dumps(stage.cmd_line).encode())
+    for file_name in stage.inputs:
+        h.update(b"\0")
+        try:
+            with open(file_name, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except FileNotFoundError:
+            h.update(b"\0missing")
+    return h.hexdigest()
+
+def _stamp_file(job_dir: str, stage: Stage) -> str:
+    return os.path.join(job_dir, f"{stage.name}.done.json")
+
+def is_stage_done(job_dir: str, stage: Stage, key: str) -> bool:
+    try:
+        with open(_stamp_file(job_dir, stage)) as f:
+            stamp = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    return stamp.get("key") == key and all(os.path.exists(output) for output in stage.outputs)
+
+def _dump_json(obj, file_name: str):
+    # Write to a temporary file and rename, so that an interrupted job never
+    # leaves a partially-written file.
+    tmp_path = f"{file_name}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, file_name)
+
+def run_stage(job_dir: str, stage: Stage):
+    """Run trtexec and post-process its log"""
+    # Remove the stamp first: the stage is not done until it is rewritten.
+    try:
+        os.remove(_stamp_file(job_dir, stage))
+    except FileNotFoundError:
+        pass
+    key = stage_key(stage)
+    with open(stage.log_file, "w") as f:
+        subprocess.run(stage.cmd_line, check=True, stdout=f, stderr=subprocess.STDOUT, universal_newlines=True)
+    files = job_files(job_dir)
+    if stage.name == "build":
+        _dump_json(parse_build_log(stage.log_file), files["build_metadata"])
+        _dump_json(parse_tactic_timings(stage.log_file), files["build_tactics"])
+        _dump_json(parse_build_timeline(stage.log_file), files["build_timeline"])
+    else:
+        _dump_json(parse_profiling_log(stage.log_file), files["profile_metadata"])
+    _dump_json({"key": key, "cmd_line": stage.cmd_line}, _stamp_file(job_dir, stage))
+
+def run_job(job: Job, trtexec: str, stage_lock: StageLock, force: bool = False) -> JobResult:
+    """Run the stages of a job which are not done"""
+    os.makedirs(job.job_dir, exist_ok=True)
+    ran, skipped = [], []
+    try:
+        for stage in job_stages(job, trtexec):
+            if not force and is_stage_done(job.job_dir, stage, stage_key(stage)):
+                skipped.append(stage.name)
+                continue
+            # Concurrent builds or profiling runs would skew the profiled timings.
+            with (stage_lock.profile() if stage.name == "profile" else stage_lock.build()):
+                run_stage(job.job_dir, stage)
+            ran.append(stage.name)
+    except Exception:
+        return JobResult(job.model, job.config.name, job.job_dir, ran, skipped, traceback.format_exc())
+    return JobResult(job.model, job.config.name, job.job_dir, ran, skipped, None)
+
+def run_pipeline(
+    models: List[str],
+    configs: List[BuildConfig],
+    output_dir: str,
+    trtexec: str = "trtexec",
+    max_workers: int = 1,
+    max_profile_workers: int = 1,
+    force: bool = False,
+) -> List[JobResult]:
+    """Run all the (model, configuration) jobs in a pool of `max_workers`
+    workers. No job builds while a job profiles, and at most
+    `max_profile_workers` jobs profile at the same time (see `StageLock`).
+
+    The workers only wait for trtexec, so they are threads.
+    """
+    jobs = create_jobs(models, configs, output_dir)
+    stage_lock = StageLock(max_profile_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda job: run_job(job, trtexec, stage_lock, force), jobs))
+    _dump_json([result._asdict() for result in results], os.path.join(output_dir, "pipeline.results.json"))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and profile ONNX models with several build configurations.")
+    parser.add_argument("models", nargs="+", help="ONNX model files")
+    parser.add_argument("-o", "--output-dir", default="./jobs", help="directory of the jobs' artifacts (default: ./jobs)")
+    parser.add_argument("-c", "--config", action="append", type=parse_config, help="build configuration NAME=FLAGS (default: fp16=--fp16); may be repeated")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of concurrent jobs (default: 1)")
+    parser.add_argument("--profile-jobs", type=int, default=1, help="number of concurrent profiling runs (default: 1); builds never run during profiling")
+    parser.add_argument("--trtexec", default=os.environ.get("TRTEXEC", "trtexec"), help="trtexec executable (default: $TRTEXEC or trtexec)")
+    parser.add_argument("--force", action="store_true", help="run all the stages, even if they are done")
+    args = parser.parse_args()
+
+    configs = args.config or [parse_config("fp16=--fp16")]
+    results = run_pipeline(args.models, configs, args.output_dir, args.trtexec, args.jobs, args.profile_jobs, args.force)
+    for result in results:
+        status = "failed" if result.error else "ran " + (", ".join(result.ran) or "nothing")
+        print("%s [%s]: %s\n\t%s" % (result.model, result.config, status, result.job_dir))
+        if result.error:
+            print(result.error)
+    sys.exit(1 if any(result.error for result in results) else 0)
@@ -16,7 +16,7 @@
 #
 
 import json
-from parseTrtexecLog import parse_build_log, parse_profiling_log
+from parseTrtexecLog import parse_build_log, parse_profiling_log, parse_tactic_timings, parse_build_timeline
 import subprocess
 from trex import EnginePlan, layer_type_formatter, to_dot, render_dot
 
@@ -25,6 +25,8 @@ trtFile = "./model/model.plan"
 # build
 buildLogfile = "./model/build.log"
 buildMetadataJsonFile = "./model/build.metadata.json"
+buildTacticsJsonFile = "./model/build.tactics.json"
+buildTimelineJsonFile = "./model/build.timeline.json"
 buildTimingCacheFile = "./model/build.timingCache.cache"
 # profile
 profileLogFile = "./model/profile.log"
@@ -44,7 +46,13 @@ with open(buildLogfile, "w") as f:
 with open(buildMetadataJsonFile, "w") as f:
     json.dump(parse_build_log(buildLogfile), f)
 
-print("\nSucceeded building engine\n\t%s\n\t%s\n\t%s" % (buildLogfile, buildTimingCacheFile, buildMetadataJsonFile))
+with open(buildTacticsJsonFile, "w") as f:
+    json.dump(parse_tactic_timings(buildLogfile), f)
+
+with open(buildTimelineJsonFile, "w") as f:
+    json.dump(parse_build_timeline(buildLogfile), f)
+
+print("\nSucceeded building engine\n\t%s\n\t%s\n\t%s\n\t%s\n\t%s" % (buildLogfile, buildTimingCacheFile, buildMetadataJsonFile, buildTacticsJsonFile, buildTimelineJsonFile))
 
 # profile engine ---------------------------------------------------------------
 cmd_line = "trtexec --verbose --profilingVerbosity=detailed --noDataTransfers --useCudaGraph --separateProfileRun --useSpinWait --loadEngine=%s --exportProfile=%s --exportTimes=%s --exportLayerInfo=%s" % \
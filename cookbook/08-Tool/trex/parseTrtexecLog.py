@@ -21,13 +21,21 @@ trtexec log file parsing
 import json
 from pickle import BUILD
 import re
-from typing import Tuple, List, Dict, Any
+import os
+import mmap
+import datetime
+import contextlib
+from typing import Tuple, List, Dict, Any, Iterator
 from enum import Enum, unique
 
+# https://docs.python.org/3/library/re.html#simulating-scanf
+_FLOAT_RE = re.compile(r"[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?")
+# The prefix of an info log line: [mm/dd/yyyy-hh:mm:ss] [I]
+_INFO_PREFIX_RE = re.compile(r'(\[\d+/\d+/\d+-\d+:\d+:\d+\] \[I\] )')
+
 def __to_float(line: str) -> float:
     """Scan the input string and extract the first float instance."""
-    # https://docs.python.org/3/library/re.html#simulating-scanf
-    float_match = re.search(r"[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?", line)
+    float_match = _FLOAT_RE.search(line)
     if float_match is None:
         raise ValueError
     start, end = float_match.span()
@@ -47,10 +55,11 @@ class FileSection:
 
     def __init__(self, section_header: str):
         self.section_header = section_header
+        self.header_re = re.compile(section_header)
         self.dict = {}
 
     def entered_section(self, line: str):
-        s = re.search(self.section_header, line)
+        s = self.header_re.search(line)
         return s is not None
 
     def parse_line(self, line: str):
@@ -60,7 +69,7 @@ class FileSection:
 
             The log line has this format: [mm/dd/yyyy-hh:mm:ss] [I] key_name: key_value
             """
-            match = re.search(r'(\[\d+/\d+/\d+-\d+:\d+:\d+\] \[I\] )', line)
+            match = _INFO_PREFIX_RE.search(line)
             if match is not None:
                 match_end = match.span()[1]
                 kv_line = line[match_end:].strip()
@@ -75,21 +84,210 @@ class FileSection:
             return True
         return False
 
+@contextlib.contextmanager
+def map_log_file(file_name: str) -> Iterator[bytes]:
+    """Memory-map a log file for reading (an empty file maps to b"").
+
+    The mapping is closed when the context exits, including on errors.
+    """
+    with open(file_name, "rb") as file:
+        try:
+            log = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            log = b""
+    try:
+        yield log
+    finally:
+        if isinstance(log, mmap.mmap):
+            log.close()
+
+def next_line(log: bytes, pos: int) -> int:
+    """Return the offset of the line following the line at offset `pos`."""
+    end = log.find(b"\n", pos)
+    return len(log) if end == -1 else end + 1
+
+def _combined_headers_re(headers: List[str]):
+    """Combine several section-header patterns into one bytes regular expression.
+
+    Each header is matched by a group named s<index>. The literal prefix shared
+    by all the headers is factored out of the alternation, which lets the regex
+    engine scan for that prefix quickly.
+    """
+    prefix = os.path.commonprefix(headers)
+    for i, c in enumerate(prefix):
+        if c in ".^$*+?{}[]\\|()":
+            prefix = prefix[:i]
+            break
+    alternation = "|".join(f"(?P<s{i}>{header[len(prefix):]})" for i, header in enumerate(headers))
+    return re.compile(f"{re.escape(prefix)}(?:{alternation})".encode())
+
 def __parse_log_file(file_name: str, sections: List) -> List[Dict]:
-    current_section = None
-    with open(file_name, "r") as file:
-        for line in file.readlines():
-            if current_section is None:
-                for section in sections:
-                    if section.entered_section(line):
-                        current_section = section
-                        break
-            else:
-                if not current_section.parse_line(line):
-                    current_section = None
+    """Parse the sections of a log file in a single pass.
+
+    The log is memory-mapped and searched for the next section header with one
+    combined regular expression, so lines outside of the sections (e.g. the
+    verbose log lines) are skipped without decoding them.
+    """
+    header_re = _combined_headers_re([section.section_header for section in sections])
+    with map_log_file(file_name) as log:
+        pos = 0
+        while True:
+            header = header_re.search(log, pos)
+            if header is None:
+                break
+            section = sections[int(header.lastgroup[1:])]
+            pos = next_line(log, header.end())
+            while pos < len(log):
+                end = next_line(log, pos)
+                if not section.parse_line(log[pos:end].decode(errors="replace")):
+                    # This line may be the header of the next section.
+                    break
+                pos = end
     dicts = [section.dict for section in sections]
     return dicts
 
+# Verbose builder log lines that report the timing of tactics.
+_TACTIC_TIMING_RE = re.compile(rb"\[TRT\] (?:"
+                               rb"=+ Computing costs for (?P<layer>[^\r\n]*)"
+                               rb"|\*+ Autotuning format combination: (?P<formats>[^\r\n]*?) \*+"
+                               rb"|-+ Timing Runner: [^\r\n]* \((?P<runner>[^()\r\n]*)\)"
+                               # TensorRT 8.4+ reports the name, id and time of a tactic on one line.
+                               rb"|(?:[^\r\n]* Set )?Tactic Name: (?P<tactic_name>\S+) Tactic: (?P<named_tactic>\S+)(?: Time: (?P<named_time>[-+0-9.eE]+))?"
+                               rb"|Tactic: (?P<tactic>\S+) Time: (?P<time>[-+0-9.eE]+)"
+                               rb"|Fastest Tactic: (?P<fastest>\S+) Time: (?P<fastest_time>[-+0-9.eE]+)"
+                               rb"|>+ Chose Runner Type: (?P<chosen_runner>\S+) Tactic: (?P<chosen>\S+)"
+                               rb")")
+
+def parse_tactic_timings(file_name: str) -> Dict[str, List]:
+    """Parse a verbose TensorRT engine build log and extract the timing of tactics.
+
+    Returns a dictionary of columns, with one row per timed tactic:
+    layer, runner, format combination, tactic id and name, measured time (ms),
+    whether the tactic was the fastest of its runner, and whether it was chosen
+    for its format combination.
+    Tactics which failed to run are reported with a huge time (FLT_MAX).
+    """
+    columns = ("layer", "runner", "format_combination", "tactic", "tactic_name", "time", "fastest", "chosen")
+    timings = {col: [] for col in columns}
+    layer = formats = runner = None
+    tactic_names = {}
+    # The first rows of the current runner and format combination.
+    runner_start = formats_start = 0
+
+    def mark(flag: str, start: int, tactic: str, runner_type: str = None):
+        for i in range(start, len(timings["tactic"])):
+            if timings["tactic"][i] == tactic and (runner_type is None or timings["runner"][i] == runner_type):
+                timings[flag][i] = True
+
+    with map_log_file(file_name) as log:
+        for match in _TACTIC_TIMING_RE.finditer(log):
+            kind = match.lastgroup
+            if kind == "layer":
+                layer = match.group("layer").decode(errors="replace")
+            elif kind == "formats":
+                formats = match.group("formats").decode(errors="replace")
+                formats_start = len(timings["tactic"])
+            elif kind == "runner":
+                runner = match.group("runner").decode(errors="replace")
+                runner_start = len(timings["tactic"])
+                tactic_names = {}
+            elif kind == "named_tactic":
+                tactic_names[match.group("named_tactic").decode()] = match.group("tactic_name").decode(errors="replace")
+            elif kind in ("time", "named_time"):
+                if kind == "named_time":
+                    tactic, tactic_name, time = match.group("named_tactic").decode(), match.group("tactic_name").decode(errors="replace"), match.group("named_time")
+                else:
+                    tactic, time = match.group("tactic").decode(), match.group("time")
+                    tactic_name = tactic_names.get(tactic)
+                try:
+                    time = float(time)
+                except ValueError:
+                    continue
+                for col, value in zip(columns, (layer, runner, formats, tactic, tactic_name, time, False, False)):
+                    timings[col].append(value)
+            elif kind == "fastest_time":
+                mark("fastest", runner_start, match.group("fastest").decode())
+            elif kind == "chosen":
+                mark("chosen", formats_start, match.group("chosen").decode(), match.group("chosen_runner").decode())
+    return timings
+
+_TIMESTAMP_RE = re.compile(rb"\[(\d+/\d+/\d+-\d+:\d+:\d+)\] ")
+
+# Builder log lines which start a new build activity. Each group name is
+# mapped to the activity category in _BUILD_EVENT_CATEGORIES.
+_BUILD_EVENT_RE = re.compile(rb"\[TRT\] (?:"
+                             rb"=+ Computing costs for (?P<layer>[^\r\n]*)"
+                             rb"|Running: (?P<fusion>\S+) on "
+                             rb"|Weights \[name=(?P<weights>[^\r\n]*?)\] had the following issues when converted to "
+                             rb"|(?P<optimization>Applying generic optimizations|After [^\r\n]*)"
+                             rb"|(?P<phase>[A-Z][a-z]+(?: [a-z]+)*) completed in (?P<seconds>[0-9.]+) seconds"
+                             rb")")
+_BUILD_EVENT_CATEGORIES = {
+    "layer": "tactic timing",
+    "fusion": "fusion",
+    "weights": "weight conversion",
+    "optimization": "graph optimization",
+    "phase": "other",
+}
+
+def parse_build_timeline(file_name: str) -> Dict[str, List]:
+    """Parse a verbose TensorRT engine build log and extract a timeline of the
+    build activities.
+
+    Returns a dictionary of columns, with one row per event which starts an
+    activity: timestamp (seconds), category (e.g. "tactic timing", "fusion",
+    "graph optimization"), and name (e.g. layer or fusion pass name).
+    Log lines which report the duration of a build phase ("... completed in
+    X seconds") also set the reported duration (seconds).
+    TensorRT does not log the conversion of every weights tensor, only the
+    conversions which have issues (e.g. FP16 subnormal or clamped values),
+    so "weight conversion" events appear only for these weights, and their
+    wall time runs until the next event.
+    The first row ("setup") starts at the first log line, and the last row
+    ("end") marks the last log line.
+    Log timestamps have a resolution of one second.
+    """
+    columns = ("timestamp", "category", "name", "reported_seconds")
+    timeline = {col: [] for col in columns}
+    timestamps = {}
+
+    def to_seconds(timestamp: bytes) -> float:
+        try:
+            return timestamps[timestamp]
+        except KeyError:
+            dt = datetime.datetime.strptime(timestamp.decode(), "%m/%d/%Y-%H:%M:%S")
+            seconds = (dt - datetime.datetime(1970, 1, 1)).total_seconds()
+            timestamps[timestamp] = seconds
+            return seconds
+
+    def add_event(timestamp: bytes, category: str, name: str, reported_seconds: float = None):
+        for col, value in zip(columns, (to_seconds(timestamp), category, name, reported_seconds)):
+            timeline[col].append(value)
+
+    with map_log_file(file_name) as log:
+        first = _TIMESTAMP_RE.search(log)
+        if first is not None:
+            add_event(first.group(1), "setup", "setup")
+            for match in _BUILD_EVENT_RE.finditer(log):
+                kind = match.lastgroup if match.lastgroup != "seconds" else "phase"
+                name = match.group(kind).decode(errors="replace")
+                reported_seconds = float(match.group("seconds")) if kind == "phase" else None
+                timestamp = _TIMESTAMP_RE.match(log, log.rfind(b"\n", 0, match.start()) + 1)
+                if timestamp is not None:
+                    add_event(timestamp.group(1), _BUILD_EVENT_CATEGORIES[kind], name, reported_seconds)
+            # The timestamp of the last log line (searching backwards from the
+            # end, in case the log ends with lines without timestamps).
+            last, end = None, len(log)
+            while last is None:
+                start = max(first.start(), end - (1 << 16))
+                for last in _TIMESTAMP_RE.finditer(log, start, end):
+                    pass
+                # Overlap the chunks, so that timestamps across chunks are found.
+                end = start + 64
+            add_event(last.group(1), "end", "end")
+    return timeline
+
 def parse_build_log(file_name: str) -> List[Dict]:
     """Parse the TensorRT engine build log and extract the builder configuration.
 
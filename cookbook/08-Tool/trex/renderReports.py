@@ -0,0 +1,36 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import argparse
+from trex.headless_report import render_reports, REPORT_SECTIONS
+
+parser = argparse.ArgumentParser(description="Render a static report of each engine under a directory tree (no Jupyter required).")
+parser.add_argument("root_dir", help="directory tree of engine JSON files (<prefix>graph.json, <prefix>profile.json, ...)")
+parser.add_argument("-o", "--output-dir", default="./reports", help="directory of the reports (default: ./reports)")
+parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+parser.add_argument("--format", choices=["html", "json"], default="html", help="report format (default: html)")
+parser.add_argument("--cache-dir", default=None, help="plan cache directory")
+parser.add_argument("--sections", nargs="+", choices=list(REPORT_SECTIONS), default=None, help="report sections (default: all)")
+parser.add_argument("--max-table-rows", type=int, default=500, help="maximum number of rows of each table (default: 500)")
+parser.add_argument("--plotlyjs-cdn", action="store_true", help="load plotly.js from a CDN instead of embedding it in each report")
+args = parser.parse_args()
+
+include_plotlyjs = "cdn" if args.plotlyjs_cdn else True
+results = render_reports(args.root_dir, args.output_dir, args.jobs, args.format, args.cache_dir, args.sections, args.max_table_rows, include_plotlyjs)
+print("\nRendered %d reports (%d failed)\n\t%s" % (len(results.reports), len(results.failed), args.output_dir))
+for name, error in results.failed.items():
+    print("Failed rendering %s:\n%s" % (name, error))
@@ -0,0 +1,112 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Shared fixtures: small synthetic engine plans (graph, profiling and metadata
+JSON files) in the formats written by trtexec and process_engine.py.
+"""
+
+import os
+import sys
+import json
+from typing import NamedTuple
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FORMATS = {
+    "FP16": "Channel major FP16 format where channel % 8 == 0",
+    "FP32": "Row major linear FP32",
+    "INT8": "Thirty-two wide channel vectorized row major Int8 format",
+}
+
+class PlanFiles(NamedTuple):
+    graph_file: str
+    profiling_file: str
+    profiling_metadata_file: str
+    build_metadata_file: str
+
+def _tensor(name: str, dims, precision: str) -> dict:
+    return {"Name": name, "Location": "Device", "Dimensions": list(dims), "Format/Datatype": FORMATS[precision]}
+
+def plan_layers(nb_blocks: int = 2, precision: str = "FP16", swap_pointwise_inputs: bool = False):
+    """Return the raw layers of a synthetic plan: an input Reformat followed
+    by `nb_blocks` blocks of Convolution -> PointWise (residual add) ->
+    Reformat -> Shuffle"""
+    dims = [1, 16, 8, 8]
+    layers = [{"Name": "reformat_in", "LayerType": "Reformat", "ParameterType": "Reformat", "Origin": "REFORMAT",
+               "Inputs": [_tensor("input", dims, "FP32")], "Outputs": [_tensor("input_r", dims, precision)], "TacticValue": "0x0"}]
+    cur = layers[-1]["Outputs"][0]
+    for b in range(nb_blocks):
+        conv_out = _tensor(f"conv{b}_out", dims, precision)
+        layers.append({
+            "Name": f"conv{b}", "LayerType": "CaskConvolution", "ParameterType": "Convolution", "Inputs": [cur], "Outputs": [conv_out],
+            "Kernel": [3, 3], "PaddingMode": "kEXPLICIT_ROUND_DOWN", "PrePadding": [1, 1], "PostPadding": [1, 1], "Stride": [1, 1],
+            "Dilation": [1, 1], "OutMaps": 16, "Groups": 1, "Weights": {"Type": "Half", "Count": 16 * 16 * 9}, "Bias": {"Type": "Half", "Count": 16},
+            "AllowSparse": 0, "Activation": "RELU", "HasBias": 1, "HasReLU": 1, "TacticName": "sm80_xmma_fprop_implicit_gemm_f16f16", "TacticValue": f"0x{b + 1:x}",
+        })
+        pw_out = _tensor(f"pw{b}_out", dims, precision)
+        inputs = [conv_out, cur] if not swap_pointwise_inputs else [cur, conv_out]
+        layers.append({
+            "Name": f"pw{b}", "LayerType": "PointWiseV2", "ParameterType": "PointWise", "ParameterSubType": "PointWiseExpression",
+            "NbInputArgs": 2, "InputArgs": ["arg0", "arg1"], "NbOutputVars": 1, "OutputVars": ["var0"], "NbParams": 0, "Params": [],
+            "NbLiterals": 0, "Literals": [], "NbOperations": 1, "Operations": ["const auto var0 = pwgen::iPlus(arg0, arg1);"],
+            "Inputs": inputs, "Outputs": [pw_out], "TacticValue": "0x20",
+        })
+        reformat_out = _tensor(f"reformat{b}_out", dims, "FP32")
+        layers.append({"Name": f"reformat{b}", "LayerType": "Reformat", "ParameterType": "Reformat", "Origin": "REFORMAT",
+                       "Inputs": [pw_out], "Outputs": [reformat_out], "TacticValue": "0x0"})
+        shuffle_out = _tensor(f"shuffle{b}_out", dims, precision)
+        layers.append({"Name": f"shuffle{b}", "LayerType": "Shuffle", "ParameterType": "Shuffle", "FirstTranspose": [0, 1, 2, 3],
+                       "Reshape": dims, "SecondTranspose": [0, 1, 2, 3], "ZeroIsPlaceholder": 1, "Inputs": [reformat_out], "Outputs": [shuffle_out], "TacticValue": "0x0"})
+        cur = shuffle_out
+    cur["Name"] = "output"
+    return layers
+
+def write_plan_files(directory: str, name: str = "plan", layers=None, precision: str = "FP16") -> PlanFiles:
+    """Write the JSON files of a synthetic plan, with a 0.01ms * (i + 1)
+    latency for the i-th layer"""
+    layers = layers if layers is not None else plan_layers(precision=precision)
+    files = PlanFiles(*[os.path.join(str(directory), f"{name}.{suffix}.json") for suffix in ("graph", "profile", "profile.metadata", "build.metadata")])
+    profile = [{"count": 100}]
+    for i, layer in enumerate(layers):
+        latency = 0.01 * (i + 1)
+        profile.append({"name": layer["Name"], "timeMs": 100 * latency, "averageMs": latency, "medianMs": latency, "percentage": 1.})
+    metadata = {
+        "performance_summary": {"Throughput": 1000.0},
+        "inference_options": {},
+        "device_information": {"Selected Device": "NVIDIA A100", "Compute Capability": 8.0, "SMs": 108.0, "Compute Clock Rate": 1.41,
+                               "Device Global Memory": "40536 MiB", "Memory Bus Width": 5120.0, "Memory Clock Rate": 1.215},
+    }
+    contents = (
+        {"Layers": layers, "Bindings": ["input", "output"]},
+        profile,
+        metadata,
+        {"model_options": {"Format": "ONNX"}, "build_options": {"Precision": precision}},
+    )
+    for path, content in zip(files, contents):
+        with open(path, "w") as f:
+            json.dump(content, f)
+    return files
+
+@pytest.fixture
+def plan_files(tmp_path) -> PlanFiles:
+    return write_plan_files(tmp_path)
+
+@pytest.fixture
+def plan(plan_files):
+    from trex.engine_plan import EnginePlan
+    return EnginePlan(*plan_files)
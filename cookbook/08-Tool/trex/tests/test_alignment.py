@@ -0,0 +1,121 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the alignment of the layers of engine plans.
+"""
+
+import random
+import pytest
+from conftest import plan_layers, write_plan_files
+
+from trex.engine_plan import EnginePlan
+from trex.alignment import align_plans, align_sequences, layer_signature
+
+def lcs_length(a, b) -> int:
+    """The length of the longest common subsequence (dynamic programming)"""
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            lengths[i + 1][j + 1] = lengths[i][j] + 1 if x == y else max(lengths[i][j + 1], lengths[i + 1][j])
+    return lengths[-1][-1]
+
+def check_alignment(a, b, pairs):
+    """Check that `pairs` is a minimal alignment of `a` and `b`"""
+    assert [i for i, _ in pairs if i is not None] == list(range(len(a)))
+    assert [j for _, j in pairs if j is not None] == list(range(len(b)))
+    matches = [(i, j) for i, j in pairs if i is not None and j is not None]
+    assert all(a[i] == b[j] for i, j in matches)
+    assert len(matches) == lcs_length(a, b)
+
+@pytest.mark.parametrize("a, b, expected", [
+    ([], [], []),
+    ("abc", "abc", [(0, 0), (1, 1), (2, 2)]),
+    ("abc", "axbc", [(0, 0), (None, 1), (1, 2), (2, 3)]),
+    ("abcd", "acd", [(0, 0), (1, None), (2, 1), (3, 2)]),
+    ("ab", "", [(0, None), (1, None)]),
+    ("", "ab", [(None, 0), (None, 1)]),
+    ("ab", "xy", [(0, None), (1, None), (None, 0), (None, 1)]),
+    # The example of Myers' paper has several minimal alignments (D = 5).
+    ("abcabba", "cbabac", None),
+])
+def test_align_sequences(a, b, expected):
+    pairs = align_sequences(list(a), list(b))
+    check_alignment(a, b, pairs)
+    assert expected is None or pairs == expected
+
+def test_align_sequences_random():
+    rng = random.Random(0)
+    for _ in range(300):
+        a = [rng.randrange(4) for _ in range(rng.randrange(30))]
+        # Derive b from a with random insertions, deletions and substitutions.
+        b = [x for x in a if rng.random() > 0.2]
+        for _ in range(rng.randrange(5)):
+            b.insert(rng.randrange(len(b) + 1), rng.randrange(6))
+        check_alignment(a, b, align_sequences(a, b))
+
+def test_layer_signature():
+    t = lambda *dims: {"Dimensions": list(dims)}
+    # The batch dimension is ignored.
+    assert layer_signature("Convolution", [t(1, 3, 8, 8)], [t(1, 16, 8, 8)], True) == layer_signature("Convolution", [t(4, 3, 8, 8)], [t(4, 16, 8, 8)], True)
+    # The inputs of binary PointWise layers may be swapped...
+    a, b, out = t(1, 16, 8, 8), t(1, 16, 1, 1), t(1, 16, 8, 8)
+    assert layer_signature("PointWise", [a, b], [out], True) == layer_signature("PointWise", [b, a], [out], True)
+    # ...but not those of other layers, or of PointWise layers with more inputs.
+    assert layer_signature("ElementWise", [a, b], [out], True) != layer_signature("ElementWise", [b, a], [out], True)
+    assert layer_signature("PointWise", [a, b, b], [out], True) != layer_signature("PointWise", [b, a, b], [out], True)
+    # Only the first input and output are used by the inexact matching.
+    assert layer_signature("Concatenation", [a, b], [out], False) == layer_signature("Concatenation", [a, a], [out], False)
+    assert layer_signature("Concatenation", [a, b], [out], True) != layer_signature("Concatenation", [a, a], [out], True)
+
+def _swap_pointwise_inputs(layers):
+    # The residual input of the PointWise layers has a different shape.
+    for layer in layers:
+        if layer["ParameterType"] == "PointWise":
+            residual = dict(layer["Inputs"][1], Dimensions=[1, 16, 1, 1])
+            layer["Inputs"] = [layer["Inputs"][0], residual]
+    return layers
+
+def test_align_identical_plans(plan):
+    assert align_plans(plan, plan, True) == [(i, i) for i in plan.df.index]
+
+def test_align_plans_pointwise_input_swap(tmp_path):
+    layers1 = _swap_pointwise_inputs(plan_layers())
+    layers2 = _swap_pointwise_inputs(plan_layers())
+    for layer in layers2:
+        if layer["ParameterType"] == "PointWise":
+            layer["Inputs"].reverse()
+    plan1 = EnginePlan(*write_plan_files(tmp_path, "plan1", layers1))
+    plan2 = EnginePlan(*write_plan_files(tmp_path, "plan2", layers2))
+    assert align_plans(plan1, plan2, True) == [(i, i) for i in plan1.df.index]
+
+def test_align_plans_insertion_and_deletion(tmp_path):
+    layers1 = plan_layers(nb_blocks=2)
+    layers2 = plan_layers(nb_blocks=2)
+    # plan2 has no input reformat and an extra (wider) convolution.
+    del layers2[0]
+    wide = dict(layers2[0], Name="wide", Outputs=[dict(layers2[0]["Outputs"][0], Dimensions=[1, 32, 8, 8])])
+    layers2.insert(4, wide)
+    plan1 = EnginePlan(*write_plan_files(tmp_path, "plan1", layers1))
+    plan2 = EnginePlan(*write_plan_files(tmp_path, "plan2", layers2))
+    pairs = align_plans(plan1, plan2, True)
+    names = [(plan1.df["Name"][i] if i is not None else None, plan2.df["Name"][j] if j is not None else None) for i, j in pairs]
+    assert names == [
+        ("reformat_in", None),
+        ("conv0", "conv0"), ("pw0", "pw0"), ("reformat0", "reformat0"), ("shuffle0", "shuffle0"),
+        (None, "wide"),
+        ("conv1", "conv1"), ("pw1", "pw1"), ("reformat1", "reformat1"), ("shuffle1", "shuffle1"),
+    ]
@@ -0,0 +1,150 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the build pipeline, with a trtexec stand-in (trtexec_stub.py).
+"""
+
+import os
+import json
+import pytest
+
+from buildPipeline import BuildConfig, create_jobs, job_files, run_pipeline
+
+TRTEXEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trtexec_stub.py")
+CONFIGS = [BuildConfig("fp32", []), BuildConfig("fp16", ["--fp16"])]
+
+@pytest.fixture
+def calls(tmp_path, monkeypatch):
+    """Return a function which returns (and forgets) the trtexec runs"""
+    calls_file = tmp_path / "calls.jsonl"
+    monkeypatch.setenv("TRTEXEC_STUB_CALLS", str(calls_file))
+
+    def pop_calls():
+        if not calls_file.exists():
+            return []
+        runs = [json.loads(line) for line in calls_file.read_text().splitlines()]
+        calls_file.unlink()
+        return runs
+
+    return pop_calls
+
+@pytest.fixture
+def models(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.onnx"
+        path.write_bytes(f"model {name}".encode())
+        paths.append(str(path))
+    return paths
+
+def _run(models, output_dir, **kwargs):
+    results = run_pipeline(models, CONFIGS, str(output_dir), TRTEXEC, **kwargs)
+    return {(os.path.basename(result.model), result.config): result for result in results}
+
+def _ran(results):
+    return {key: result.ran for key, result in results.items()}
+
+def test_pipeline_outputs(tmp_path, models, calls):
+    results = _run(models, tmp_path / "jobs")
+    assert _ran(results) == {(m, c): ["build", "profile"] for m in ("a.onnx", "b.onnx") for c in ("fp32", "fp16")}
+    assert all(result.error is None for result in results.values())
+    assert len(calls()) == 8
+    files = job_files(str(tmp_path / "jobs" / "a" / "fp16"))
+    with open(files["build_metadata"]) as f:
+        assert json.load(f)["build_options"]["Precision"] == "FP32+FP16"
+    with open(files["build_tactics"]) as f:
+        assert json.load(f)["tactic"] == ["0x0000000000000001", "0x0000000000000002"]
+    with open(files["build_timeline"]) as f:
+        assert json.load(f)["category"] == ["setup", "fusion", "tactic timing", "other", "end"]
+    with open(files["profile_metadata"]) as f:
+        metadata = json.load(f)
+    assert metadata["performance_summary"]["Throughput"] == 1000.5
+    assert metadata["device_information"]["SMs"] == 108
+    with open(tmp_path / "jobs" / "pipeline.results.json") as f:
+        assert len(json.load(f)) == 4
+
+def test_pipeline_resume(tmp_path, models, calls):
+    _run(models, tmp_path / "jobs")
+    calls()
+    # Nothing changed: all the stages are skipped.
+    results = _run(models, tmp_path / "jobs")
+    assert calls() == []
+    assert all(result.ran == [] and result.skipped == ["build", "profile"] for result in results.values())
+
+    # A changed model is rebuilt, and its new engines are profiled.
+    with open(models[0], "ab") as f:
+        f.write(b" v2")
+    results = _run(models, tmp_path / "jobs")
+    assert _ran(results) == {("a.onnx", "fp32"): ["build", "profile"], ("a.onnx", "fp16"): ["build", "profile"], ("b.onnx", "fp32"): [], ("b.onnx", "fp16"): []}
+    assert len(calls()) == 4
+
+    # A missing output reruns its stage only.
+    os.remove(job_files(str(tmp_path / "jobs" / "b" / "fp32"))["graph"])
+    results = _run(models, tmp_path / "jobs")
+    assert results[("b.onnx", "fp32")].ran == ["profile"] and results[("b.onnx", "fp32")].skipped == ["build"]
+    assert [call["stage"] for call in calls()] == ["profile"]
+
+    # The build flags are part of the build stage's key.
+    results = run_pipeline(models[:1], [BuildConfig("fp32", ["--noTF32"])], str(tmp_path / "jobs"), TRTEXEC)
+    assert results[0].ran == ["build", "profile"]
+    calls()
+
+    results = _run(models, tmp_path / "jobs", force=True)
+    assert all(result.ran == ["build", "profile"] for result in results.values())
+    assert len(calls()) == 8
+
+def test_pipeline_failing_stage(tmp_path, models, calls):
+    with open(models[1], "wb") as f:
+        f.write(b"fail to parse")
+    results = _run(models, tmp_path / "jobs")
+    failed = results[("b.onnx", "fp32")]
+    assert failed.ran == [] and "CalledProcessError" in failed.error
+    assert not os.path.exists(os.path.join(failed.job_dir, "build.done.json"))
+    assert "Failed to parse ONNX model" in open(job_files(failed.job_dir)["build_log"]).read()
+    # The other jobs are not affected.
+    assert results[("a.onnx", "fp16")].ran == ["build", "profile"] and results[("a.onnx", "fp16")].error is None
+    with open(tmp_path / "jobs" / "pipeline.results.json") as f:
+        assert sum(result["error"] is not None for result in json.load(f)) == 2
+    calls()
+
+    # The failed jobs are run again, once fixed.
+    with open(models[1], "wb") as f:
+        f.write(b"model b")
+    results = _run(models, tmp_path / "jobs")
+    assert _ran(results)[("b.onnx", "fp32")] == ["build", "profile"]
+    assert _ran(results)[("a.onnx", "fp32")] == []
+    assert len(calls()) == 4
+
+def test_no_build_while_profiling(tmp_path, models, calls, monkeypatch):
+    monkeypatch.setenv("TRTEXEC_STUB_SECONDS", "0.2")
+    configs = [BuildConfig(f"config{i}", [f"--optShapes=input:{i}x3x224x224"]) for i in range(3)]
+    results = run_pipeline(models, configs, str(tmp_path / "jobs"), TRTEXEC, max_workers=6)
+    assert all(result.error is None for result in results)
+    runs = calls()
+    profiles = [run for run in runs if run["stage"] == "profile"]
+    assert len(profiles) == 6
+    for profile in profiles:
+        # No other trtexec run overlaps a profiling run.
+        overlapping = [run for run in runs if run is not profile and run["start"] < profile["end"] and profile["start"] < run["end"]]
+        assert overlapping == []
+    # The builds run concurrently.
+    builds = sorted((run for run in runs if run["stage"] == "build"), key=lambda run: run["start"])
+    assert any(later["start"] < earlier["end"] for earlier, later in zip(builds, builds[1:]))
+
+def test_create_jobs(tmp_path):
+    jobs = create_jobs(["x/model.onnx", "y/model.onnx"], CONFIGS[:1], str(tmp_path))
+    assert [os.path.relpath(job.job_dir, str(tmp_path)) for job in jobs] == [os.path.join("model_0", "fp32"), os.path.join("model_1", "fp32")]
@@ -0,0 +1,66 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the EnginePlan dataframe and its derived columns.
+"""
+
+import numpy as np
+from conftest import plan_layers, write_plan_files
+
+from trex.engine_plan import EnginePlan
+from trex.activations import TensorTable
+
+def test_summation_columns_match_layers(plan):
+    df = plan.df
+    # The layers are created on first access, after the columns.
+    assert plan._layers is None
+    layers = plan.layers
+    assert list(df["Name"]) == [layer.name for layer in layers]
+    assert list(df["total_io_size_bytes"]) == [layer.total_io_size_bytes for layer in layers]
+    assert list(df["weights_size"]) == [layer.weights_size for layer in layers]
+    assert list(df["total_footprint_bytes"]) == [layer.total_footprint_bytes for layer in layers]
+    assert list(df["precision"]) == [layer.precision for layer in layers]
+    assert plan.total_act_size == sum(layer.total_io_size_bytes for layer in layers)
+    assert plan.total_weights_size == sum(layer.weights_size for layer in layers) == 2 * 16 * 16 * 9 * 2
+
+def test_raw_tensor_table_matches_layers(plan):
+    raw = TensorTable.from_raw_layers(plan.df["Inputs"], plan.df["Outputs"])
+    tensors = TensorTable(plan.layers)
+    assert raw.names == tensors.names
+    for attr in ("layer_id", "port", "is_output", "volume", "size_bytes"):
+        np.testing.assert_array_equal(getattr(raw, attr), getattr(tensors, attr))
+    np.testing.assert_array_equal(raw.precisions(), tensors.precisions())
+
+def test_plan_without_tensors(tmp_path):
+    layers = plan_layers(nb_blocks=1)
+    for layer in layers:
+        layer["Inputs"], layer["Outputs"] = [], []
+    plan = EnginePlan(*write_plan_files(tmp_path, layers=layers))
+    assert (plan.df["total_io_size_bytes"] == 0).all()
+    assert plan.df["precision"].isna().all()
+    assert plan.total_act_size == 0
+    assert plan.total_weights_size == 16 * 16 * 9 * 2
+
+def test_constant_layers(tmp_path):
+    layers = plan_layers(nb_blocks=1)
+    constant = {"Name": "const", "LayerType": "Constant", "ParameterType": "Constant", "Weights": {"Type": "Half", "Count": 64},
+                "Inputs": [], "Outputs": [dict(layers[0]["Outputs"][0], Name="const_out")]}
+    plan = EnginePlan(*write_plan_files(tmp_path, layers=[constant] + layers))
+    # Constant layers are not plan layers, and their weights are not counted.
+    assert "const" not in set(plan.df["Name"])
+    assert plan.total_weights_size == 16 * 16 * 9 * 2
+    assert [layer.name for layer in plan.all_layers][0] == "const"
@@ -0,0 +1,129 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the rendering of engine reports without Jupyter (requires plotly and
+graphviz).
+"""
+
+import os
+import sys
+import json
+import subprocess
+from html.parser import HTMLParser
+import pandas as pd
+import pytest
+
+pio = pytest.importorskip("plotly.io")
+pytest.importorskip("graphviz")
+import plotly.graph_objects as go
+
+from trex import interactive, notebook
+from trex.headless_report import ReportItem, capture_report, render_report, report_to_html, report_to_json, plan_summary, write_report
+
+NOTEBOOK_MODULES = ("IPython", "ipywidgets", "dtale", "qgrid", "ipyfilechooser")
+
+class _TagParser(HTMLParser):
+    """Collect the tags of an HTML document and check that they are closed"""
+    VOID_TAGS = {"meta", "br", "hr", "img", "link", "input"}
+
+    def __init__(self):
+        super().__init__()
+        self.tags, self.open_tags = [], []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append(tag)
+        if tag not in self.VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        assert self.open_tags.pop() == tag
+
+def _parse_html(document: str) -> _TagParser:
+    parser = _TagParser()
+    parser.feed(document)
+    parser.close()
+    assert parser.open_tags == []
+    return parser
+
+def _capture():
+    items = []
+    with capture_report(items):
+        print("some <text>")
+        print("more text")
+        go.Figure(go.Bar(x=["a", "b"], y=[1, 2])).show()
+        notebook.display_df(pd.DataFrame({"Name": ["conv1"], "latency": [0.5]}))
+        interactive.InteractiveDiagram_2({"first": lambda title: print(title), "failing": lambda title: 1 / 0}, "choice")
+    return items
+
+def test_capture_report():
+    default_renderer = pio.renderers.default
+    items = _capture()
+    assert [item.kind for item in items] == ["text", "figure", "table", "choice", "text", "choice", "error"]
+    assert items[0].content == "some <text>\nmore text\n"
+    assert items[1].content["data"][0]["type"] == "bar"
+    assert list(items[2].content["Name"]) == ["conv1"]
+    assert [items[3].content, items[4].content, items[5].content] == ["first", "first\n", "failing"]
+    assert items[6].content.startswith("ZeroDivisionError")
+    # The hooks are removed on exit.
+    assert pio.renderers.default == default_renderer
+    assert notebook._display_df_hook is None and interactive._choice_hook is None
+
+def test_report_to_html():
+    items = _capture()
+    document = report_to_html("my <engine>", {"Layers": 3}, [ReportItem("section", "Overview")] + items)
+    assert document.startswith("<!DOCTYPE html>")
+    tags = _parse_html(document).tags
+    assert tags.count("h1") == 1 and tags.count("h2") == 1 and tags.count("h3") == 2
+    # The summary and the captured table.
+    assert tags.count("table") == 2
+    # plotly.js is embedded once, with the figure.
+    assert document.count("plotly.js v") == 1 and document.count('class="plotly-graph-div"') == 1
+    assert "my &lt;engine&gt;" in document and "some &lt;text&gt;" in document
+    assert '<pre class="error">ZeroDivisionError' in document
+    assert "plotly.js v" not in report_to_html("engine", {}, items, include_plotlyjs=False)
+
+def test_report_to_json():
+    items = _capture()
+    report = json.loads(report_to_json("engine", {"Layers": 3}, items))
+    assert report["name"] == "engine" and report["summary"] == {"Layers": 3}
+    assert [item["kind"] for item in report["items"]] == [item.kind for item in items]
+    figure, table = report["items"][1]["content"], report["items"][2]["content"]
+    assert figure["data"][0]["y"] == [1, 2]
+    assert table == {"columns": ["Name", "latency"], "index": [0], "data": [["conv1", 0.5]]}
+
+def test_render_report(tmp_path, plan):
+    items = render_report(plan)
+    sections = [item.content for item in items if item.kind == "section"]
+    assert sections[:3] == ["Performance overview", "Layers", "Memory footprint"]
+    assert any(item.kind == "figure" for item in items)
+    assert any(item.kind == "table" for item in items)
+    path = str(tmp_path / "reports" / "plan.report.json")
+    write_report(plan, path, "json", sections=["Layers"])
+    report = json.loads(open(path).read())
+    assert report["summary"] == json.loads(json.dumps(plan_summary(plan)))
+    # The table view renders one table per choice.
+    kinds = [item["kind"] for item in report["items"]]
+    assert kinds[:3] == ["section", "choice", "table"] and "error" not in kinds
+
+def test_no_notebook_imports():
+    # Importing the report modules must not import the notebook packages.
+    code = ("import sys\n"
+            f"for module in {NOTEBOOK_MODULES!r}:\n"
+            "    sys.modules[module] = None\n"
+            "import trex.headless_report\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+    subprocess.run([sys.executable, "-c", code], check=True, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
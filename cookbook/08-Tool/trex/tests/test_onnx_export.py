@@ -0,0 +1,129 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the engine plan to ONNX export (requires onnx).
+"""
+
+import pytest
+from conftest import plan_layers, write_plan_files
+
+onnx = pytest.importorskip("onnx")
+
+from trex.engine_plan import EnginePlan
+from trex.onnx_export import TREX_DOMAIN, OnnxModelWriter, export_onnx
+
+def _export(tmp_path, plan: EnginePlan):
+    path = str(tmp_path / "plan.onnx")
+    nb_nodes = export_onnx(plan, path)
+    onnx.checker.check_model(path)
+    return nb_nodes, onnx.load(path)
+
+def _has_metadata_props() -> bool:
+    return "metadata_props" in onnx.NodeProto.DESCRIPTOR.fields_by_name
+
+def test_export_nodes_and_domains(tmp_path, plan):
+    nb_nodes, model = _export(tmp_path, plan)
+    nodes = model.graph.node
+    assert nb_nodes == len(nodes) == len(plan.all_layers)
+    assert [node.name for node in nodes] == [layer.name for layer in plan.all_layers]
+    # The convolutions have no weights input, so they are not onnx.ai Conv nodes.
+    assert {(node.domain, node.op_type) for node in nodes} == {(TREX_DOMAIN, t) for t in ("Reformat", "Convolution", "PointWise", "Shuffle")}
+    assert {(opset.domain, opset.version) for opset in model.opset_import if opset.domain} == {(TREX_DOMAIN, 1)}
+    conv = nodes[1]
+    assert list(conv.input) == ["input_r"] and list(conv.output) == ["conv0_out"]
+    assert {a.name: onnx.helper.get_attribute_value(a) for a in conv.attribute}["Kernel"] == [3, 3]
+
+def test_export_value_infos(tmp_path, plan):
+    _, model = _export(tmp_path, plan)
+    graph = model.graph
+
+    def shape_and_type(value_info):
+        tensor_type = value_info.type.tensor_type
+        return [d.dim_value for d in tensor_type.shape.dim], tensor_type.elem_type
+
+    assert [vi.name for vi in graph.input] == ["input"]
+    assert shape_and_type(graph.input[0]) == ([1, 16, 8, 8], onnx.TensorProto.FLOAT)
+    assert [vi.name for vi in graph.output] == ["output"]
+    value_infos = {vi.name: shape_and_type(vi) for vi in graph.value_info}
+    assert value_infos["conv0_out"] == ([1, 16, 8, 8], onnx.TensorProto.FLOAT16)
+    assert value_infos["reformat0_out"] == ([1, 16, 8, 8], onnx.TensorProto.FLOAT)
+    # Every node output but the graph output has a value info.
+    outputs = {name for node in graph.node for name in node.output}
+    assert outputs - set(value_infos) == {"output"}
+
+def test_export_node_metrics(tmp_path, plan):
+    _, model = _export(tmp_path, plan)
+    conv = model.graph.node[1]
+    expected = plan.df.set_index("Name").loc["conv0"]
+    assert f"latency.avg_time: {expected['latency.avg_time']}" in conv.doc_string
+    if _has_metadata_props():
+        props = {p.key: p.value for p in conv.metadata_props}
+        assert float(props["latency.avg_time"]) == pytest.approx(expected["latency.avg_time"])
+        assert props["tactic"] == expected["tactic"]
+        assert props["precision"] == "FP16"
+        assert int(props["weights_size"]) == expected["weights_size"]
+    model_props = {p.key: p.value for p in model.metadata_props}
+    assert model_props["trex.layers"] == str(len(plan.df))
+    assert model_props["trex.precision"] == "FP16"
+
+def test_export_in_place_tensors(tmp_path):
+    layers = plan_layers(nb_blocks=1)
+    # The pointwise layer writes its result in place of its first input.
+    layers[2]["Outputs"][0]["Name"] = "conv0_out"
+    layers[3]["Inputs"][0]["Name"] = "conv0_out"
+    _, model = _export(tmp_path, EnginePlan(*write_plan_files(tmp_path, layers=layers)))
+    nodes = {node.name: node for node in model.graph.node}
+    assert list(nodes["conv0"].output) == ["conv0_out"]
+    assert list(nodes["pw0"].input) == ["conv0_out", "input_r"]
+    assert list(nodes["pw0"].output) == ["conv0_out:1"]
+    assert list(nodes["reformat0"].input) == ["conv0_out:1"]
+
+def test_export_onnx_ops(tmp_path):
+    layers = plan_layers(nb_blocks=1)
+    pool_out = {"Name": "output", "Location": "Device", "Dimensions": [1, 16, 4, 4], "Format/Datatype": layers[-1]["Outputs"][0]["Format/Datatype"]}
+    layers[-1]["Outputs"][0]["Name"] = "shuffle0_out"
+    layers.append({
+        "Name": "pool", "LayerType": "CaskPooling", "ParameterType": "Pooling", "PoolingType": "MAX", "WindowSize": [2, 2], "Stride": [2, 2],
+        "PrePadding": [0, 0], "PostPadding": [0, 0], "BlendFactor": 0, "AverageCountExcludesPadding": 1,
+        "Inputs": [layers[-1]["Outputs"][0]], "Outputs": [pool_out], "TacticValue": "0x3",
+    })
+    _, model = _export(tmp_path, EnginePlan(*write_plan_files(tmp_path, layers=layers)))
+    pool = model.graph.node[-1]
+    assert (pool.domain, pool.op_type) == ("", "MaxPool")
+    attributes = {a.name: onnx.helper.get_attribute_value(a) for a in pool.attribute}
+    assert attributes == {"kernel_shape": [2, 2], "strides": [2, 2], "pads": [0, 0, 0, 0]}
+    if _has_metadata_props():
+        assert {p.key: p.value for p in pool.metadata_props}["attr.PoolingType"] == "MAX"
+
+def test_streamed_graph_matches_in_memory_graph(tmp_path):
+    helper = onnx.helper
+    x = helper.make_tensor_value_info("x", onnx.TensorProto.FLOAT, [1, 4])
+    y = helper.make_tensor_value_info("y", onnx.TensorProto.FLOAT, [1, 4])
+    z = helper.make_tensor_value_info("z", onnx.TensorProto.FLOAT16, [1, 4])
+    nodes = [helper.make_node("Relu", ["x"], ["y"], "relu"), helper.make_node("Cast", ["y"], ["z"], "cast", to=onnx.TensorProto.FLOAT16)]
+    path = str(tmp_path / "model.onnx")
+    with OnnxModelWriter(path, "graph", metadata={"key": "value"}) as writer:
+        writer.add_input(x)
+        for node in nodes:
+            writer.add_node(node)
+        writer.add_value_info(y)
+        writer.add_output(z)
+    model = onnx.load(path)
+    onnx.checker.check_model(model)
+    assert model.graph == helper.make_graph(nodes, "graph", [x], [z], value_info=[y])
+    assert {p.key: p.value for p in model.metadata_props} == {"key": "value"}
+    assert model.producer_name == "trex"
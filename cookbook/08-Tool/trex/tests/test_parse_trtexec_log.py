@@ -0,0 +1,114 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the verbose trtexec build log parsers, on sample logs.
+"""
+
+from parseTrtexecLog import parse_build_timeline, parse_tactic_timings
+
+# TensorRT < 8.4 reports a tactic's name and time on separate lines.
+TWO_LINE_LOG = """\
+[10/18/2022-03:00:00] [V] [TRT] =============== Computing costs for conv1
+[10/18/2022-03:00:00] [V] [TRT] *************** Autotuning format combination: Float(150528,50176,224,1) -> Float(802816,12544,112,1) ***************
+[10/18/2022-03:00:00] [V] [TRT] --------------- Timing Runner: conv1 (CaskConvolution)
+[10/18/2022-03:00:00] [V] [TRT] conv1 Set Tactic Name: sm80_xmma_fprop_a Tactic: 0x0000000000000001
+[10/18/2022-03:00:00] [V] [TRT] Tactic: 0x0000000000000001 Time: 0.05
+[10/18/2022-03:00:00] [V] [TRT] conv1 Set Tactic Name: sm80_xmma_fprop_b Tactic: 0x0000000000000002
+[10/18/2022-03:00:00] [V] [TRT] Tactic: 0x0000000000000002 Time: 0.03
+[10/18/2022-03:00:00] [V] [TRT] Fastest Tactic: 0x0000000000000002 Time: 0.03
+[10/18/2022-03:00:00] [V] [TRT] >>>>>>>>>>>>>>> Chose Runner Type: CaskConvolution Tactic: 0x0000000000000002
+"""
+
+# TensorRT 8.4+ reports a tactic's name, id and time on one line.
+ONE_LINE_LOG = """\
+[10/18/2022-03:00:00] [V] [TRT] =============== Computing costs for conv1
+[10/18/2022-03:00:00] [V] [TRT] *************** Autotuning format combination: Half(150528,50176,224,1) -> Half(802816,12544,112,1) ***************
+[10/18/2022-03:00:00] [V] [TRT] --------------- Timing Runner: conv1 (CaskConvolution)
+[10/18/2022-03:00:00] [V] [TRT] Tactic Name: sm80_xmma_fprop_a Tactic: 0x0000000000000001 Time: 0.021
+[10/18/2022-03:00:00] [V] [TRT] Tactic Name: sm80_xmma_fprop_b Tactic: 0x0000000000000002 Time: 0.012
+[10/18/2022-03:00:00] [V] [TRT] Fastest Tactic: 0x0000000000000002 Time: 0.012
+[10/18/2022-03:00:00] [V] [TRT] >>>>>>>>>>>>>>> Chose Runner Type: CaskConvolution Tactic: 0x0000000000000002
+"""
+
+def _parse(tmp_path, log: str):
+    log_file = tmp_path / "build.log"
+    log_file.write_text(log)
+    return parse_tactic_timings(str(log_file))
+
+def _parse_timeline(tmp_path, log: str):
+    log_file = tmp_path / "build.log"
+    log_file.write_text(log)
+    return parse_build_timeline(str(log_file))
+
+def test_tactic_timings_two_line_format(tmp_path):
+    timings = _parse(tmp_path, TWO_LINE_LOG)
+    assert timings["tactic"] == ["0x0000000000000001", "0x0000000000000002"]
+    assert timings["tactic_name"] == ["sm80_xmma_fprop_a", "sm80_xmma_fprop_b"]
+    assert timings["time"] == [0.05, 0.03]
+    assert timings["layer"] == ["conv1", "conv1"]
+    assert timings["runner"] == ["CaskConvolution", "CaskConvolution"]
+    assert timings["fastest"] == [False, True]
+    assert timings["chosen"] == [False, True]
+
+def test_tactic_timings_one_line_format(tmp_path):
+    timings = _parse(tmp_path, ONE_LINE_LOG)
+    assert timings["tactic"] == ["0x0000000000000001", "0x0000000000000002"]
+    assert timings["tactic_name"] == ["sm80_xmma_fprop_a", "sm80_xmma_fprop_b"]
+    assert timings["time"] == [0.021, 0.012]
+    assert timings["format_combination"] == ["Half(150528,50176,224,1) -> Half(802816,12544,112,1)"] * 2
+    assert timings["fastest"] == [False, True]
+    assert timings["chosen"] == [False, True]
+
+def test_tactic_timings_empty_log(tmp_path):
+    timings = _parse(tmp_path, "")
+    assert all(len(col) == 0 for col in timings.values())
+
+def test_build_timeline_trailing_lines_without_timestamps(tmp_path):
+    # The log ends with more than 64KB of lines without timestamps.
+    log = ("[10/18/2022-03:00:00] [I] [TRT] Starting the build\n"
+           "[10/18/2022-03:00:07] [V] [TRT] =============== Computing costs for conv1\n" + "    at frame\n" * 10000)
+    timeline = _parse_timeline(tmp_path, log)
+    assert timeline["category"] == ["setup", "tactic timing", "end"]
+    assert timeline["timestamp"][-1] - timeline["timestamp"][0] == 7
+
+# The weights conversion warnings of an FP16 build (TensorRT 8.x).
+WEIGHTS_LOG = """\
+[10/18/2022-03:00:00] [I] [TRT] [MemUsageChange] Init CUDA: CPU +0, GPU +0, now: CPU 19, GPU 1100 (MiB)
+[10/18/2022-03:00:02] [V] [TRT] Running: ConstShuffleFusion on conv1.weight
+[10/18/2022-03:00:05] [V] [TRT] =============== Computing costs for conv1
+[10/18/2022-03:00:09] [V] [TRT] Formats and tactics selection completed in 4.12 seconds.
+[10/18/2022-03:00:10] [W] [TRT] Weights [name=/conv1/Conv + /relu1/Relu.weight] had the following issues when converted to FP16:
+[10/18/2022-03:00:10] [W] [TRT]  - Subnormal FP16 values detected. 
+[10/18/2022-03:00:10] [W] [TRT] If this is not the desired behavior, please modify the weights or retrain with regularization to reduce the magnitude of the weights.
+[10/18/2022-03:00:13] [W] [TRT] Weights [name=fc.weight[0]] had the following issues when converted to FP16:
+[10/18/2022-03:00:13] [W] [TRT]  - Values less than smallest positive FP16 Subnormal value detected. Converting to FP16 minimum subnormalized value. 
+[10/18/2022-03:00:14] [V] [TRT] Engine generation completed in 5.2 seconds.
+[10/18/2022-03:00:15] [I] [TRT] [MemUsageChange] TensorRT-managed allocation in building engine: CPU +0, GPU +4, now: CPU 0, GPU 4 (MiB)
+"""
+
+def test_build_timeline_weight_conversion(tmp_path):
+    timeline = _parse_timeline(tmp_path, WEIGHTS_LOG)
+    assert timeline["category"] == ["setup", "fusion", "tactic timing", "other", "weight conversion", "weight conversion", "other", "end"]
+    assert timeline["name"][4:6] == ["/conv1/Conv + /relu1/Relu.weight", "fc.weight[0]"]
+    assert [t - timeline["timestamp"][0] for t in timeline["timestamp"]] == [0, 2, 5, 9, 10, 13, 14, 15]
+    assert timeline["reported_seconds"][3] == 4.12 and timeline["reported_seconds"][6] == 5.2
+
+def test_build_profile_weight_conversion(tmp_path):
+    from trex.build_profile import profile_build
+    profile = profile_build(_parse_timeline(tmp_path, WEIGHTS_LOG))
+    assert profile.total_seconds == 15
+    assert profile.by_category["seconds"].to_dict() == {"tactic timing": 4, "weight conversion": 4, "fusion": 3, "setup": 2, "other": 2}
@@ -0,0 +1,95 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the incremental parsing of plan-graph JSON files.
+"""
+
+import io
+import json
+import pytest
+
+from trex.parser import GraphFileReader, iter_graph_file, iter_json_members
+
+# Strings with JSON delimiters, escapes and non-ASCII characters, and numbers
+# long enough to be split by small chunks.
+TRICKY_LAYERS = [
+    {"Name": "a{b}c[d]", "LayerType": "Reformat", "Origin": "\"quoted\", {braces}, [brackets]", "Inputs": [], "Outputs": []},
+    {"Name": "back\\slash\\", "LayerType": "PointWiseV2", "Operations": ["const auto var0 = pwgen::iPlus(arg0, arg1);", "}\"]\\\n\t"], "Inputs": [], "Outputs": []},
+    {"Name": "unicode é中 😀", "LayerType": "Shuffle", "Reshape": [1, -1, 123456789, 0], "Scale": -1.25e-07, "Flags": [True, False, None], "Inputs": [], "Outputs": []},
+    {"Name": "empty", "LayerType": "NoOp", "Nested": {"a": [{"b": {}}, []], "": ""}, "Inputs": [], "Outputs": []},
+]
+
+def _write(tmp_path, document, **dump_args) -> str:
+    path = str(tmp_path / "plan.graph.json")
+    with open(path, "w") as f:
+        json.dump(document, f, **dump_args)
+    return path
+
+def _read(path: str, chunk_size: int):
+    reader = GraphFileReader(path, chunk_size)
+    return list(reader), reader.bindings
+
+@pytest.mark.parametrize("dump_args", [{}, {"indent": 2}, {"ensure_ascii": False}, {"separators": (",", ":")}])
+def test_graph_file_matches_json_load(tmp_path, dump_args):
+    path = _write(tmp_path, {"Bindings": ["in", "out"], "Layers": TRICKY_LAYERS, "Trailer": 3.5}, **dump_args)
+    with open(path) as f:
+        expected = json.load(f)
+    # Every chunk size from one character (all values split across chunks)
+    # to the whole file.
+    for chunk_size in list(range(1, 64)) + [1 << 20]:
+        layers, bindings = _read(path, chunk_size)
+        assert layers == expected["Layers"], chunk_size
+        assert bindings == expected["Bindings"], chunk_size
+
+def test_bindings_after_layers(tmp_path):
+    path = _write(tmp_path, {"Layers": TRICKY_LAYERS[:1], "Bindings": ["x"]})
+    assert _read(path, 5) == (TRICKY_LAYERS[:1], ["x"])
+
+def test_json_members():
+    text = ' { "a" : 12345678 , "b":[ 1, [2], {"c": "]"} ] , "d" : [ ], "e": "x" } '
+    for chunk_size in range(1, len(text) + 1):
+        members = list(iter_json_members(io.StringIO(text), ("b", "d"), chunk_size))
+        assert members == [("a", 12345678), ("b", 1), ("b", [2]), ("b", {"c": "]"}), ("e", "x")], chunk_size
+    assert list(iter_json_members(io.StringIO("{}"), ("b", ))) == []
+
+def test_truncated_file(tmp_path):
+    text = json.dumps({"Bindings": ["in"], "Layers": TRICKY_LAYERS})
+    path = str(tmp_path / "plan.graph.json")
+    for end in range(len(text)):
+        with open(path, "w") as f:
+            f.write(text[:end])
+        with pytest.raises(ValueError):
+            _read(path, 7)
+
+def test_invalid_graph_files(tmp_path):
+    # Layers without details (ProfilingVerbosity other than detailed).
+    with pytest.raises(ValueError, match="ProfilingVerbosity"):
+        _read(_write(tmp_path, {"Layers": ["conv1", "relu1"]}), 1 << 20)
+    with pytest.raises(ValueError, match="does not conform"):
+        _read(_write(tmp_path, {"Bindings": []}), 1 << 20)
+    with pytest.raises(ValueError, match="Could not load"):
+        _read(_write(tmp_path, [TRICKY_LAYERS[0]]), 1 << 20)
+
+def test_iter_graph_file(tmp_path):
+    layers = [
+        {"Name": "conv", "LayerType": "CaskConvolution", "ParameterType": "Convolution"},
+        {"Name": "conv", "LayerType": "CaskDeconvolutionV2", "ParameterType": "Convolution"},
+        {"Name": "conv", "LayerType": "Reformat"},
+    ]
+    raw_layers = list(iter_graph_file(GraphFileReader(_write(tmp_path, {"Layers": layers}), 16)))
+    assert [layer["Name"] for layer in raw_layers] == ["conv", "conv_2", "conv_3"]
+    assert [layer.get("ParameterType") for layer in raw_layers] == ["Convolution", "Deconvolution", None]
@@ -0,0 +1,76 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the on-disk cache of processed engine plans.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from conftest import write_plan_files
+
+from trex import plan_cache
+from trex.engine_plan import EnginePlan
+from trex.plan_cache import PlanCache, columns_to_df, df_to_columns
+
+def test_cached_plan_matches_fresh_plan(tmp_path, plan_files):
+    cache_dir = str(tmp_path / "cache")
+    fresh = EnginePlan(*plan_files)
+    EnginePlan(*plan_files, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    cached = EnginePlan(*plan_files, cache_dir=cache_dir)
+    # The dataframe is loaded from the cache and the layers are created on demand.
+    assert cached._layers is None and cached._load_raw_layers is not None
+    pd.testing.assert_frame_equal(cached.df, fresh.df)
+    for attr in EnginePlan._cached_attrs:
+        assert getattr(cached, attr) == getattr(fresh, attr), attr
+    assert [layer.name for layer in cached.all_layers] == [layer.name for layer in fresh.all_layers]
+    assert [layer.raw_dict for layer in cached.layers] == [layer.raw_dict for layer in fresh.layers]
+
+def test_columns_round_trip():
+    df = pd.DataFrame({
+        "int": [1, 2, 3],
+        "float": [0.5, np.nan, 2.],
+        "bool": [True, False, True],
+        "str": ["a", None, "c"],
+        "list": [[1, 2], [], [3]],
+        "tuple": [(1, 2), [3, 4], None],
+        "dict": [{"a": (1, 2)}, {}, {"b": [1]}],
+        "numpy": [np.int64(1), np.float32(0.5), "x"],
+    }, index=[3, 5, 7])
+    result = columns_to_df(*df_to_columns(df))
+    expected = df.copy()
+    # Nested tuples and numpy scalars are restored as their JSON types.
+    expected["dict"] = [{"a": [1, 2]}, {}, {"b": [1]}]
+    expected["numpy"] = [1, 0.5, "x"]
+    pd.testing.assert_frame_equal(result, expected)
+    assert [type(value) for value in result["tuple"]] == [tuple, list, type(None)]
+
+def test_cache_key(tmp_path, monkeypatch):
+    files = write_plan_files(tmp_path)
+    key = PlanCache(str(tmp_path), files).key
+    assert PlanCache(str(tmp_path), files).key == key
+    # A missing optional file changes the key.
+    assert PlanCache(str(tmp_path), files[:2] + (None, None)).key != key
+    # So does a change to an input file...
+    with open(files.profiling_file, "a") as f:
+        f.write(" ")
+    changed_key = PlanCache(str(tmp_path), files).key
+    assert changed_key != key
+    # ...or to the preprocessing sources.
+    monkeypatch.setattr(plan_cache, "preprocessing_hash", lambda: "another version")
+    assert PlanCache(str(tmp_path), files).key != changed_key
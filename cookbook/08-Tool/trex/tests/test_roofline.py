@@ -0,0 +1,68 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the roofline model of the GEMM-like layers.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from trex.roofline import DeviceRoofline, layer_flops, layer_roofline, layers_flops
+
+def test_layers_flops():
+    layers = pd.DataFrame({
+        "type": ["Convolution", "Deconvolution", "FullyConnected", "MatrixMultiply", "MatrixMultiply", "Convolution"],
+        "Inputs": [[{"Dimensions": [1, 16, 8, 8]}], [{"Dimensions": [1, 16, 8, 8]}], [{"Dimensions": [4, 256]}],
+                   [{"Dimensions": [2, 8, 32]}], [{"Dimensions": [2, 32, 8]}], []],
+        "Outputs": [[{"Dimensions": [1, 32, 8, 8]}], [{"Dimensions": [1, 8, 16, 16]}], [{"Dimensions": [4, 10]}],
+                    [{"Dimensions": [2, 8, 64]}], [{"Dimensions": [2, 8, 64]}], [{"Dimensions": [1, 16, 8, 8]}]],
+        "Kernel": [[3, 3], [2, 2], None, None, None, [1, 1]],
+        "Groups": [2, None, None, None, None, 1],
+        "OutMaps": [32, 8, 10, None, None, 16],
+        "MatrixOpA": [None, None, None, "kNONE", "kTRANSPOSE", None],
+    })
+    expected = [
+        2. * (32 * 64) * 16 / 2 * 9,  # out volume * in channels / groups * kernel volume
+        2. * (16 * 64) * 8 * 4,       # in volume * out channels * kernel volume
+        2. * (4 * 256) * 10,          # in volume * out maps
+        2. * (2 * 8 * 64) * 32,       # out volume * K
+        2. * (2 * 8 * 64) * 32,       # K is the transposed dimension
+        np.nan,                       # no input
+    ]
+    np.testing.assert_allclose(layers_flops(layers), expected)
+    assert layer_flops(layers.iloc[0]) == expected[0]
+
+def test_layer_roofline(plan):
+    roofline = layer_roofline(plan, DeviceRoofline("device", {"FP16": 1e12}, 1e9))
+    assert list(roofline["Name"]) == ["conv0", "conv1"]
+    conv = roofline.iloc[0]
+    assert conv["flops"] == 2. * (16 * 64) * 16 * 9
+    assert conv["bytes"] == plan.df.set_index("Name").loc["conv0", "total_footprint_bytes"]
+    assert conv["arithmetic_intensity"] == pytest.approx(conv["flops"] / conv["bytes"])
+    assert conv["bound"] == "memory"
+    assert conv["attainable_flops"] == pytest.approx(conv["arithmetic_intensity"] * 1e9)
+    assert conv["min_latency"] == pytest.approx(1000. * conv["flops"] / conv["attainable_flops"])
+
+def test_layer_roofline_unknown_peak(plan):
+    # The device has no FP16 peak throughput: the layers are not placed on the roofline.
+    roofline = layer_roofline(plan, DeviceRoofline("device", {"FP32": 1e12}, 1e15))
+    assert (roofline["bound"] == "unknown").all()
+    for column in ("attainable_flops", "efficiency", "min_latency", "lost_time"):
+        assert roofline[column].isna().all()
+    assert not roofline["below_roofline"].any()
+    assert roofline["achieved_flops"].notna().all()
@@ -0,0 +1,128 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Tests of the latency statistics of timing runs, on small synthetic samples.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+import pytest
+
+from trex.timing_stats import bootstrap_percentiles, compare_timings, detect_warmup, latency_trend, mann_whitney_u, outlier_clusters, timing_stats
+
+def steady(n: int, latency: float = 1.) -> np.ndarray:
+    """`n` samples alternating 1% above and below `latency`"""
+    return latency * np.tile([0.99, 1.01], n // 2)
+
+def test_detect_warmup_step():
+    latencies = np.concatenate((np.full(10, 3.), steady(40)))
+    assert detect_warmup(latencies) == 10
+
+def test_detect_warmup_ramp():
+    # The truncation point is a multiple of the batch size (5).
+    latencies = np.concatenate((np.linspace(3., 1.2, 15), steady(50)))
+    assert detect_warmup(latencies) == 15
+
+def test_detect_warmup_none():
+    assert detect_warmup(steady(100)) == 0
+    # Fewer than 4 batches.
+    assert detect_warmup(np.concatenate((np.full(5, 3.), steady(14)))) == 0
+
+def test_detect_warmup_ignores_late_spike():
+    latencies = steady(100)
+    latencies[-3:] = 50.
+    assert detect_warmup(latencies) == 0
+
+def test_bootstrap_percentiles_seeded():
+    latencies = np.arange(1., 101.)
+    ci = bootstrap_percentiles(latencies, (50, 90), n_resamples=200, seed=1)
+    assert list(ci.index) == ["p50", "p90", "mean"]
+    assert list(ci["latency"]) == [50.5, pytest.approx(90.1), 50.5]
+    # The same resamples, drawn independently.
+    samples = latencies[np.random.default_rng(1).integers(0, 100, size=(200, 100))]
+    stats = np.stack((np.percentile(samples, 50, axis=1), np.percentile(samples, 90, axis=1), samples.mean(axis=1)), axis=1)
+    np.testing.assert_allclose(ci["ci_low"], np.percentile(stats, 2.5, axis=0))
+    np.testing.assert_allclose(ci["ci_high"], np.percentile(stats, 97.5, axis=0))
+    assert (ci["ci_low"] <= ci["latency"]).all() and (ci["latency"] <= ci["ci_high"]).all()
+    pd.testing.assert_frame_equal(ci, bootstrap_percentiles(latencies, (50, 90), n_resamples=200, seed=1))
+    assert not ci.equals(bootstrap_percentiles(latencies, (50, 90), n_resamples=200, seed=2))
+
+def test_bootstrap_percentiles_constant():
+    ci = bootstrap_percentiles(np.full(30, 2.), (50, 99), n_resamples=50)
+    assert (ci.to_numpy() == 2.).all()
+
+def test_latency_trend_level_shift():
+    trend = latency_trend(np.concatenate((steady(50), steady(50, 1.2))))
+    assert trend["change_point"] == 50
+    assert trend["median_before"] == pytest.approx(1.)
+    assert trend["median_after"] == pytest.approx(1.2)
+    assert trend["shift_pct"] == pytest.approx(20.)
+    assert trend["throttling"]
+
+def test_latency_trend_steady():
+    trend = latency_trend(steady(100))
+    assert abs(trend["drift_pct"]) < 1. and abs(trend["shift_pct"]) < 5.
+    assert not trend["throttling"]
+    # Too few samples.
+    assert latency_trend(steady(8))["change_point"] is None
+
+def test_outlier_clusters():
+    latencies = steady(100)
+    latencies[[20, 22, 60]] = [5., 6., 7.]
+    clusters = outlier_clusters(latencies, times=np.arange(100) / 10.)
+    assert clusters[["first_sample", "last_sample", "samples"]].values.tolist() == [[20, 22, 2], [60, 60, 1]]
+    assert list(clusters["max_latency"]) == [6., 7.]
+    assert list(clusters["start_time"]) == [2., 6.]
+    assert outlier_clusters(steady(100)).empty
+
+def test_mann_whitney_u():
+    # U = 9 (every b sample is larger), z = 4.5 / sqrt(3 * 3 * 7 / 12).
+    u, p_value = mann_whitney_u(np.array([1., 2., 3.]), np.array([4., 5., 6.]))
+    assert u == 9.
+    assert p_value == pytest.approx(math.erfc(4.5 / math.sqrt(5.25) / math.sqrt(2)))
+    assert p_value == pytest.approx(0.0495346)
+    # The statistic is symmetric.
+    u, p_value_swapped = mann_whitney_u(np.array([4., 5., 6.]), np.array([1., 2., 3.]))
+    assert u == 0. and p_value_swapped == pytest.approx(p_value)
+    assert mann_whitney_u(np.array([1., 2., 3., 4.]), np.array([1., 2., 3., 4.])) == (8., 1.)
+    # All the samples are tied.
+    assert mann_whitney_u(np.ones(3), np.ones(3)) == (4.5, 1.)
+
+def test_timing_stats():
+    latencies = np.concatenate((np.full(10, 3.), steady(40)))
+    records = pd.DataFrame({"latencyMs": latencies, "startEnqMs": 1000. + 10. * np.arange(50)})
+    stats = timing_stats(records, percentiles=(50,), n_resamples=100)
+    assert (stats.samples, stats.warmup_samples) == (40, 10)
+    assert stats.summary["mean"] == pytest.approx(1.)
+    assert stats.summary["jitter"] == pytest.approx(0.02)
+    assert stats.percentiles.loc["p50", "latency"] == pytest.approx(1.)
+    assert stats.outliers.empty
+    with pytest.raises(ValueError):
+        timing_stats([])
+
+def test_compare_timings():
+    baseline, candidate = steady(100), steady(100, 1.1)
+    comparison = compare_timings(baseline, candidate, percentiles=(50,), n_resamples=200)
+    assert comparison.prob_slower == 1.
+    assert comparison.p_value < 1e-6
+    p50 = comparison.table.loc["p50"]
+    assert p50["delta"] == pytest.approx(0.1) and p50["delta_pct"] == pytest.approx(10.)
+    assert p50["significant"] and p50["ci_low"] > 0
+    same = compare_timings(baseline, baseline, percentiles=(50,), n_resamples=200)
+    assert same.p_value == 1. and same.prob_slower == 0.5
+    assert not same.table["significant"].any()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+A trtexec stand-in for the build pipeline tests.
+
+A build (--onnx) writes an engine file and prints a canned verbose build log.
+It fails if the ONNX file starts with "fail". A profiling run (--loadEngine)
+writes canned profile, timing and graph JSON files and prints a canned
+profiling log.
+
+Each run appends a JSON line (stage, engine, start and end times) to the file
+named by $TRTEXEC_STUB_CALLS, and lasts at least $TRTEXEC_STUB_SECONDS.
+"""
+
+import os
+import sys
+import json
+import time
+
+BUILD_LOG = """\
+[10/18/2022-03:00:00] [I] === Model Options ===
+[10/18/2022-03:00:00] [I] Format: ONNX
+[10/18/2022-03:00:00] [I] Model: {onnx}
+[10/18/2022-03:00:00] [I] === Build Options ===
+[10/18/2022-03:00:00] [I] Precision: {precision}
+[10/18/2022-03:00:00] [I] Workspace: 4096 MiB
+[10/18/2022-03:00:01] [V] [TRT] Running: ConstShuffleFusion on conv1.weight
+[10/18/2022-03:00:02] [V] [TRT] =============== Computing costs for conv1
+[10/18/2022-03:00:02] [V] [TRT] *************** Autotuning format combination: Float(150528,50176,224,1) -> Float(802816,12544,112,1) ***************
+[10/18/2022-03:00:02] [V] [TRT] --------------- Timing Runner: conv1 (CaskConvolution)
+[10/18/2022-03:00:02] [V] [TRT] Tactic Name: sm80_xmma_fprop_a Tactic: 0x0000000000000001 Time: 0.021
+[10/18/2022-03:00:02] [V] [TRT] Tactic Name: sm80_xmma_fprop_b Tactic: 0x0000000000000002 Time: 0.012
+[10/18/2022-03:00:02] [V] [TRT] Fastest Tactic: 0x0000000000000002 Time: 0.012
+[10/18/2022-03:00:02] [V] [TRT] >>>>>>>>>>>>>>> Chose Runner Type: CaskConvolution Tactic: 0x0000000000000002
+[10/18/2022-03:00:04] [V] [TRT] Engine generation completed in 2.5 seconds.
+[10/18/2022-03:00:05] [I] Engine built in 5.1 sec.
+"""
+
+PROFILE_LOG = """\
+[10/18/2022-03:10:00] [I] === Inference Options ===
+[10/18/2022-03:10:00] [I] Batch: Explicit
+[10/18/2022-03:10:00] [I] === Device Information ===
+[10/18/2022-03:10:00] [I] Selected Device: NVIDIA A100
+[10/18/2022-03:10:00] [I] Compute Capability: 8.0
+[10/18/2022-03:10:00] [I] SMs: 108
+[10/18/2022-03:10:00] [I] Compute Clock Rate: 1.41 GHz
+[10/18/2022-03:10:00] [I] Memory Bus Width: 5120 bits (ECC enabled)
+[10/18/2022-03:10:00] [I] Memory Clock Rate: 1.215 GHz
+[10/18/2022-03:10:03] [I] === Performance summary ===
+[10/18/2022-03:10:03] [I] Throughput: 1000.5 qps
+[10/18/2022-03:10:03] [I] Latency: min = 0.9 ms, max = 1.2 ms, mean = 1.0 ms, median = 1.0 ms, percentile(99%) = 1.1 ms
+"""
+
+GRAPH = {
+    "Layers": [{
+        "Name": "conv1", "LayerType": "CaskConvolution", "ParameterType": "Convolution",
+        "Inputs": [{"Name": "input", "Location": "Device", "Dimensions": [1, 3, 224, 224], "Format/Datatype": "Row major linear FP32"}],
+        "Outputs": [{"Name": "output", "Location": "Device", "Dimensions": [1, 16, 112, 112], "Format/Datatype": "Row major linear FP32"}],
+        "TacticValue": "0x0000000000000002",
+    }],
+    "Bindings": ["input", "output"],
+}
+
+def main(argv):
+    args = dict(arg[2:].split("=", 1) for arg in argv if arg.startswith("--") and "=" in arg)
+    start = time.time()
+    if "onnx" in args:
+        stage, engine = "build", args["saveEngine"]
+        with open(args["onnx"], "rb") as f:
+            model = f.read()
+        if model.startswith(b"fail"):
+            print("[E] [TRT] ModelImporter.cpp:726: Failed to parse ONNX model")
+            return 1
+        print(BUILD_LOG.format(onnx=args["onnx"], precision="FP32+FP16" if "--fp16" in argv else "FP32"), end="")
+        with open(engine, "wb") as f:
+            f.write(b"engine:" + model + " ".join(argv).encode())
+    else:
+        stage, engine = "profile", args["loadEngine"]
+        with open(engine, "rb") as f:
+            f.read()
+        print(PROFILE_LOG, end="")
+        with open(args["exportProfile"], "w") as f:
+            json.dump([{"count": 100}, {"name": "conv1", "timeMs": 100., "averageMs": 1., "medianMs": 1., "percentage": 100.}], f)
+        with open(args["exportTimes"], "w") as f:
+            json.dump([{"startEnqMs": 10. * i, "endEnqMs": 10. * i + 0.1, "startComputeMs": 10. * i, "endComputeMs": 10. * i + 1., "latencyMs": 1., "computeMs": 1.} for i in range(10)], f)
+        with open(args["exportLayerInfo"], "w") as f:
+            json.dump(GRAPH, f)
+    time.sleep(max(0., float(os.environ.get("TRTEXEC_STUB_SECONDS", 0)) - (time.time() - start)))
+    calls = os.environ.get("TRTEXEC_STUB_CALLS")
+    if calls:
+        with open(calls, "a") as f:
+            f.write(json.dumps({"stage": stage, "engine": engine, "start": start, "end": time.time()}) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
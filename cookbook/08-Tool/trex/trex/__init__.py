@@ -14,18 +14,61 @@
 # limitations under the License.
 #
 
+import sys
+import importlib
 from trex.df_preprocessing import *
 from trex.misc import *
 from trex.lint import *
 from trex.activations import *
 from trex.engine_plan import *
-# The Jupyter notebook graphing and plotting are
-# not required in a terminal environment.
-from trex.plotting import *
-from trex.notebook import *
-from trex.graphing import *
-from trex.interactive import *
-from trex.report_card import *
-from trex.compare_engines import *
+from trex.multi_compare import *
+from trex.dag import *
+from trex.liveness import *
+from trex.tactics import *
+from trex.build_profile import *
+from trex.batch import *
+from trex.timing_stats import *
+from trex.roofline import *
+from trex.interchange import *
+from trex.regression_db import *
+from trex.layout_chains import *
+from trex.precision_transitions import *
+from trex.onnx_export import *
+# The Jupyter notebook graphing, plotting and reporting modules import heavy
+# packages (plotly, graphviz, ipywidgets, dtale, ...) which are not required
+# in a terminal environment, so they are imported on first access to one of
+# their attributes.
+_LAZY_MODULES = {
+    "plotting": ("NVDA_GREEN", "UNKNOWN_KEY_COLOR", "GRID_COLOR", "default_pallete", "precision_colormap", "layer_colormap", "trex_base_layout", "create_layout", "plotly_bar2", "rotate_columns", "stacked_tabular_df", "stacked_tabular", "stacked_bars", "plotly_hist", "plotly_pie", "plotly_pie2"),
+    "notebook": ("section_header", "set_wide_display", "display_df_qgrid", "display_df_dtale", "display_df", "display_filechooser"),
+    "graphing": ("Region", "Edge", "RegionGenerations", "render_dot", "node_label_simple", "node_label_keras", "node_label_tbl", "parse_operation", "PlanGraph", "precision_formatter", "layer_type_formatter", "tensor_precision_formatter", "region_precision_formatter", "DotGraph", "to_dot", "subgraph_to_dot", "render_dot_pages", "make_onnx_tensor", "OnnxGraph"),
+    "interactive": ("InteractiveDiagram", "InteractiveDiagram_2"),
+    "report_card": ("report_card_perf_overview", "report_card_convolutions_overview", "report_card_table_view", "report_card_memory_footprint", "report_card_draw_plan_graph", "report_card_pointwise_lint", "layer_latency_sunburst", "plot_engine_timings", "report_card_gemm_MNK", "report_card_gemm_MNK_scatter", "report_card_efficiency_vs_latency_3d", "report_card_roofline", "report_card_precision_transitions", "report_card_perf_scatter"),
+    "compare_engines": ("compare_engines_overview", "compare_engines_summaries_tbl", "get_io_dimensions", "get_io_formats", "get_io_precisions", "match_layers", "aligned_merge_plans", "aligned_layers", "speedup_range_highlights", "compare_engines_layer_latencies", "compare_engines_layer_details", "compare_engines_regressions"),
+    "headless_report": ("CAPTURE_RENDERER_NAME", "REPORT_FILE_EXTENSIONS", "ReportItem", "RenderedReports", "capture_report", "REPORT_SECTIONS", "render_report", "plan_summary", "report_to_html", "report_to_json", "write_report", "render_reports"),
+}
+_LAZY_ATTRS = {name: module for module, names in _LAZY_MODULES.items() for name in names}
+
+def __getattr__(name: str):
+    if name in _LAZY_MODULES:
+        return importlib.import_module(f"trex.{name}")
+    try:
+        module = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module 'trex' has no attribute '{name}'")
+    value = getattr(importlib.import_module(f"trex.{module}"), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES) | set(_LAZY_ATTRS))
+
+if sys.version_info < (3, 7):
+    # Module attributes lookup (PEP 562) requires Python 3.7.
+    for _module in _LAZY_MODULES:
+        globals().update({name: getattr(importlib.import_module(f"trex.{_module}"), name) for name in _LAZY_MODULES[_module]})
+
+# `from trex import *` also imports the lazily-imported attributes.
+__all__ = sorted(name for name in set(globals()) | set(_LAZY_ATTRS) if not name.startswith("_"))
 
 __version__ = "0.1.2"
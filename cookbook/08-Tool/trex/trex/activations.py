@@ -18,47 +18,78 @@
 This file contains the Activation class which abstracts plan Region views.
 """
 
+import sys
+import operator
+import functools
+import itertools
 import numpy as np
-from typing import Dict
+from typing import Callable, Dict, Iterable, List, Tuple
 import pandas as pd
 
 # This dictionary compresses JSON's long format description strings.
 _regionFormatDict = {"Four wide channel vectorized row major Int8 format": "Int8 NC/4HW4", "Four wide channel vectorized row major FP32 format": "FP32 NC/4HW4", "Thirty-two wide channel vectorized row major Int8 format": "Int8 NC/32HW32", "Thirty-two wide channel vectorized row major FP32 format": "FP32 NC/32HW32", "Thirty-two wide channel vectorized row major FP16 format": "FP16 NC/32HW32", "Thirty-two wide channel vectorized row major Int8 format with 3 spatial dimensions": "Int8 NC32DHW", "Thirty-two wide channel vectorized row major FP16 format with 3 spatial dimensions": "FP16 NC32DHW", "Sixteen wide channel vectorized row major FP16 format": "FP16 NC16HW", "Channel major FP16 format where channel % 4 == 0": "FP16 NHWC4", "Channel major FP32 format where channel % 4 == 0": "FP32 NHWC4", "Channel major Int8 format where channel % 4 == 0": "Int8 NHWC4", "Channel major FP16 format where channel % 8 == 0": "FP16 NHWC8", "Channel major FP16 format where channel % 16 == 0": "FP16 NHWC16", "Channel major FP16 format where channel == 4 and column stride % 32 == 0": "FP16 NHWC4", "Channel major INT8 format where channel == 4 and column stride % 32 == 0": "Int8 NHWC4", "Channel major INT8 format where column stride % 32 == 0": "Int8 NHWC1", "Row major INT8 format where column stride % 64 == 0": "Int8 NCHW", "Channel major FP16 format where channel % 8 == 0 with 3 spatial dimensions": "FP16 NDHWC8", "Channel major FP16 format where channel == 1 and column stride % 32 == 0": "FP16 NHWC1", "Row major FP16 format where column stride % 64 == 0": "FP16", "Two wide channel vectorized row major FP16 format": "FP16 NC/2HW2", "Row major linear FP32": "FP32 NCHW", "Row major linear Int32": "INT32 NCHW", "Row major linear FP16 format": "FP16 NCHW", "Row major Int8 format": "Int8 NCHW", "Channel major FP32 format": "FP32 NHWC", "Channel major FP16 format": "FP16 NHWC", "Channel major Int8 format": "Int8 NHWC", "Row major linear BOOL": "Bool", "Unknown format": "Unknown format"}
 
+# Interned tensor precisions and their data sizes (bytes).
+PRECISIONS = ("INT8", "FP32", "FP16", "INT32", "BOOL", "Unknown")
+PRECISION_DATA_SIZES = np.array((1, 4, 2, 4, 4, 0), dtype=np.int64)
+
+def parse_tensor_info(desc: str) -> Tuple[str, int]:
+    """Return the precision and data size (bytes) of a short format description"""
+    if "Int8" in desc:
+        precision = "INT8"
+        data_size = 1
+    elif "FP32" in desc:
+        precision = "FP32"
+        data_size = 4
+    elif "FP16" in desc:
+        precision = "FP16"
+        data_size = 2
+    elif "INT32" in desc:
+        precision = "INT32"
+        data_size = 4
+    elif "Bool" in desc:
+        precision = "BOOL"
+        data_size = 4
+    elif desc == "Unknown format":
+        precision = "Unknown"
+        data_size = 0
+    else:
+        raise ValueError(f"Uknown precision {desc}")
+    return precision, data_size
+
+# Cache of parsed "Format/Datatype" descriptions.
+# Maps a JSON format description to (format, precision, data_size).
+_format_info_cache = {}
+
+def parse_format(raw_format: str) -> Tuple[str, str, int]:
+    """Parse a JSON "Format/Datatype" description.
+
+    Plans use only a handful of distinct formats, so the parsing results are
+    cached and the returned strings are shared by all tensors of the same format.
+    """
+    try:
+        return _format_info_cache[raw_format]
+    except KeyError:
+        format = _regionFormatDict.get(raw_format.replace(".", ''), "Unknown format")
+        precision, data_size = parse_tensor_info(format)
+        info = (sys.intern(format), sys.intern(precision), data_size)
+        _format_info_cache[raw_format] = info
+        return info
+
+def volume(shape: List[int]) -> int:
+    return functools.reduce(operator.mul, shape, 1)
+
 class Activation:
     """Convenience class wrapping activation regions."""
 
-    def __init__(self, raw_dict: Dict):
-
-        def parse_tensor_info(desc):
-            if "Int8" in desc:
-                precision = "INT8"
-                data_size = 1
-            elif "FP32" in desc:
-                precision = "FP32"
-                data_size = 4
-            elif "FP16" in desc:
-                precision = "FP16"
-                data_size = 2
-            elif "INT32" in desc:
-                precision = "INT32"
-                data_size = 4
-            elif "Bool" in desc:
-                precision = "BOOL"
-                data_size = 4
-            elif desc == "Unknown format":
-                precision = "Unknown"
-                data_size = 0
-            else:
-                raise ValueError(f"Uknown precision {desc}")
-            return precision, data_size
+    __slots__ = ("name", "shape", "format", "precision", "data_size", "size_bytes", "is_user")
 
+    def __init__(self, raw_dict: Dict):
         self.name = raw_dict["Name"]
         self.shape = raw_dict["Dimensions"]
-        format = raw_dict["Format/Datatype"].replace(".", '')
-        self.format = _regionFormatDict.get(format, "Unknown format")
-        self.precision, self.data_size = parse_tensor_info(self.format)
-        self.size_bytes = np.prod(self.shape) * self.data_size
+        self.format, self.precision, self.data_size = parse_format(raw_dict["Format/Datatype"])
+        self.size_bytes = volume(self.shape) * self.data_size
+        self.is_user = False
 
     def tooltip(self):
         tip = "\\n".join((
@@ -74,3 +105,93 @@ def create_activations(layer: pd.Series):
     inputs = [Activation(tensor) for tensor in layer.Inputs]
     outputs = [Activation(tensor) for tensor in layer.Outputs]
     return inputs, outputs
+
+class TensorTable:
+    """An array-backed table of the inputs and outputs of a list of layers.
+
+    Each row describes one layer port (an input or an output tensor). The
+    tensor formats and precisions are stored as interned codes, and all the
+    tensor sizes are computed in one vectorized pass.
+    """
+
+    def __init__(self, layers: List):
+        """Create the table of the tensors of `layers` (`Layer` objects)"""
+        self._init_rows(len(layers), [(layer.inputs, layer.outputs) for layer in layers], lambda tensor: (tensor.name, tensor.format, tensor.shape), lambda format: format)
+
+    @classmethod
+    def from_raw_layers(cls, inputs: Iterable[List[Dict]], outputs: Iterable[List[Dict]]) -> "TensorTable":
+        """Create the table directly from the raw "Inputs" and "Outputs" lists
+        of the layers (e.g. the dataframe columns), without creating any
+        `Activation`."""
+        table = cls.__new__(cls)
+        layer_tensors = list(zip(inputs, outputs))
+        table._init_rows(len(layer_tensors), layer_tensors, lambda tensor: (tensor["Name"], tensor["Format/Datatype"], tensor["Dimensions"]), lambda raw_format: parse_format(raw_format)[0])
+        return table
+
+    def _init_rows(self, nb_layers: int, layer_tensors: List[Tuple[List, List]], tensor_info: Callable, parse: Callable):
+        """Fill the table from the (inputs, outputs) of each layer.
+
+        `tensor_info` returns the (name, format key, shape) of a tensor, and
+        `parse` translates a format key to a short format description.
+        """
+        names, layer_ids, ports, is_output, formats, shapes = [], [], [], [], [], []
+        for layer_id, (inputs, outputs) in enumerate(layer_tensors):
+            for is_out, tensors in ((False, inputs), (True, outputs)):
+                for port, tensor in enumerate(tensors):
+                    name, format, shape = tensor_info(tensor)
+                    names.append(name)
+                    layer_ids.append(layer_id)
+                    ports.append(port)
+                    is_output.append(is_out)
+                    formats.append(format)
+                    shapes.append(shape)
+
+        self.nb_layers = nb_layers
+        self.names = names
+        self.layer_id = np.array(layer_ids, dtype=np.int64)
+        self.port = np.array(ports, dtype=np.int64)
+        self.is_output = np.array(is_output, dtype=bool)
+        # Intern the formats: each distinct format is assigned a code.
+        format_codes = {}
+        self.format_code = np.array([format_codes.setdefault(f, len(format_codes)) for f in formats], dtype=np.int64)
+        self.formats = [parse(f) for f in format_codes]
+        # Translate format codes to precision codes.
+        format_precisions = np.array([PRECISIONS.index(parse_tensor_info(f)[0]) for f in self.formats], dtype=np.int64)
+        self.precision_code = format_precisions[self.format_code] if len(self.formats) else np.zeros(0, dtype=np.int64)
+        self.rank = np.array([len(shape) for shape in shapes], dtype=np.int64)
+        self.volume = self._volumes(shapes)
+        self.size_bytes = self.volume * PRECISION_DATA_SIZES[self.precision_code]
+
+    def _volumes(self, shapes: List[List[int]]) -> np.ndarray:
+        """Compute the volumes of all the tensors in one pass"""
+        if not shapes:
+            return np.zeros(0, dtype=np.int64)
+        # A trailing 1 makes every segment non-empty (scalars have volume 1).
+        dims = np.fromiter(itertools.chain.from_iterable(itertools.chain(shape, (1, )) for shape in shapes), dtype=np.int64)
+        offsets = np.zeros(len(shapes), dtype=np.int64)
+        np.cumsum(self.rank[:-1] + 1, out=offsets[1:])
+        return np.multiply.reduceat(dims, offsets)
+
+    def __len__(self):
+        return len(self.names)
+
+    def precisions(self) -> np.ndarray:
+        return np.array(PRECISIONS, dtype=object)[self.precision_code]
+
+    def per_layer_sum(self, values: np.ndarray, mask: np.ndarray = None) -> np.ndarray:
+        """Sum `values` of the (masked) tensor rows of each layer"""
+        sums = np.zeros(self.nb_layers, dtype=values.dtype)
+        layer_ids = self.layer_id if mask is None else self.layer_id[mask]
+        values = values if mask is None else values[mask]
+        np.add.at(sums, layer_ids, values)
+        return sums
+
+    def first_port(self, is_output: bool) -> np.ndarray:
+        """Return the row index of port #0 of each layer's inputs (or outputs).
+
+        Layers with no such port are assigned -1.
+        """
+        rows = np.full(self.nb_layers, -1, dtype=np.int64)
+        sel = np.flatnonzero((self.is_output == is_output) & (self.port == 0))
+        rows[self.layer_id[sel]] = sel
+        return rows
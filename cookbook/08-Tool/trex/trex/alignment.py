@@ -0,0 +1,188 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to align the layers of engine plans.
+
+Each layer is assigned a hashable signature and two plans are aligned by
+diffing their sequences of signatures (Myers' O((N+M)D) algorithm with
+linear space), so the alignment of mostly-similar plans is near-linear.
+"""
+
+import weakref
+from typing import Dict, Hashable, List, Optional, Tuple
+from .engine_plan import EnginePlan
+
+def layer_signature(layer_type: str, inputs: List[Dict], outputs: List[Dict], use_all_tensors: bool) -> Tuple:
+    """Returns the heuristic layer signature.
+
+    The signature is composed of the layer's type and the dimensions of its
+    inputs and outputs. The first dimension (batch) of each tensor is not
+    included so that the batch-size is not a cause for a mismatch.
+    For an exact (conservative) matching set `use_all_tensors` to True.
+    To match using only the first input and output, set to False.
+    """
+    if not use_all_tensors:
+        inputs, outputs = inputs[:1], outputs[:1]
+    in_dims = tuple(tuple(t["Dimensions"][1:]) for t in inputs)
+    out_dims = tuple(tuple(t["Dimensions"][1:]) for t in outputs)
+    if layer_type == "PointWise" and len(in_dims) == 2 and len(out_dims) == 1:
+        # Allow the inputs of binary PointWise layers to be connected in
+        # reverse order.
+        in_dims = tuple(sorted(in_dims))
+    return (layer_type, in_dims, out_dims)
+
+# Signatures are computed once per plan and matching mode.
+_signatures_cache = weakref.WeakKeyDictionary()
+
+def plan_signatures(plan: EnginePlan, exact_matching: bool) -> List[Tuple]:
+    """Return the signatures of the plan's layers (in dataframe order)"""
+    plan_cache = _signatures_cache.setdefault(plan, {})
+    try:
+        return plan_cache[exact_matching]
+    except KeyError:
+        df = plan.df
+        signatures = [layer_signature(t, i, o, exact_matching) for t, i, o in zip(df["type"], df["Inputs"], df["Outputs"])]
+        plan_cache[exact_matching] = signatures
+        return signatures
+
+def intern_signatures(*signature_lists: List[Hashable]) -> List[List[int]]:
+    """Map the signatures of several plans to small integers"""
+    codes = {}
+    return [[codes.setdefault(sig, len(codes)) for sig in signatures] for signatures in signature_lists]
+
+def _bisect(a: List[int], b: List[int]) -> Optional[Tuple[int, int]]:
+    """Find the middle snake of the shortest edit script of `a` and `b`.
+
+    Returns the split point (x, y), or None if `a` and `b` have no element
+    in common.
+    """
+    n, m = len(a), len(b)
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2 = v1[:]
+    delta = n - m
+    # If the total number of elements is odd, then the front path will
+    # collide with the reverse path.
+    front = (delta % 2 != 0)
+    # Offsets for start and end of k loop, which prevent mapping of space
+    # beyond the grid.
+    k1start = k1end = k2start = k2end = 0
+    for d in range(max_d):
+        # Walk the front path one step.
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[x1] == b[y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]:
+                        return x1, y1
+        # Walk the reverse path one step.
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[n - x2 - 1] == b[m - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return x1, y1
+    return None
+
+def align_sequences(a: List[Hashable], b: List[Hashable]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Align two sequences.
+
+    Returns a list of index pairs in sequence order: (i, j) for a[i] == b[j],
+    (i, None) for elements only in `a` and (None, j) for elements only in `b`.
+    """
+    pairs = []
+    # A stack of work items: sub-problems (a_lo, a_hi, b_lo, b_hi) to align,
+    # or lists of pairs to emit. Items are pushed in reverse order.
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            pairs.extend(item)
+            continue
+        a_lo, a_hi, b_lo, b_hi = item
+        # Trim the common prefix and suffix.
+        prefix = []
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            prefix.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        suffix = []
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            suffix.append((a_hi, b_hi))
+        suffix.reverse()
+        pairs.extend(prefix)
+
+        split = None
+        if a_lo < a_hi and b_lo < b_hi:
+            split = _bisect(a[a_lo:a_hi], b[b_lo:b_hi])
+        if split is None:
+            # One of the ranges is empty, or the ranges have nothing in common.
+            middle = [(i, None) for i in range(a_lo, a_hi)]
+            middle += [(None, j) for j in range(b_lo, b_hi)]
+            stack.append(suffix)
+            stack.append(middle)
+        else:
+            x, y = split
+            stack.append(suffix)
+            stack.append((a_lo + x, a_hi, b_lo + y, b_hi))
+            stack.append((a_lo, a_lo + x, b_lo, b_lo + y))
+    return pairs
+
+def align_plans(plan1: EnginePlan, plan2: EnginePlan, exact_matching: bool) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Align two plans by the signatures of their layers.
+
+    Returns a list of pairs of dataframe indices (None where a layer has no
+    matching layer in the other plan).
+    """
+    sigs1, sigs2 = intern_signatures(plan_signatures(plan1, exact_matching), plan_signatures(plan2, exact_matching))
+    index1, index2 = plan1.df.index, plan2.df.index
+    return [(index1[i1] if i1 is not None else None, index2[i2] if i2 is not None else None) for i1, i2 in align_sequences(sigs1, sigs2)]
@@ -0,0 +1,236 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to analyze a directory tree of engines in batch.
+
+An engine is discovered from its graph JSON file (`<prefix>graph.json`) and
+the sibling files which share its prefix (`<prefix>profile.json`,
+`<prefix>profile.metadata.json` and `<prefix>build.metadata.json`), as
+written by trtexec and `mainProcess.py`.
+
+The results of each engine are stored in a state file in the output
+directory, keyed by the content hash of the engine's files, so that a batch
+run only processes the engines whose files changed since the previous run.
+"""
+
+import os
+import json
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import pandas as pd
+from .engine_plan import EnginePlan
+from .lint import lint_plan, lint_rules
+from .plan_cache import hash_files, json_default
+
+GRAPH_FILE_SUFFIX = "graph.json"
+STATE_FILE_NAME = "batch.state.json"
+# Bump this whenever the content of the per-engine results changes.
+STATE_FORMAT_VERSION = 1
+
+class EngineFiles(NamedTuple):
+    """The JSON files of one engine (missing files are None)"""
+    name: str
+    graph_file: str
+    profiling_file: Optional[str]
+    profiling_metadata_file: Optional[str]
+    build_metadata_file: Optional[str]
+
+    def files(self) -> List[str]:
+        return [self.graph_file, self.profiling_file, self.profiling_metadata_file, self.build_metadata_file]
+
+class BatchReport(NamedTuple):
+    """The results of a batch run.
+
+    `summary` has one row per engine and `lint` one row per lint hazard.
+    `processed` lists the engines processed in this run, `skipped` the
+    engines whose results were reused, and `failed` maps the engines which
+    could not be processed to their error.
+    """
+    summary: pd.DataFrame
+    lint: pd.DataFrame
+    processed: List[str]
+    skipped: List[str]
+    failed: Dict[str, str]
+
+def discover_engines(root_dir: str) -> List[EngineFiles]:
+    """Find the engines under a directory tree (sorted by name).
+
+    The name of an engine is the path of its files' prefix relative to
+    `root_dir` (e.g. "resnet/fp16" for "resnet/fp16.graph.json"), or the
+    directory path if the prefix is empty (e.g. "resnet" for
+    "resnet/graph.json").
+    """
+    engines = []
+    for dir_path, dir_names, file_names in os.walk(root_dir):
+        dir_names.sort()
+        file_names = set(file_names)
+        for file_name in sorted(file_names):
+            if not file_name.endswith(GRAPH_FILE_SUFFIX):
+                continue
+            prefix = file_name[:-len(GRAPH_FILE_SUFFIX)]
+            if prefix and not prefix.endswith((".", "_", "-")):
+                continue
+
+            def sibling(suffix: str) -> Optional[str]:
+                sibling_name = prefix + suffix
+                return os.path.join(dir_path, sibling_name) if sibling_name in file_names else None
+
+            name = os.path.relpath(os.path.join(dir_path, prefix.rstrip("._-")), root_dir)
+            name = name.replace(os.sep, "/")
+            engines.append(
+                EngineFiles(name, os.path.join(dir_path, file_name), sibling("profile.json"), sibling("profile.metadata.json"), sibling("build.metadata.json")))
+    return sorted(engines, key=lambda engine: engine.name)
+
+def _stat_files(files: List[str]) -> List:
+    stats = []
+    for file_name in files:
+        try:
+            st = os.stat(file_name) if file_name else None
+        except FileNotFoundError:
+            st = None
+        stats.append([st.st_size, st.st_mtime_ns] if st else None)
+    return stats
+
+def summarize_engine(engine: EngineFiles, cache_dir: str = None, linters: List[str] = None) -> Tuple[Dict, List[Dict]]:
+    """Load an engine plan, lint it and summarize it.
+
+    Returns the engine's summary row and its lint hazards (one record per
+    hazard). This function runs in the worker processes of `batch_process`.
+    """
+    plan = EnginePlan(engine.graph_file, engine.profiling_file, engine.profiling_metadata_file, engine.build_metadata_file, name=engine.name, cache_dir=cache_dir)
+    reports = lint_plan(plan, linters)
+    inputs, outputs = plan.get_bindings()
+    summary = OrderedDict([
+        ("engine", engine.name),
+        ("device", plan.device_properties.get("Selected Device")),
+        ("precision", plan.builder_cfg.get("Precision")),
+        ("layers", len(plan.df)),
+        ("latency", plan.total_runtime),
+        ("weights_bytes", plan.total_weights_size),
+        ("activations_bytes", plan.total_act_size),
+        ("inputs", len(inputs)),
+        ("outputs", len(outputs)),
+        ("throughput", plan.performance_summary.get("Throughput")),
+    ])
+    hazards = []
+    for linter, report in reports.items():
+        summary[f"lint.{linter}"] = len(report)
+        for layer_name, row in report.iterrows():
+            hazards.append(OrderedDict([("engine", engine.name), ("linter", linter), ("layer", layer_name), ("hazard", row.get("hazard")), ("mitigation", row.get("mitigation"))]))
+    return summary, hazards
+
+def _summarize_engine_safe(engine: EngineFiles, cache_dir: str, linters: List[str]) -> Tuple[Optional[Dict], Optional[List[Dict]], Optional[str]]:
+    try:
+        summary, hazards = summarize_engine(engine, cache_dir, linters)
+        return summary, hazards, None
+    except Exception:
+        return None, None, traceback.format_exc()
+
+def _load_state(state_file: str, linters: List[str]) -> Dict:
+    try:
+        with open(state_file) as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if state.get("version") != STATE_FORMAT_VERSION or state.get("linters") != linters:
+        return {}
+    return state.get("engines", {})
+
+def _save_state(state_file: str, linters: List[str], engines: Dict):
+    # Write to a temporary file and rename, so that an interrupted run never
+    # leaves a partially-written state file.
+    tmp_path = f"{state_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": STATE_FORMAT_VERSION, "linters": linters, "engines": engines}, f, default=json_default)
+    os.replace(tmp_path, state_file)
+
+def write_batch_report(report: BatchReport, output_dir: str):
+    """Write the summary table, the lint table and a text report"""
+    report.summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+    report.lint.to_csv(os.path.join(output_dir, "lint.csv"), index=False)
+    with open(os.path.join(output_dir, "report.txt"), "w") as f:
+        f.write(f"Engines: {len(report.summary)} ({len(report.processed)} processed, {len(report.skipped)} unchanged, {len(report.failed)} failed)\n\n")
+        if len(report.summary):
+            f.write(report.summary.to_string(index=False) + "\n\n")
+        if len(report.lint):
+            f.write("Lint hazards:\n")
+            f.write(report.lint.groupby(["linter", "hazard"]).size().to_string() + "\n\n")
+        for name, error in report.failed.items():
+            f.write(f"Failed processing {name}:\n{error}\n")
+
+def batch_process(
+    root_dir: str,
+    output_dir: str,
+    max_workers: Optional[int] = None,
+    cache_dir: str = None,
+    linters: List[str] = None,
+    force: bool = False,
+) -> BatchReport:
+    """Load, lint and summarize all the engines under a directory tree.
+
+    The engines are processed in a pool of `max_workers` processes (set to 1
+    to process them serially). Unless `force` is True, the results of
+    engines whose files did not change since the previous run in
+    `output_dir` are reused. A file whose size and modification time did
+    not change is not rehashed. If `cache_dir` is provided, the processed
+    plans are also stored in the plan cache (see `EnginePlan`).
+    """
+    linters = linters or list(lint_rules.keys())
+    os.makedirs(output_dir, exist_ok=True)
+    state_file = os.path.join(output_dir, STATE_FILE_NAME)
+    previous = {} if force else _load_state(state_file, linters)
+
+    engines = discover_engines(root_dir)
+    state, pending, skipped = OrderedDict(), [], []
+    for engine in engines:
+        stats = _stat_files(engine.files())
+        entry = previous.get(engine.name)
+        if entry is not None and entry["stats"] == stats:
+            key = entry["key"]
+        else:
+            key = hash_files(engine.files())
+        if entry is not None and entry["key"] == key and entry["files"] == list(engine.files()):
+            state[engine.name] = {**entry, "stats": stats}
+            skipped.append(engine.name)
+        else:
+            state[engine.name] = {"key": key, "stats": stats, "files": list(engine.files())}
+            pending.append(engine)
+
+    if max_workers == 1 or len(pending) <= 1:
+        results = [_summarize_engine_safe(engine, cache_dir, linters) for engine in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            n = len(pending)
+            results = list(executor.map(_summarize_engine_safe, pending, [cache_dir] * n, [linters] * n))
+
+    failed = OrderedDict()
+    for engine, (summary, hazards, error) in zip(pending, results):
+        if error is not None:
+            # Failed engines are retried in the next run.
+            del state[engine.name]
+            failed[engine.name] = error
+        else:
+            state[engine.name].update(summary=summary, hazards=hazards)
+    _save_state(state_file, linters, state)
+
+    summary = pd.DataFrame([entry["summary"] for entry in state.values()])
+    hazards = pd.DataFrame([hazard for entry in state.values() for hazard in entry["hazards"]], columns=["engine", "linter", "layer", "hazard", "mitigation"])
+    report = BatchReport(summary, hazards, [engine.name for engine in pending if engine.name not in failed], skipped, failed)
+    write_batch_report(report, output_dir)
+    return report
@@ -0,0 +1,95 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to profile the wall time of engine builds.
+
+The build timeline is extracted from a verbose trtexec build log with
+`parseTrtexecLog.parse_build_timeline` (and optionally stored as JSON).
+The wall time between two consecutive build events is attributed to the
+earlier event's activity (e.g. the tactic timing of a layer, or a fusion
+pass). Log timestamps have a resolution of one second, so the attribution
+is only meaningful for activities which take a few seconds or more.
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Union
+import pandas as pd
+from .tactics import tactic_timings_df
+
+class BuildProfile(NamedTuple):
+    """The wall time (seconds) of an engine build, by activity"""
+    total_seconds: float
+    by_category: pd.DataFrame
+    by_layer: pd.DataFrame
+    by_fusion_pass: pd.DataFrame
+    reported_phases: pd.DataFrame
+    events: pd.DataFrame
+
+def build_events_df(timeline: Union[Dict[str, List], str]) -> pd.DataFrame:
+    """Create a dataframe of build events, with the wall time of each event's
+    activity.
+
+    `timeline` is the dictionary returned by `parse_build_timeline`, or the
+    name of a JSON file which stores it.
+    """
+    if isinstance(timeline, str):
+        with open(timeline) as f:
+            timeline = json.load(f)
+    df = pd.DataFrame(timeline, columns=["timestamp", "category", "name", "reported_seconds"])
+    df["seconds"] = (df["timestamp"].shift(-1) - df["timestamp"]).fillna(0)
+    return df
+
+def _wall_time_by(events: pd.DataFrame, category: str, key: str) -> pd.DataFrame:
+    selected = events[events["category"] == category]
+    grouped = selected.groupby("name")["seconds"]
+    df = pd.DataFrame({"seconds": grouped.sum(), "events": grouped.size()})
+    df.index.name = key
+    return df
+
+def profile_build(timeline: Union[Dict[str, List], str], tactic_timings: Union[pd.DataFrame, Dict[str, List], str] = None) -> BuildProfile:
+    """Attribute the wall time of an engine build to build activities.
+
+    The wall time is summed by activity category (tactic timing, fusion,
+    weight conversion, graph optimization, setup and other), by layer (for
+    tactic timing) and by fusion pass. Weight conversion is only seen through
+    TensorRT's warnings about weights which lose precision when converted
+    (see `parse_build_timeline`), so it is not reported for clean builds. If the tactic timings of the build are
+    provided (see `parse_tactic_timings`), the per-layer table also includes
+    the number of tactics timed and their total measured time.
+    Layers are ranked by their tactic-timing wall time.
+    """
+    events = build_events_df(timeline)
+    total_seconds = events["seconds"].sum()
+
+    by_category = events.groupby("category")["seconds"].sum().drop("end", errors="ignore").to_frame()
+    by_category["pct"] = 100. * by_category["seconds"] / total_seconds if total_seconds else 0.
+    by_category = by_category.sort_values("seconds", ascending=False, kind="mergesort")
+
+    by_layer = _wall_time_by(events, "tactic timing", "layer")
+    if tactic_timings is not None:
+        if not isinstance(tactic_timings, pd.DataFrame):
+            tactic_timings = tactic_timings_df(tactic_timings)
+        if not tactic_timings.empty:
+            grouped = tactic_timings.groupby("layer")
+            by_layer["tactics"] = grouped.size()
+            by_layer["measured_time"] = tactic_timings[tactic_timings["valid"]].groupby("layer")["time"].sum()
+    sort_cols = ["seconds", "tactics"] if "tactics" in by_layer.columns else ["seconds"]
+    by_layer = by_layer.sort_values(sort_cols, ascending=False, kind="mergesort")
+
+    by_fusion_pass = _wall_time_by(events, "fusion", "fusion_pass").sort_values("seconds", ascending=False, kind="mergesort")
+    reported_phases = events.loc[events["reported_seconds"].notna(), ["name", "reported_seconds"]].reset_index(drop=True)
+    return BuildProfile(total_seconds, by_category, by_layer, by_fusion_pass, reported_phases, events)
@@ -22,22 +22,16 @@ import copy
 import numpy as np
 from typing import List
 from functools import partial
-from matplotlib.pyplot import colormaps
 from .engine_plan import EnginePlan
 from .misc import group_count, group_sum_attr
 from .plotting import *
 from .interactive import *
 from .misc import stack_dicts
 from .activations import create_activations
+from .alignment import align_plans
+from .multi_compare import *
 from .engine_plan import summary_dict
 
-def get_plans_names(plans: List[EnginePlan]):
-    """Create unique plans names"""
-    engine_names = [plan.name for plan in plans]
-    if len(set(engine_names)) != len(plans):
-        engine_names = [plan.name + str(i) for i, plan in enumerate(plans)]
-    return engine_names
-
 def compare_engines_overview(plans: List[EnginePlan]):
     """A dropdown widget to choose from several diagrams
     that compare 2 or more engine plans.
@@ -205,103 +199,11 @@ def match_layers(plan1: EnginePlan, plan2: EnginePlan, exact_matching: bool) ->
     compared.
 
     Aligining two plans is the task of finding pairs of layers with the same
-    signature.
+    signature. The sequences of layer signatures are diffed (see `alignment.py`),
+    which is near-linear for plans with few differences.
     This function returns a list of index pairs.
     """
-
-    def signature(layer: pd.Series, exact: bool) -> Dict:
-        """Returns the heuristic layer signature.
-
-        The signature is composed of the layer's type and dimensions.
-        """
-        sig = get_io_dimensions(layer, exact)
-        sig["type"] = layer["type"]
-        return sig
-
-    def clamp_indexes(i1: int, i2: int) -> Tuple:
-        i1 = min(i1, len(plan1.df) - 1)
-        i2 = min(i2, len(plan2.df) - 1)
-        return i1, i2
-
-    def are_equal(s1: Dict, s2: Dict) -> bool:
-        assert list(s1.keys()) == list(s2.keys()), "Internal error: signature are corrupt"
-        for k in s1.keys():
-            if s1[k] != s2[k]:
-                return False
-        return True
-
-    def is_aligned(i1: int, i2: int, exact_matching: bool) -> bool:
-        """Return True if row `i1` of plan1 is aligned
-        with row `i2` of plan2. """
-
-        def pointwise_same(s1: Dict, s2: Dict):
-            """Special signatures comparison for pointwise layers.
-
-            When comparing PointWise layers allow the inputs to be connected in
-            reverse order."""
-            same = False
-            types_ok = s1["type"] == s2["type"] == "PointWise"
-            in_lengths_ok = len(s1["inputs"]) == 2 and len(s2["inputs"]) == 2
-            out_lengths_ok = len(s1["outputs"]) == 1 and len(s2["outputs"]) == 1
-            if types_ok and in_lengths_ok and out_lengths_ok:
-                same = s1["inputs"][0] == s2["inputs"][1] and s1["inputs"][1] == s2["inputs"][0]
-            return same
-
-        i1, i2 = clamp_indexes(i1, i2)
-        s1 = signature(plan1.df.loc[i1], exact_matching)
-        s2 = signature(plan2.df.loc[i2], exact_matching)
-        aligned = are_equal(s1, s2)
-        if not aligned:
-            aligned = pointwise_same(s1, s2)
-        return aligned
-
-    def beam_search(beam_size, unprocessed_indices, list_id):
-        """Shine a search beam and look for a match in the other list.
-        """
-        i1 = unprocessed_indices[0][0]
-        i2 = unprocessed_indices[1][0]
-        for s in range(beam_size):
-            # clamp
-            idx = min(s, len(unprocessed_indices[list_id]) - 1)
-            if list_id == 1:
-                i2 = unprocessed_indices[list_id][idx]
-            else:
-                i1 = unprocessed_indices[list_id][idx]
-            if is_aligned(i1, i2, exact_matching):
-                return i1, i2
-        if list_id == 1:
-            return i1, None
-        else:
-            return None, i2
-
-    def debug_print(i1: int, i2: int):
-        return  # disable print
-        t1 = plan1.df.loc[i1]["type"] if i1 is not None else "None"
-        t2 = plan2.df.loc[i2]["type"] if i2 is not None else "None"
-        print(f"{i1}: {t1}  {i2}: {t2}")
-
-    matched_indices_pairs = []
-    unprocessed_indices_1 = [*range(len(plan1.df))]
-    unprocessed_indices_2 = [*range(len(plan2.df))]
-    while unprocessed_indices_1 and unprocessed_indices_2:
-        beam_size = max(len(unprocessed_indices_1), len(unprocessed_indices_2))
-        for list_id in (1, 0):
-            i1, i2 = beam_search(beam_size, (unprocessed_indices_1, unprocessed_indices_2), list_id)
-            debug_print(i1, i2)
-            matched_indices_pairs.append((i1, i2))
-            if i1 is not None:
-                unprocessed_indices_1.remove(i1)
-            if i2 is not None:
-                unprocessed_indices_2.remove(i2)
-            if not unprocessed_indices_1 or not unprocessed_indices_2:
-                break
-
-    # Process "left-over" layers
-    for i1 in unprocessed_indices_1:
-        matched_indices_pairs.append((i1, None))
-    for i2 in unprocessed_indices_2:
-        matched_indices_pairs.append((None, i2))
-    return matched_indices_pairs
+    return align_plans(plan1, plan2, exact_matching)
 
 def aligned_merge_plans(plan1: EnginePlan, plan2: EnginePlan, matched_indices_pairs: List[Tuple]) -> pd.DataFrame:
     """Return a dataframe containing merged layers from the two plans, after
@@ -438,7 +340,7 @@ def compare_engines_layer_latencies(plan1: EnginePlan, plan2: EnginePlan, thresh
         layer_type = None if choice == "All" else choice
         df1, df2 = aligned_layers(plan1, plan2, matched_indices_pairs, layer_type)
 
-        latency_str = lambda name, df: f"\n\t{name}: {df["latency.avg_time"].sum():.3f} ms"
+        latency_str = lambda name, df: f"\n\t{name}: {df['latency.avg_time'].sum():.3f} ms"
         print(f"Latencies:{latency_str(plan1.name, df1)}{latency_str(plan2.name, df2)}")
 
         d = {plan1.name: df1, plan2.name: df2}
@@ -491,5 +393,38 @@ def compare_engines_layer_details(
 
     matched_indices_pairs = match_layers(plan1, plan2, exact_matching=True)
     df = aligned_merge_plans(plan1, plan2, matched_indices_pairs)
-    dropdown_choices = {f"{t}: {df.iloc[t]["type"]}": t for t in range(len(df))}
+    dropdown_choices = {f"{t}: {df.iloc[t]['type']}": t for t in range(len(df))}
     InteractiveDiagram(render_diagram, dropdown_choices, "Dataframe")
+
+def compare_engines_regressions(plans: List[EnginePlan], reference_id: int = 0, threshold: float = 0.03, exact_matching: bool = True, top_k: int = 10):
+    """A dropdown widget to choose from several diagrams that compare the
+    per-layer latencies of 2 or more engine plans to a reference plan.
+    """
+    c = compare_plans(plans, reference_id=reference_id, exact_matching=exact_matching, top_k=top_k)
+    others = [name for name in c.latencies.columns[2:] if name != c.reference]
+
+    def summary_tbl(title: str):
+        print(f"\'speedup\' refers to the speedup of each engine relative to \"{c.reference}\"")
+        display_df(c.summary.reset_index(), range_highlights=speedup_range_highlights(col_name="speedup", threshold=threshold))
+
+    def speedups_tbl(title: str):
+        display_df(c.speedups)
+
+    def deltas_tbl(title: str):
+        display_df(c.deltas)
+
+    def top_regressors_tbl(title: str):
+        display_df(c.top_regressors)
+
+    def speedup_histograms(title: str):
+        d = {name: pd.DataFrame({"speedup": c.histograms.index.astype(str), "count": c.histograms[name].values}) for name in others}
+        plotly_bar2(title="Layer Speedup Histogram", df=d, values_col="count", names_col="speedup", orientation="v", showlegend=True)
+
+    dropdown_choices = {
+        "Summary": summary_tbl,
+        "Top regressors": top_regressors_tbl,
+        "Layer speedup histogram": speedup_histograms,
+        "Layer speedups": speedups_tbl,
+        "Layer latency deltas": deltas_tbl,
+    }
+    InteractiveDiagram_2(dropdown_choices, 'Diagram:')
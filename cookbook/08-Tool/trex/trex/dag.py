@@ -0,0 +1,372 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains the layer DAG of an engine plan, code to extract
+subgraphs (sub-plans) of the DAG, and critical-path and bottleneck analysis.
+
+A sub-plan has the same attributes as an EnginePlan that the graphing code
+uses (`layers`, `all_layers`, `bindings` and `df`), so it can be rendered
+with `to_dot`.
+"""
+
+import re
+from collections import deque
+from typing import Iterable, List, NamedTuple, Sequence, Set, Tuple
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .layer import Layer
+
+class SubPlan(NamedTuple):
+    name: str
+    layers: List[Layer]
+    all_layers: List[Layer]
+    bindings: List[str]
+    df: pd.DataFrame
+
+class WhatIf(NamedTuple):
+    """A what-if speedup estimate (latencies in ms)"""
+    layers: int
+    total_latency: float
+    new_total_latency: float
+    speedup: float
+    critical_path_latency: float
+    new_critical_path_latency: float
+    critical_path_speedup: float
+
+class LayerDAG:
+    """The layers dependency graph of an engine plan.
+
+    Nodes are layer ids (positions in `layers`) and an edge connects the
+    producer of a tensor to each of its consumers.
+    """
+
+    def __init__(self, plan: EnginePlan, include_constants: bool = False):
+        self.plan = plan
+        self.layers = plan.all_layers if include_constants else plan.layers
+        self.ids = {}
+        for i, layer in enumerate(self.layers):
+            self.ids.setdefault(layer.name, i)
+
+        producers = {}
+        for i, layer in enumerate(self.layers):
+            for outp in layer.outputs:
+                producers.setdefault(outp.name, []).append(i)
+        self.preds = [[] for _ in self.layers]
+        self.succs = [[] for _ in self.layers]
+        for i, layer in enumerate(self.layers):
+            preds = []
+            for inp in layer.inputs:
+                for p in producers.get(inp.name, ()):
+                    if p != i and p not in preds:
+                        preds.append(p)
+            self.preds[i] = preds
+            for p in preds:
+                self.succs[p].append(i)
+
+        latencies = {}
+        try:
+            for name, latency in zip(plan.df["Name"], plan.df["latency.avg_time"]):
+                latencies.setdefault(name, latency)
+        except KeyError:
+            pass
+        # Layers without a latency (e.g. Constants) take no time.
+        self.latency = np.array([latencies.get(layer.name, 0.) for layer in self.layers], dtype=float)
+        self.order = self._topological_order()
+
+    def __len__(self):
+        return len(self.layers)
+
+    def _topological_order(self) -> List[int]:
+        nb_preds = [len(p) for p in self.preds]
+        ready = deque(i for i, n in enumerate(nb_preds) if n == 0)
+        order = []
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for s in self.succs[i]:
+                nb_preds[s] -= 1
+                if nb_preds[s] == 0:
+                    ready.append(s)
+        if len(order) != len(self.layers):
+            # A cycle (e.g. through an in-place region). Fall back to the
+            # plan order for the layers on the cycle.
+            visited = set(order)
+            order += [i for i in range(len(self.layers)) if i not in visited]
+        return order
+
+    def find(self, layer_name: str) -> int:
+        """Return the id of a layer, given its name"""
+        try:
+            return self.ids[layer_name]
+        except KeyError:
+            raise ValueError(f"Layer {layer_name} is not in the plan")
+
+    def neighborhood(self, layer_names: Iterable[str], hops: int) -> Set[int]:
+        """Return the ids of the layers within `hops` edges of the given layers
+        (in either direction)."""
+        visited = {self.find(name) for name in layer_names}
+        frontier = list(visited)
+        for _ in range(hops):
+            next_frontier = []
+            for i in frontier:
+                for j in self.preds[i] + self.succs[i]:
+                    if j not in visited:
+                        visited.add(j)
+                        next_frontier.append(j)
+            frontier = next_frontier
+        return visited
+
+    def scope_mask(self, node_ids: Iterable[int] = None) -> np.ndarray:
+        """Return a boolean mask of the layers in `node_ids` (default: all layers)"""
+        if node_ids is None:
+            return np.ones(len(self.layers), dtype=bool)
+        in_scope = np.zeros(len(self.layers), dtype=bool)
+        in_scope[list(node_ids)] = True
+        return in_scope
+
+    def _longest_paths(self, latency: np.ndarray, in_scope: np.ndarray) -> Tuple[np.ndarray, List[int]]:
+        """Return the earliest finish time of each layer (when independent
+        layers execute concurrently), and its critical predecessor."""
+        finish = np.zeros(len(self.layers))
+        best_pred = [-1] * len(self.layers)
+        for i in self.order:
+            if not in_scope[i]:
+                continue
+            start = 0.
+            for p in self.preds[i]:
+                if in_scope[p] and finish[p] > start:
+                    start, best_pred[i] = finish[p], p
+            finish[i] = start + latency[i]
+        return finish, best_pred
+
+    def critical_path(self, node_ids: Iterable[int] = None) -> List[int]:
+        """Return the ids of the layers on the latency-weighted longest path
+        (of the subgraph `node_ids`, if provided)"""
+        in_scope = self.scope_mask(node_ids)
+        if not in_scope.any():
+            return []
+        finish, best_pred = self._longest_paths(self.latency, in_scope)
+        path, i = [], int(np.argmax(np.where(in_scope, finish, -1)))
+        while i != -1:
+            path.append(i)
+            i = best_pred[i]
+        return path[::-1]
+
+    def schedule(self) -> pd.DataFrame:
+        """Return a dataframe of the earliest start and finish time of each
+        layer, its slack and its fan-in/fan-out.
+
+        Times are computed as if independent layers executed concurrently.
+        The slack of a layer is the time it can be delayed without delaying
+        the end of the critical path; layers on the critical path have no
+        slack.
+        """
+        finish, _ = self._longest_paths(self.latency, self.scope_mask())
+        makespan = finish.max() if len(finish) else 0.
+        latest_finish = np.full(len(self.layers), makespan)
+        for i in reversed(self.order):
+            for s in self.succs[i]:
+                latest_finish[i] = min(latest_finish[i], latest_finish[s] - self.latency[s])
+        slack = np.maximum(latest_finish - finish, 0.)
+        return pd.DataFrame({
+            "Name": [layer.name for layer in self.layers],
+            "type": [layer.type for layer in self.layers],
+            "latency.avg_time": self.latency,
+            "start": finish - self.latency,
+            "finish": finish,
+            "slack": slack,
+            "critical": np.isclose(slack, 0.),
+            "fan_in": [len(p) for p in self.preds],
+            "fan_out": [len(s) for s in self.succs],
+        })
+
+    def hotspots(self, k: int = 10) -> pd.DataFrame:
+        """Return the `k` layers with the largest fan-in plus fan-out
+        (ties are broken by latency)."""
+        df = self.schedule()
+        df["fan"] = df["fan_in"] + df["fan_out"]
+        return df.sort_values(["fan", "latency.avg_time"], ascending=False, kind="mergesort").head(k)
+
+    def what_if(self, faster_pct: float, layer_names: Iterable[str] = None, layer_type: str = None, node_ids: Iterable[int] = None) -> WhatIf:
+        """Estimate the best-case speedup if some layers were `faster_pct`
+        percent faster (i.e. their latency reduced by `faster_pct`%).
+
+        The affected layers are chosen by name and/or by type. The estimate
+        is computed for the subgraph `node_ids` (default: the entire plan),
+        both for serial execution (sum of latencies, Amdahl's law) and for
+        the critical path (which may move to other layers).
+        """
+        in_scope = self.scope_mask(node_ids)
+        affected = np.zeros(len(self.layers), dtype=bool)
+        if layer_names is not None:
+            affected[[self.find(name) for name in layer_names]] = True
+        if layer_type is not None:
+            affected |= np.array([layer.type == layer_type for layer in self.layers], dtype=bool)
+        affected &= in_scope
+        new_latency = np.where(affected, self.latency * (1. - faster_pct / 100.), self.latency)
+
+        def critical_path_latency(latency: np.ndarray) -> float:
+            finish, _ = self._longest_paths(latency, in_scope)
+            return finish.max() if len(finish) else 0.
+
+        def speedup(before: float, after: float) -> float:
+            return before / after if after > 0 else np.inf
+
+        total, new_total = self.latency[in_scope].sum(), new_latency[in_scope].sum()
+        cp, new_cp = critical_path_latency(self.latency), critical_path_latency(new_latency)
+        return WhatIf(int(affected.sum()), total, new_total, speedup(total, new_total), cp, new_cp, speedup(cp, new_cp))
+
+    def what_if_by_type(self, faster_pct: float, node_ids: Iterable[int] = None) -> pd.DataFrame:
+        """Estimate the best-case speedup of making each layer type
+        `faster_pct` percent faster (see `what_if`)."""
+        types = sorted(set(layer.type for layer in self.layers))
+        estimates = [self.what_if(faster_pct, layer_type=t, node_ids=node_ids)._asdict() for t in types]
+        df = pd.DataFrame(estimates, index=pd.Index(types, name="type"))
+        return df.sort_values("speedup", ascending=False, kind="mergesort")
+
+    def top_k(self, k: int, context_hops: int = 0) -> Set[int]:
+        """Return the ids of the `k` slowest layers, and of the layers within
+        `context_hops` edges of them."""
+        slowest = np.argsort(-self.latency, kind="stable")[:k]
+        return self.neighborhood([self.layers[i].name for i in slowest], context_hops)
+
+    def matching(self, pattern: str) -> Set[int]:
+        """Return the ids of the layers whose name matches a regular expression"""
+        regex = re.compile(pattern)
+        return {i for i, layer in enumerate(self.layers) if regex.search(layer.name)}
+
+    def pages(self, node_ids: Iterable[int] = None, page_size: int = 500, overlap: int = 0) -> List[List[int]]:
+        """Split layers into pages of (up to) `page_size` layers, in topological
+        order. Consecutive pages share `overlap` layers, for context."""
+        assert 0 <= overlap < page_size
+        selected = None if node_ids is None else set(node_ids)
+        order = [i for i in self.order if selected is None or i in selected]
+        step = page_size - overlap
+        return [order[start:start + page_size] for start in range(0, max(len(order) - overlap, 1), step)]
+
+    def collapsible_chains(self, node_ids: Set[int], collapse_types: Sequence[str], max_latency: float = None, min_length: int = 2) -> List[List[int]]:
+        """Find chains of cheap layers which can be collapsed to a single node.
+
+        A chain is a path of layers of one of `collapse_types` (each taking at
+        most `max_latency` ms), where every layer except the last has a single
+        output and a single consumer, and every layer except the first has a
+        single producer.
+        """
+
+        def is_cheap(i: int) -> bool:
+            cheap = self.layers[i].type in collapse_types
+            return cheap and (max_latency is None or self.latency[i] <= max_latency)
+
+        def preds(i: int) -> List[int]:
+            return [p for p in self.preds[i] if p in node_ids]
+
+        def links_to_next(i: int) -> bool:
+            s = self.succs[i]
+            single_output = len(self.layers[i].outputs) == 1 and self.layers[i].outputs[0].name not in bindings
+            return single_output and len(s) == 1 and s[0] in node_ids and len(preds(s[0])) == 1 and is_cheap(s[0])
+
+        bindings = set(self.plan.bindings)
+        chains = []
+        for i in self.order:
+            if i not in node_ids or not is_cheap(i):
+                continue
+            p = preds(i)
+            if len(p) == 1 and links_to_next(p[0]) and is_cheap(p[0]):
+                # Not the head of a chain.
+                continue
+            chain = [i]
+            while links_to_next(chain[-1]):
+                chain.append(self.succs[chain[-1]][0])
+            if len(chain) >= min_length:
+                chains.append(chain)
+        return chains
+
+    def subplan(
+        self,
+        node_ids: Iterable[int],
+        name: str = None,
+        collapse_types: Sequence[str] = None,
+        max_collapse_latency: float = None,
+    ) -> SubPlan:
+        """Create a sub-plan from a set of layers.
+
+        Tensors crossing the boundary of the sub-plan become bindings of the
+        sub-plan. If `collapse_types` is provided, chains of cheap layers of
+        these types are collapsed into summary nodes.
+        """
+        node_ids = set(node_ids)
+        chains = [] if not collapse_types else self.collapsible_chains(node_ids, collapse_types, max_collapse_latency)
+        collapsed = {}
+        for chain in chains:
+            collapsed[chain[0]] = self._summary_layer(chain)
+            for i in chain[1:]:
+                collapsed[i] = None
+
+        layers, names = [], set()
+        for i in sorted(node_ids):
+            layer = collapsed.get(i, self.layers[i])
+            if layer is not None:
+                layers.append(layer)
+                names.add(layer.name)
+
+        produced, consumed = set(), set()
+        for layer in layers:
+            produced.update(t.name for t in layer.outputs)
+            consumed.update(t.name for t in layer.inputs)
+        bindings = set(self.plan.bindings)
+        bindings.update(consumed - produced)
+        bindings.update(self._escaping_tensors(node_ids))
+
+        df = self.plan.df[self.plan.df["Name"].isin(names)]
+        summary_rows = [{
+            "Name": collapsed[chain[0]].name,
+            "type": "Collapsed",
+            "latency.avg_time": self.latency[chain].sum()
+        } for chain in chains]
+        if summary_rows:
+            df = pd.concat([df, pd.DataFrame(summary_rows)], ignore_index=True)
+        layers_no_constants = [layer for layer in layers if layer.type != "Constant"]
+        return SubPlan(name or self.plan.name, layers_no_constants, layers, sorted(bindings), df)
+
+    def _escaping_tensors(self, node_ids: Set[int]) -> Set[str]:
+        """Tensors produced inside the sub-plan and consumed outside of it"""
+        escaping = set()
+        for i in node_ids:
+            for s in self.succs[i]:
+                if s not in node_ids:
+                    consumed = {t.name for t in self.layers[s].inputs}
+                    escaping.update(t.name for t in self.layers[i].outputs if t.name in consumed)
+        return escaping
+
+    def _summary_layer(self, chain: List[int]) -> Layer:
+        first, last = self.layers[chain[0]], self.layers[chain[-1]]
+        types = sorted(set(self.layers[i].type for i in chain))
+        # Inputs of the chain layers which are not produced inside the chain.
+        internal = {self.layers[i].outputs[0].name for i in chain[:-1]}
+        inputs = [t for i in chain for t in self.layers[i].inputs if t.name not in internal]
+        raw_dict = {
+            "Name": f"{len(chain)} layers ({', '.join(types)}): {first.name} .. {last.name}",
+            "LayerType": "Collapsed",
+            "Inputs": first.raw_dict["Inputs"],
+            "Outputs": last.raw_dict["Outputs"],
+            "CollapsedLayers": [self.layers[i].name for i in chain],
+        }
+        summary = Layer(raw_dict)
+        # Use the (NoOp-folded) tensors of the plan layers.
+        summary.inputs, summary.outputs = inputs, list(last.outputs)
+        return summary
@@ -18,7 +18,9 @@
 This file contains raw JSON dataframes preprocessing functions.
 """
 
+import numpy as np
 import pandas as pd
+from typing import Dict
 from .activations import *
 
 layer_attributes = {
@@ -154,7 +156,8 @@ def __fix_columns_types(df: pd.DataFrame):
     df.fillna("", inplace=True)
 
 def __fix_output_precision(df: pd.DataFrame):
-    df["output_precision"] = [Activation(outputs[0]).precision for outputs in df["Outputs"]]
+    # parse_format is memoized, so this does not create Activation objects.
+    df["output_precision"] = [parse_format(outputs[0]["Format/Datatype"])[1] if len(outputs) else None for outputs in df["Outputs"]]
 
 def fix_df(df: pd.DataFrame):
     """One-time preprocessing of the DF.
@@ -168,14 +171,50 @@ def fix_df(df: pd.DataFrame):
     return df
 
 def clean_io(df: pd.DataFrame):
-    for index, layer in df.iterrows():
-        inputs, outputs = create_activations(layer)
-        if len(inputs) > 0:
-            inp_str = ", ".join([inp.format for inp in inputs])
-            df.loc[index, "Inputs"] = inp_str
-        df.loc[index, "Outputs"] = outputs[0].format
 
-def filter_by_layer(df: pd.DataFrame, layer_type: str):
+    def tensor_format(tensor: Dict) -> str:
+        return parse_format(tensor["Format/Datatype"])[0]
+
+    df["Inputs"] = [", ".join([tensor_format(inp) for inp in inputs]) if len(inputs) > 0 else inputs for inputs in df["Inputs"]]
+    df["Outputs"] = [tensor_format(outputs[0]) for outputs in df["Outputs"]]
+
+def io_attributes(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the attributes of the first input and first output of each layer.
+
+    The returned dataframe has the same index as `df`, and columns
+    in.format, in.shape, in.rank, in.channels (and the same for "out").
+    Channels are the size of dimension #1, or 0 for tensors of rank < 2.
+    """
+
+    def tensor_attributes(tensors_col: pd.Series):
+        formats, shapes = [], []
+        for tensors in tensors_col:
+            if len(tensors) > 0:
+                formats.append(parse_format(tensors[0]["Format/Datatype"])[0])
+                shapes.append(tensors[0]["Dimensions"])
+            else:
+                formats.append("")
+                shapes.append([])
+        ranks = [len(shape) for shape in shapes]
+        channels = [shape[1] if rank >= 2 else 0 for shape, rank in zip(shapes, ranks)]
+        return formats, shapes, ranks, channels
+
+    attrs = pd.DataFrame(index=df.index)
+    for prefix, col in (("in", "Inputs"), ("out", "Outputs")):
+        formats, shapes, ranks, channels = tensor_attributes(df[col])
+        attrs[f"{prefix}.format"] = formats
+        attrs[f"{prefix}.shape"] = shapes
+        attrs[f"{prefix}.rank"] = pd.Series(ranks, index=df.index, dtype="int64")
+        attrs[f"{prefix}.channels"] = pd.Series(channels, index=df.index, dtype="int64")
+    return attrs
+
+def filter_by_layer(df: pd.DataFrame, layer_type: str, rows: np.ndarray = None):
+    """Return a copy of the layers of type `layer_type`, with their type-specific
+    attributes.
+
+    `rows` are the positions of the layers in `df` (see
+    `EnginePlan.layer_type_rows`); they are searched for if not provided.
+    """
     copy_cols = ["Name", "type", "precision", "tactic", "latency.pct_time", "latency.avg_time", "total_io_size_bytes", "total_footprint_bytes", "Inputs", "Outputs", "subtype"]
     try:
         attrs = layer_attributes[layer_type]
@@ -187,12 +226,13 @@ def filter_by_layer(df: pd.DataFrame, layer_type: str):
     except KeyError:
         pass
 
-    layers = df.query(f"type == \"{layer_type}\"").copy()
-    if len(layers) == 0:
-        return layers
+    if rows is None:
+        rows = np.flatnonzero(df["type"].to_numpy() == layer_type)
+    if len(rows) == 0:
+        return df.iloc[:0].copy()
 
-    copy_cols = set(copy_cols) & set(layers.columns)
-    layers = layers[copy_cols]
+    copy_cols = set(copy_cols)
+    layers = df.iloc[rows, [i for i, col in enumerate(df.columns) if col in copy_cols]].copy()
 
     if layer_type == "Convolution":
         layers.rename(columns=layer_attributes[layer_type], inplace=True)
@@ -244,37 +284,37 @@ def clean_for_display(df: pd.DataFrame):
 
 def annotate_convolutions(convs: pd.DataFrame):
     """Convolutions as implicit GEMM"""
-    for index, conv in convs.iterrows():
-        inputs, outputs = create_activations(conv)
+    if len(convs) == 0:
+        return
+    input_shapes, output_shapes, input_sizes, output_sizes = [], [], [], []
+    for inputs, outputs in zip(convs["Inputs"], convs["Outputs"]):
         assert len(inputs) > 0
-        N, C, H, W = inputs[0].shape
-        # K: number of channels; P: Height; Q: Width
-        _, K, P, Q = outputs[0].shape
-        R, S = convs.loc[index, "attr.kernel"]
-        G = convs.loc[index, "attr.groups"]
-        weights_vol = (K * C * R * S) / G
-        input_vol = N * C * H * W
-        output_vol = N * K * P * Q
-        input_bytes = input_vol * inputs[0].data_size
-        output_bytes = output_vol * outputs[0].data_size
-        weights_bytes = weights_vol * inputs[0].data_size
-        nb_bytes = input_bytes + weights_bytes + output_bytes
-        nb_macs = N * K * P * Q * C * R * S / G
-        convs.loc[index, "attr.macs"] = nb_macs
-        # Arithmetic intensity: ops/bytes
-        convs.loc[index, "attr.arithmetic_intensity"] = nb_macs / nb_bytes
-        latency = convs.loc[index, "latency.avg_time"]
-        convs.loc[index, "attr.compute_efficiency"] = nb_macs / latency
-        convs.loc[index, "attr.memory_efficiency"] = nb_bytes / latency
-        # Conversion to matrices (M, K) * (K, N)
-        M = N * P * Q
-        N = K
-        K = C * R * S
-        convs.loc[index, "attr.M"] = M
-        convs.loc[index, "attr.N"] = N
-        convs.loc[index, "attr.K"] = K
-
-    convs["attr.macs"] = convs["attr.macs"].astype("int64")
-    convs["attr.M"] = convs["attr.M"].astype("int64")
-    convs["attr.N"] = convs["attr.N"].astype("int64")
-    convs["attr.K"] = convs["attr.K"].astype("int64")
+        input_shapes.append(inputs[0]["Dimensions"])
+        output_shapes.append(outputs[0]["Dimensions"])
+        input_sizes.append(parse_format(inputs[0]["Format/Datatype"])[2])
+        output_sizes.append(parse_format(outputs[0]["Format/Datatype"])[2])
+    N, C, H, W = np.array(input_shapes, dtype=np.float64).T
+    # K: number of channels; P: Height; Q: Width
+    _, K, P, Q = np.array(output_shapes, dtype=np.float64).T
+    R, S = np.array(list(convs["attr.kernel"]), dtype=np.float64).T
+    G = convs["attr.groups"].to_numpy(dtype=np.float64)
+    input_size, output_size = np.array(input_sizes), np.array(output_sizes)
+    weights_vol = (K * C * R * S) / G
+    input_vol = N * C * H * W
+    output_vol = N * K * P * Q
+    input_bytes = input_vol * input_size
+    output_bytes = output_vol * output_size
+    weights_bytes = weights_vol * input_size
+    nb_bytes = input_bytes + weights_bytes + output_bytes
+    nb_macs = N * K * P * Q * C * R * S / G
+    convs["attr.macs"] = nb_macs.astype("int64")
+    # Arithmetic intensity: ops/bytes
+    convs["attr.arithmetic_intensity"] = nb_macs / nb_bytes
+    latency = convs["latency.avg_time"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        convs["attr.compute_efficiency"] = nb_macs / latency
+        convs["attr.memory_efficiency"] = nb_bytes / latency
+    # Conversion to matrices (M, K) * (K, N)
+    convs["attr.M"] = (N * P * Q).astype("int64")
+    convs["attr.N"] = K.astype("int64")
+    convs["attr.K"] = (C * R * S).astype("int64")
@@ -19,15 +19,18 @@ TensorRT Engine Exploration API - EnginePlan
 """
 
 import warnings
-from typing import List, Tuple
-from copy import deepcopy
+from typing import Dict, List, Tuple
+import numpy as np
 import pandas as pd
 import ntpath
 from .df_preprocessing import *
-from .layer import Layer, fold_no_ops
+from .layer import Layer, constants_size, fold_no_ops
 from .parser import *
+from .plan_cache import PlanCache
 
 class EnginePlan:
+    # Plan attributes which are stored in the plan cache, besides the dataframe.
+    _cached_attrs = ("bindings", "_raw_perf", "total_act_size", "total_weights_size", "total_runtime", "device_properties", "performance_summary", "builder_cfg")
 
     def __init__(
         self,
@@ -36,23 +39,47 @@ class EnginePlan:
         profiling_metadata_file: str = None,
         build_metadata_file: str = None,
         name: str = None,
+        cache_dir: str = None,
     ):
+        """Create an EnginePlan from the JSON files exported by trtexec.
+
+        If `cache_dir` is provided, the processed plan is stored in (and later
+        loaded from) a cache keyed by the contents of the input files.
+        """
 
         def path_leaf(path):
             head, tail = ntpath.split(path)
             return tail or ntpath.basename(head)
 
-        def create_layers(self, raw_layers):
-            layers = [Layer(raw_layer) for raw_layer in raw_layers]
-            self.layers = fold_no_ops(layers, self.bindings)
-            self.all_layers = deepcopy(self.layers)
-            self.layers = [layer for layer in self.layers if layer.type != "Constant"]
-            return raw_layers
+        def import_layers(graph_file):
+            """Stream the graph file and build the dataframe columns in one pass."""
+            reader = GraphFileReader(graph_file)
+            raw_layers, ignore_layers = [], []
+            columns, nb_rows = {}, 0
+            for raw_layer in iter_graph_file(reader):
+                raw_layers.append(raw_layer)
+                if raw_layer["LayerType"] in ["Constant", "NoOp"]:
+                    ignore_layers.append(raw_layer["Name"])
+                    continue
+                for key, value in raw_layer.items():
+                    try:
+                        columns[key].append(value)
+                    except KeyError:
+                        # Back-fill a column which first appears in this row.
+                        columns[key] = [None] * nb_rows + [value]
+                nb_rows += 1
+                # Pad the columns which this row does not have.
+                if len(raw_layer) < len(columns):
+                    for column in columns.values():
+                        if len(column) < nb_rows:
+                            column.append(None)
+            return raw_layers, ignore_layers, columns, reader.bindings
 
         def process_profiling_file(profiling_file, ignore_layers):
             if not profiling_file:
                 return None
             raw_perf = read_profiling_file(profiling_file)
+            ignore_layers = set(ignore_layers)
             raw_perf = [perf_rec for perf_rec in raw_perf if perf_rec["name"] not in ignore_layers]
             return raw_perf
 
@@ -74,48 +101,126 @@ class EnginePlan:
                 df["latency.time"] = [0] * len(df)
             return df
 
-        def add_graph_summation_cols(df, layers):
-            # Add new (summation) columns
-            df["total_io_size_bytes"] = [l.total_io_size_bytes for l in layers]
-            df["weights_size"] = [l.weights_size for l in layers]
-            df["total_footprint_bytes"] = [l.total_footprint_bytes for l in layers]
-            df["precision"] = [l.precision for l in layers]
+        def add_graph_summation_cols(df):
+            # Add new (summation) columns, computed over all the raw tensors at once.
+            tensors = TensorTable.from_raw_layers(df["Inputs"], df["Outputs"])
+            weights_size = constants_size(df["Weights"]) if "Weights" in df else np.zeros(len(df), dtype=np.int64)
+            total_io_size_bytes = tensors.per_layer_sum(tensors.size_bytes)
+            first_inputs = tensors.first_port(is_output=False)
+            has_inputs = first_inputs >= 0
+            precisions = np.full(len(df), None, dtype=object)
+            precisions[has_inputs] = tensors.precisions()[first_inputs[has_inputs]]
+            df["total_io_size_bytes"] = total_io_size_bytes
+            df["weights_size"] = weights_size
+            df["total_footprint_bytes"] = total_io_size_bytes + weights_size
+            df["precision"] = precisions
             return df
 
-        def construct_df(raw_layers):
-            raw_layers = [raw_layer for raw_layer in raw_layers if raw_layer["LayerType"] not in ["Constant", "NoOp"]]
-            graph_df = pd.DataFrame.from_dict(raw_layers)
+        def construct_df(columns):
+            graph_df = pd.DataFrame(columns)
             graph_df = fix_df(graph_df)
             return graph_df
 
-        def compute_summary(self):
-            self.total_act_size = sum([l.total_io_size_bytes for l in self.layers])
-            self.total_weights_size = sum([l.weights_size for l in self.layers])
-            assert self.total_weights_size == self.df["weights_size"].sum()
+        def compute_summary(self, raw_layers):
+            self.total_act_size = int(self._df["total_io_size_bytes"].sum())
+            self.total_weights_size = int(self._df["weights_size"].sum())
+            # The dataframe has no Constant and NoOp rows: check that no weights were dropped with them.
+            layers_weights = [raw_layer.get("Weights") for raw_layer in raw_layers if raw_layer["LayerType"] != "Constant"]
+            assert self.total_weights_size == constants_size(layers_weights).sum()
             self.total_runtime = sum([avg_time for avg_time in self._df["latency.avg_time"]])
 
+        def load_from_cache(self, cache):
+            self._df, self._load_raw_layers, metadata = cache.load()
+            for attr in EnginePlan._cached_attrs:
+                setattr(self, attr, metadata[attr])
+
+        def save_to_cache(self, cache, raw_layers):
+            metadata = {attr: getattr(self, attr) for attr in EnginePlan._cached_attrs}
+            cache.save(self._df, raw_layers, metadata)
+
         self.name = name or path_leaf(graph_file)
-        raw_layers, self.bindings = import_graph_file(graph_file)
-        raw_layers = create_layers(self, raw_layers)
+        self._layers, self._all_layers = None, None
+        self._load_raw_layers = None
+        # Lazily-derived data (see `layer_type_rows` and `get_layers_by_type`).
+        self._type_rows = None
+        self._layers_by_type = {}
+        cache = None
+        if cache_dir is not None:
+            cache = PlanCache(cache_dir, [graph_file, profiling_file, profiling_metadata_file, build_metadata_file])
+            if cache.exists():
+                load_from_cache(self, cache)
+                return
+
+        raw_layers, ignore_layers, columns, self.bindings = import_layers(graph_file)
+        # The plan layers are created on first access.
+        self._load_raw_layers = lambda: raw_layers
 
         self._df = None
-        ignore_layers = [raw_layer["Name"] for raw_layer in raw_layers if raw_layer["LayerType"] in ["Constant", "NoOp"]]
         self._raw_perf = process_profiling_file(profiling_file, ignore_layers=ignore_layers)
-        graph_df = construct_df(raw_layers)
-        graph_df = add_graph_summation_cols(graph_df, self.layers)
+        # The derived columns (output precision, IO sizes) are computed
+        # eagerly, column-wise, because the plan totals and the plan cache
+        # need them.
+        graph_df = construct_df(columns)
+        del columns
+        graph_df = add_graph_summation_cols(graph_df)
         self._df = merge_profiling_data(graph_df, self._raw_perf)
-        compute_summary(self)
+        compute_summary(self, raw_layers)
         self.device_properties = get_device_properties(profiling_metadata_file)
         self.performance_summary = get_performance_summary(profiling_metadata_file)
         self.builder_cfg = get_builder_config(build_metadata_file)
         assert self._df is not None, f"Failed parsing plan file {graph_file}"
+        if cache is not None:
+            save_to_cache(self, cache, raw_layers)
+
+    def _create_layers(self, layers: List[Layer]):
+        self._layers = fold_no_ops(layers, self.bindings)
+        # The layers are not modified after folding, so they can be shared.
+        self._all_layers = list(self._layers)
+        self._layers = [layer for layer in self._layers if layer.type != "Constant"]
+
+    def _lazy_create_layers(self):
+        """Create the plan layers on first access"""
+        if self._layers is None:
+            raw_layers = self._load_raw_layers()
+            self._create_layers([Layer(raw_layer) for raw_layer in raw_layers])
+            self._load_raw_layers = None
+
+    @property
+    def layers(self) -> List[Layer]:
+        self._lazy_create_layers()
+        return self._layers
+
+    @property
+    def all_layers(self) -> List[Layer]:
+        """All the plan layers, including Constant layers"""
+        self._lazy_create_layers()
+        return self._all_layers
 
     @property
     def df(self):
         return self._df
 
+    @property
+    def layer_type_rows(self) -> Dict[str, np.ndarray]:
+        """Map each layer type to the positions of its layers in the dataframe
+        (computed on first access)"""
+        if self._type_rows is None:
+            self._type_rows = self._df.groupby("type", sort=False).indices
+        return self._type_rows
+
     def get_layers_by_type(self, layer_type):
-        return filter_by_layer(self._df, layer_type)
+        """Return the layers of type `layer_type` and their type-specific
+        attributes.
+
+        The result is computed once per type, and each call returns an
+        independent copy of it (so callers may modify it).
+        """
+        try:
+            layers = self._layers_by_type[layer_type]
+        except KeyError:
+            rows = self.layer_type_rows.get(layer_type, np.empty(0, dtype=np.int64))
+            layers = self._layers_by_type[layer_type] = filter_by_layer(self._df, layer_type, rows)
+        return layers.copy()
 
     def find(self, layer_name: str):
         for l in self.layers:
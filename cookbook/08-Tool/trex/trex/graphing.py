@@ -23,11 +23,13 @@ import warnings
 import os
 import re
 from graphviz import Digraph
-from typing import Callable, NamedTuple, List
+from typing import Callable, Iterable, NamedTuple, List, Sequence
 from .engine_plan import EnginePlan
+from .dag import LayerDAG
 from .layer import Layer
 from .activations import Activation
 from .plotting import precision_colormap, layer_colormap
+from .onnx_export import import_onnx, onnx_value_info, make_layer_node, TREX_DOMAIN, TREX_DOMAIN_VERSION
 
 class Region(NamedTuple):
     id: int
@@ -68,6 +70,9 @@ class RegionGenerations:
         # Each time we switch between C events and P events we create a new
         # Region generation.
         regions_gens = {}
+        # Map each region to the first generation in which each layer
+        # appears, so that generations can be looked up in O(1).
+        layers_gens = {}
         for region, region_evts in story.items():
             # A List of region generations.
             # Each generation is a list of C/P events.
@@ -81,8 +86,10 @@ class RegionGenerations:
                         current_gen += 1
                         generations.append(list())
                 generations[current_gen].append(evt)
+                layers_gens.setdefault(region, {}).setdefault(evt[1], current_gen)
             regions_gens[region] = generations
         self.regions_gens = regions_gens
+        self.layers_gens = layers_gens
 
     def lookup_region_gen(self, layer_name: str, region_name: str):
         """Lookup the generation of a Region, given a layer name.
@@ -91,17 +98,13 @@ class RegionGenerations:
         Region generation.
         """
         try:
-            region_gens = self.regions_gens[region_name]
+            layers_gens = self.layers_gens[region_name]
         except KeyError:
             # A KeyError can happen if we have a disconneted graph.
             return -1
-        for gen_id, gen in enumerate(region_gens):
-            for evt in gen:
-                if evt[1] == layer_name:
-                    return gen_id
-        # Assume for now that this is OK - it's probably a Constant
+        # Assume for now that a missing layer is OK - it's probably a Constant
         # layer that produced this region.
-        return 0
+        return layers_gens.get(layer_name, 0)
 
     def nb_generations(self, region_name: str):
         region_gens = self.regions_gens[region_name]
@@ -178,7 +181,7 @@ def node_label_tbl(
             return row
 
         header = """<
-            <TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4" color="transparent">""""
+            <TABLE BORDER="0" CELLBORDER="1" CELLSPACING="0" CELLPADDING="4" color="transparent">"""
         footer = "</TABLE>>"
         tbl = header
         for i, row in enumerate(rows):
@@ -249,8 +252,26 @@ class PlanGraph(object):
         self.regions_dict = {}
         self.regions_generations = RegionGenerations(plan)
         self.edges_list = []
+        self.__index_layers(plan)
         self.__create_graph(plan)
 
+    def __index_layers(self, plan: EnginePlan):
+        """Index the producers and consumers of each region, and the latency
+        of each layer, so that building the graph is linear in its size."""
+        self.producers, self.consumers = {}, {}
+        for i, l in enumerate(plan.all_layers):
+            for o in l.outputs:
+                self.producers.setdefault(o.name, []).append((i, l.name))
+            for inp in l.inputs:
+                self.consumers[inp.name] = self.consumers.get(inp.name, 0) + 1
+        self.bindings = set(plan.bindings)
+        self.latencies = {}
+        try:
+            for name, latency in zip(plan.df["Name"], plan.df["latency.avg_time"]):
+                self.latencies.setdefault(name, latency)
+        except KeyError:
+            pass
+
     def __create_graph(self, plan: EnginePlan):
         region_id = len(plan.all_layers)
         for layer_id, layer in enumerate(plan.all_layers):
@@ -262,11 +283,8 @@ class PlanGraph(object):
             self.add_edge(edge.src, edge.dst, edge.tensor, edge.region_gen)
 
         for layer_id, layer in enumerate(plan.all_layers):
-            try:
-                latency = plan.df[plan.df["Name"] == layer.name]["latency.avg_time"].iloc[0]
-            except (KeyError, IndexError):
-                # Constants layer
-                latency = 0
+            # Constants layers have no latency.
+            latency = self.latencies.get(layer.name, 0)
             self.add_layer_node(layer_id, layer, latency, node_labeler=node_label_tbl)
 
         for generations in self.regions_dict.values():
@@ -281,36 +299,26 @@ class PlanGraph(object):
         for region_name, region in self.regions_dict.items():
             nb_prods = self._nb_producers(self.plan.all_layers, region_name)
             nb_cons = self._nb_consumers(self.plan.all_layers, region_name)
-            is_user = region_name in self.plan.bindings  # or nb_cons==0 or nb_prod==0
+            is_user = region_name in self.bindings  # or nb_cons==0 or nb_prod==0
             if not is_user and nb_cons == 0:
                 warnings.warn(f"Region {region_name} is neither a binding nor a layer input.")
             if not is_user and nb_prods == 0:
                 warnings.warn(f"Region {region_name} is neither a binding nor a layer output.")
 
     def find_producers(self, layers, region_name):
-        producers = []
-        for i, l in enumerate(self.plan.all_layers):
-            for o in l.outputs:
-                if o.name == region_name:
-                    producers.append((i, l.name))
-        return producers
+        return self.producers.get(region_name, [])
 
     def _nb_producers(self, layers, inp_name):
         return len(self.find_producers(layers, inp_name))
 
     def _nb_consumers(self, layers, region_name):
-        consumers = []
-        for id, l in enumerate(self.plan.all_layers):
-            for i in l.inputs:
-                if i.name == region_name:
-                    consumers.append((i, region_name))
-        return len(consumers)
+        return self.consumers.get(region_name, 0)
 
     def should_display_region(self, region_name: str, display_regions: bool) -> bool:
         nb_gens = self.regions_generations.nb_generations(region_name)
         nb_prod = self._nb_producers(self.plan.all_layers, region_name)
         nb_cons = self._nb_consumers(self.plan.all_layers, region_name)
-        is_user = region_name in self.plan.bindings or nb_cons == 0 or nb_prod == 0
+        is_user = region_name in self.bindings or nb_cons == 0 or nb_prod == 0
         add = is_user or display_regions or nb_gens > 1 or nb_prod > 1
         return add
 
@@ -327,7 +335,7 @@ class PlanGraph(object):
         else:
             should_display = self.should_display_region(tensor.name, self.display_regions)
             is_new_region = tensor.name not in self.regions_dict
-        is_user = tensor.name in self.plan.bindings
+        is_user = tensor.name in self.bindings
         is_new_generation = (not is_new_region and (region_gen + 1) > len(self.regions_dict[tensor.name]))
         if is_new_region:
             region_id = self.new_region(tensor, region_id, is_user, should_display)
@@ -453,27 +461,49 @@ def to_dot(plan: EnginePlan, node_formatter: Callable, region_formatter: Callabl
     g = DotGraph(plan, node_formatter, region_formatter, display_layer_names, display_regions, expand_layer_details)
     return g.dot
 
-import onnx
-
-def make_onnx_tensor(tensor):
+def subgraph_to_dot(dag: LayerDAG, node_ids: Iterable[int], node_formatter: Callable, collapse_types: Sequence[str] = None, max_collapse_latency: float = None, **kwargs) -> Digraph:
+    """Convert a subgraph of the plan-graph to dot format.
 
-    def get_type(desc):
-        desc = desc.lower()
-        if "int8" in desc:
-            return onnx.TensorProto.INT8
-        elif "fp32" in desc:
-            return onnx.TensorProto.FLOAT
-        elif "fp16" in desc:
-            return onnx.TensorProto.FLOAT16
-        elif "int32" in desc:
-            return onnx.TensorProto.INT32
-        else:
-            raise ValueError(f"Uknown precision {desc}")
+    Use the LayerDAG selection methods (e.g. `neighborhood`, `critical_path`,
+    `top_k` and `matching`) to choose the `node_ids` of the subgraph.
+    Chains of cheap layers of `collapse_types` are collapsed to summary nodes.
+    """
+    subplan = dag.subplan(node_ids, collapse_types=collapse_types, max_collapse_latency=max_collapse_latency)
+    return to_dot(subplan, node_formatter, **kwargs)
+
+def render_dot_pages(
+    plan: EnginePlan,
+    node_formatter: Callable,
+    engine_name: str,
+    output_format: str = "svg",
+    page_size: int = 500,
+    overlap: int = 0,
+    node_ids: Iterable[int] = None,
+    collapse_types: Sequence[str] = None,
+    max_collapse_latency: float = None,
+    **kwargs,
+) -> List[str]:
+    """Render the plan-graph (or a subgraph of it) to several external files,
+    each containing a page of up to `page_size` layers in topological order.
+
+    Returns the list of the rendered file names.
+    """
+    dag = LayerDAG(plan)
+    output_fnames = []
+    for page_id, page in enumerate(dag.pages(node_ids, page_size, overlap)):
+        graph = subgraph_to_dot(dag, page, node_formatter, collapse_types, max_collapse_latency, **kwargs)
+        output_fnames.append(render_dot(graph, f"{engine_name}.page{page_id}", output_format))
+    return output_fnames
 
-    t = onnx.helper.make_tensor_value_info(tensor.name, get_type(tensor.format), tensor.shape)
-    return t
+def make_onnx_tensor(tensor):
+    return onnx_value_info(tensor)
 
 class OnnxGraph(PlanGraph):
+    """An ONNX model of the plan-graph, with the regions as "Region" nodes.
+
+    The model is built in memory: use `onnx_export.export_onnx` to export
+    large plans, with tensor value infos and layer metrics.
+    """
 
     def __init__(
         self,
@@ -481,10 +511,12 @@ class OnnxGraph(PlanGraph):
         display_layer_names: bool = True,
         display_regions: bool = False,
     ):
+        onnx = import_onnx()
         self.onnx_nodes = []
         self.graph_inputs, self.graph_outputs = [], []
         self.regions_inputs = dict()
         self.regions_outputs = dict()
+        self.node_inputs, self.node_outputs = {}, {}
         self.plan = plan
 
         for layer in plan.layers:
@@ -497,79 +529,26 @@ class OnnxGraph(PlanGraph):
 
         super().__init__(plan, display_regions)
         graph_def = onnx.helper.make_graph(self.onnx_nodes, "test-model", self.graph_inputs, self.graph_outputs)
-        self.model_def = onnx.helper.make_model(graph_def, producer_name="engine2onnx")
+        opset_imports = [onnx.helper.make_opsetid("", onnx.defs.onnx_opset_version()), onnx.helper.make_opsetid(TREX_DOMAIN, TREX_DOMAIN_VERSION)]
+        self.model_def = onnx.helper.make_model(graph_def, producer_name="engine2onnx", opset_imports=opset_imports)
 
     def add_region_node(self, id: int, tensor: Activation, is_user: bool):
         if is_user:
             # In the ONNX programming model we create
             # bindings when we create the graph.
             return
-        try:
-            inputs = self.regions_inputs[tensor.name]
-        except:
-            print(f"Did not find input {id}")
-            inputs = None
-        try:
-            outputs = self.regions_outputs[tensor.name]
-        except:
-            print(f"Did not find output {id}")
-            outputs = None
-        name = str(id)
-        node_def = onnx.helper.make_node("Region", inputs, outputs, name)
+        inputs = self.regions_inputs.get(tensor.name)
+        outputs = self.regions_outputs.get(tensor.name)
+        node_def = import_onnx().helper.make_node("Region", inputs, outputs, str(id), domain=TREX_DOMAIN)
         self.onnx_nodes.append(node_def)
 
-    def add_layer_node(self, node_id: int, layer: Layer, node_labeler: Callable):
-
-        def get_type(layer):
-            op_type = layer.type
-            # Convert Op Type to onnx.ai namepsace because
-            # Netron assigns these nodes specific colors.
-            if op_type == "Convolution":
-                op_type = "Conv"
-            if op_type == "Pooling":
-                if layer.raw_dict["PoolingType"] == "AVERAGE":
-                    op_type = "AveragePool"
-                if layer.raw_dict["PoolingType"] == "Max":
-                    op_type = "MaxPool"
-            return op_type
-
-        def add_attributes(layer, node_def):
-            for key, value in sorted(layer.items()):
-                if key not in ["InputRegions", "OutputRegions", "Inputs", "Outputs", "Name", "name", "ParameterType", "LayerName"]:
-                    node_def.attribute.extend([onnx.helper.make_attribute(key, value)])
-
-        op_type = get_type(layer)
-        name = layer.name
-
-        print(f"adding node {node_id} - {layer.name}")
-
-        # Find layer id
-        inputs, outputs = [], []
-        for edge in self.edges_list:
-            if edge.src == str(node_id):
-                outputs.append(edge.tensor.name)
-            if edge.dst == str(node_id):
-                inputs.append(edge.tensor.name)
-
-        # Find inputs to layer id, outputs
-        node_def = onnx.helper.make_node(op_type, inputs, outputs, name)
-        add_attributes(layer.raw_dict, node_def)
-        self.onnx_nodes.append(node_def)
+    def add_layer_node(self, node_id: int, layer: Layer, latency: float, node_labeler: Callable):
+        inputs = self.node_inputs.get(str(node_id), [])
+        outputs = self.node_outputs.get(str(node_id), [])
+        self.onnx_nodes.append(make_layer_node(layer, inputs, outputs, {"latency.avg_time": latency}))
 
     def add_edge(self, src, end, tensor, region_gen):
-        if True:
-            edge = f"{src}_to_{end}"
-            edge = tensor.name
-            try:
-                self.regions_inputs[tensor.name].append(edge)
-            except KeyError:
-                self.regions_inputs[tensor.name] = [
-                    edge,
-                ]
-
-            try:
-                self.regions_outputs[tensor.name].append(end)
-            except KeyError:
-                self.regions_outputs[tensor.name] = [
-                    end,
-                ]
+        self.regions_inputs.setdefault(tensor.name, []).append(tensor.name)
+        self.regions_outputs.setdefault(tensor.name, []).append(end)
+        self.node_outputs.setdefault(str(src), []).append(tensor.name)
+        self.node_inputs.setdefault(str(end), []).append(tensor.name)
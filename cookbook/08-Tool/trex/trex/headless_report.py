@@ -0,0 +1,285 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to render engine reports without Jupyter.
+
+The report card functions (`report_card.py`) are run with their output
+captured: plotly figures, displayed dataframes and printed text are
+collected in order, and the dropdown diagrams render all of their choices.
+The captured items are written as a self-contained HTML file, or as a JSON
+file (plotly figures as JSON), one report per engine.
+
+Reports of many engines are rendered in a pool of worker processes.
+"""
+
+import os
+import io
+import json
+import html
+import traceback
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+import pandas as pd
+import plotly.io as pio
+from plotly.io.base_renderers import ExternalRenderer
+from plotly.utils import PlotlyJSONEncoder
+from . import interactive, notebook
+from .engine_plan import EnginePlan
+from .batch import EngineFiles, discover_engines
+from .report_card import *
+
+CAPTURE_RENDERER_NAME = "trex_capture"
+REPORT_FILE_EXTENSIONS = {"html": ".report.html", "json": ".report.json"}
+
+class ReportItem(NamedTuple):
+    """A captured report output.
+
+    `kind` is "section", "choice" (a diagram choice), "figure" (a plotly
+    figure dictionary), "table" (a dataframe), "text" or "error".
+    """
+    kind: str
+    content: object
+
+class RenderedReports(NamedTuple):
+    """The reports written by `render_reports`: the report file of each
+    engine, and the error of each engine which could not be rendered"""
+    reports: Dict[str, str]
+    failed: Dict[str, str]
+
+class _CaptureRenderer(ExternalRenderer):
+    """A plotly renderer which collects the figures instead of showing them"""
+
+    def __init__(self, items: List[ReportItem]):
+        self.items = items
+
+    def render(self, fig_dict):
+        self.items.append(ReportItem("figure", fig_dict))
+
+class _TextCapture(io.TextIOBase):
+    """A stdout replacement which collects the printed text"""
+
+    def __init__(self, items: List[ReportItem]):
+        self.items = items
+
+    def write(self, text: str) -> int:
+        if self.items and self.items[-1].kind == "text":
+            self.items[-1] = ReportItem("text", self.items[-1].content + text)
+        else:
+            self.items.append(ReportItem("text", text))
+        return len(text)
+
+def _render_safe(items: List[ReportItem], render):
+    try:
+        render()
+    except Exception as e:
+        items.append(ReportItem("error", f"{type(e).__name__}: {e}"))
+
+@contextlib.contextmanager
+def capture_report(items: List[ReportItem]):
+    """Collect the outputs of report card functions in `items` (instead of
+    displaying them).
+
+    All the choices of the dropdown diagrams are rendered, and a choice
+    which fails is reported as an error item.
+    """
+
+    def render_choice(choice: str, render):
+        items.append(ReportItem("choice", choice))
+        _render_safe(items, render)
+
+    pio.renderers[CAPTURE_RENDERER_NAME] = _CaptureRenderer(items)
+    default_renderer = pio.renderers.default
+    pio.renderers.default = CAPTURE_RENDERER_NAME
+    notebook._display_df_hook = lambda df: items.append(ReportItem("table", df))
+    interactive._choice_hook = render_choice
+    try:
+        with contextlib.redirect_stdout(_TextCapture(items)):
+            yield items
+    finally:
+        pio.renderers.default = default_renderer
+        notebook._display_df_hook = None
+        interactive._choice_hook = None
+
+def _report_card_convolutions(plan: EnginePlan):
+    convs = plan.get_layers_by_type("Convolution")
+    if len(convs) == 0:
+        print("The engine plan does not contain convolution layers.")
+        return
+    report_card_convolutions_overview(convs)
+
+def _report_card_gemm(plan: EnginePlan):
+    if len(plan.get_layers_by_type("Convolution")) == 0:
+        print("The engine plan does not contain convolution layers.")
+        return
+    report_card_gemm_MNK(plan)
+
+# The report sections, and the report card function which renders each.
+REPORT_SECTIONS = OrderedDict([
+    ("Performance overview", report_card_perf_overview),
+    ("Layers", report_card_table_view),
+    ("Memory footprint", report_card_memory_footprint),
+    ("Convolutions", _report_card_convolutions),
+    ("Implicit GEMM", _report_card_gemm),
+    ("Roofline", report_card_roofline),
+    ("Precision transitions", report_card_precision_transitions),
+    ("Pointwise layers", report_card_pointwise_lint),
+])
+
+def render_report(plan: EnginePlan, sections: List[str] = None) -> List[ReportItem]:
+    """Run the report card functions of `sections` (default: all) and return
+    their captured outputs.
+
+    A section which fails (e.g. the roofline of a plan without device
+    properties) is reported as an error item.
+    """
+    items = []
+    with capture_report(items):
+        for section in sections or REPORT_SECTIONS:
+            items.append(ReportItem("section", section))
+            _render_safe(items, lambda: REPORT_SECTIONS[section](plan))
+    return items
+
+def plan_summary(plan: EnginePlan) -> Dict:
+    return OrderedDict([
+        ("Layers", len(plan.df)),
+        ("Latency (ms)", plan.total_runtime),
+        ("Weights (bytes)", plan.total_weights_size),
+        ("Activations (bytes)", plan.total_act_size),
+        ("Device", plan.device_properties.get("Selected Device")),
+        ("Precision", plan.builder_cfg.get("Precision")),
+        ("Throughput", plan.performance_summary.get("Throughput")),
+    ])
+
+_HTML_STYLE = """
+body {font-family: sans-serif; margin: 2em;}
+h1 {text-align: center; background: #76b900; padding: 20px; color: #ffffff;}
+h2 {border-bottom: 2px solid #76b900;}
+h3 {color: #76b900;}
+table {border-collapse: collapse; font-size: 0.85em; margin-bottom: 1em;}
+th, td {border: 1px solid #ddd; padding: 2px 6px;}
+th {background: #f2f2f2;}
+pre.error {color: #a11350;}
+"""
+
+def report_to_html(name: str, summary: Dict, items: List[ReportItem], max_table_rows: int = 500, include_plotlyjs=True) -> str:
+    """Render a report as a self-contained HTML page.
+
+    plotly.js is embedded once (`include_plotlyjs=True`), loaded from a CDN
+    ("cdn") or omitted (False). Long tables are truncated to
+    `max_table_rows` rows.
+    """
+    body = [f"<h1>{html.escape(name)}</h1>", pd.DataFrame([summary]).to_html(index=False, border=0)]
+    plotlyjs = include_plotlyjs
+    for item in items:
+        if item.kind == "section":
+            body.append(f"<h2>{html.escape(item.content)}</h2>")
+        elif item.kind == "choice":
+            body.append(f"<h3>{html.escape(item.content)}</h3>")
+        elif item.kind == "figure":
+            body.append(pio.to_html(item.content, include_plotlyjs=plotlyjs, full_html=False, validate=False))
+            plotlyjs = False
+        elif item.kind == "table":
+            body.append(item.content.to_html(index=False, border=0, max_rows=max_table_rows))
+        elif item.kind == "text":
+            body.append(f"<pre>{html.escape(item.content)}</pre>")
+        else:
+            body.append(f"<pre class=\"error\">{html.escape(item.content)}</pre>")
+    return ("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{html.escape(name)}</title>\n<style>{_HTML_STYLE}</style>\n</head>\n<body>\n" + "\n".join(body) + "\n</body>\n</html>\n")
+
+def report_to_json(name: str, summary: Dict, items: List[ReportItem], max_table_rows: int = 500) -> str:
+    """Render a report as JSON (figures are plotly JSON and tables are in
+    pandas "split" orientation)"""
+
+    def item_content(item: ReportItem):
+        if item.kind == "table":
+            return json.loads(item.content.head(max_table_rows).to_json(orient="split", default_handler=str))
+        return item.content
+
+    report = {"name": name, "summary": summary, "items": [{"kind": item.kind, "content": item_content(item)} for item in items]}
+    return json.dumps(report, cls=PlotlyJSONEncoder)
+
+def write_report(plan: EnginePlan, path: str, file_format: str = "html", sections: List[str] = None, max_table_rows: int = 500, include_plotlyjs=True):
+    """Render the report of a plan and write it to `path`"""
+    items = render_report(plan, sections)
+    summary = plan_summary(plan)
+    if file_format == "html":
+        content = report_to_html(plan.name, summary, items, max_table_rows, include_plotlyjs)
+    elif file_format == "json":
+        content = report_to_json(plan.name, summary, items, max_table_rows)
+    else:
+        raise ValueError(f"Unknown report format: {file_format}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+def _render_engine_safe(engine: EngineFiles, path: str, file_format: str, cache_dir: str, sections: List[str], max_table_rows: int, include_plotlyjs) -> Optional[str]:
+    try:
+        plan = EnginePlan(engine.graph_file, engine.profiling_file, engine.profiling_metadata_file, engine.build_metadata_file, name=engine.name, cache_dir=cache_dir)
+        write_report(plan, path, file_format, sections, max_table_rows, include_plotlyjs)
+        return None
+    except Exception:
+        return traceback.format_exc()
+
+def _write_index(output_dir: str, reports: Dict[str, str], failed: Dict[str, str]):
+    links = [f"<li><a href=\"{html.escape(os.path.relpath(path, output_dir))}\">{html.escape(name)}</a></li>" for name, path in reports.items()]
+    errors = [f"<li>{html.escape(name)}<pre class=\"error\">{html.escape(error)}</pre></li>" for name, error in failed.items()]
+    with open(os.path.join(output_dir, "index.html"), "w") as f:
+        f.write("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Engine reports</title>\n"
+                f"<style>{_HTML_STYLE}</style>\n</head>\n<body>\n<h1>Engine reports</h1>\n<ul>\n" + "\n".join(links) + "\n</ul>\n" +
+                (f"<h2>Failed</h2>\n<ul>\n" + "\n".join(errors) + "\n</ul>\n" if errors else "") + "</body>\n</html>\n")
+
+def render_reports(
+    root_dir: str,
+    output_dir: str,
+    max_workers: Optional[int] = None,
+    file_format: str = "html",
+    cache_dir: str = None,
+    sections: List[str] = None,
+    max_table_rows: int = 500,
+    include_plotlyjs=True,
+) -> RenderedReports:
+    """Render the report of each engine under a directory tree (see
+    `batch.discover_engines`) to `output_dir`, in a pool of `max_workers`
+    processes (set to 1 to render them serially).
+
+    Each report is written to `<output_dir>/<engine name>.report.html` (or
+    `.report.json`), and an index of the HTML reports to
+    `<output_dir>/index.html`.
+    """
+    engines = discover_engines(root_dir)
+    paths = [os.path.join(output_dir, engine.name + REPORT_FILE_EXTENSIONS[file_format]) for engine in engines]
+    args = (file_format, cache_dir, sections, max_table_rows, include_plotlyjs)
+    if max_workers == 1 or len(engines) <= 1:
+        errors = [_render_engine_safe(engine, path, *args) for engine, path in zip(engines, paths)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            n = len(engines)
+            errors = list(executor.map(_render_engine_safe, engines, paths, *[[arg] * n for arg in args]))
+
+    reports, failed = OrderedDict(), OrderedDict()
+    for engine, path, error in zip(engines, paths, errors):
+        if error is None:
+            reports[engine.name] = path
+        else:
+            failed[engine.name] = error
+    os.makedirs(output_dir, exist_ok=True)
+    if file_format == "html":
+        _write_index(output_dir, reports, failed)
+    return RenderedReports(reports, failed)
@@ -18,15 +18,28 @@
 This file contains configurable interactive widget wrappers.
 """
 
-from ipywidgets import widgets
-import IPython
-from IPython.core.display import display
 from typing import List
 
+# ipywidgets and IPython are imported on first use, so that the reports can
+# be rendered without them (see `headless_report.py`).
+
+# While a headless report is rendered (see `headless_report.py`), the diagrams
+# render all their choices instead of displaying a dropdown widget: this
+# function is called with the name and the rendering function of each choice.
+_choice_hook = None
+
 class InteractiveDiagram:
     """A dropdown widget wrapper"""
 
     def __init__(self, diagram_renderer, choices, description):
+        if _choice_hook is not None:
+            for choice, values in choices.items():
+                values = values if isinstance(values, (list, tuple)) else (values, )
+                _choice_hook(choice, lambda: diagram_renderer(choice, *values))
+            return
+
+        from ipywidgets import widgets
+        from IPython.core.display import display
 
         def get_default_choice_key():
             return list(self.choices.keys())[0]
@@ -53,7 +66,9 @@ class InteractiveDiagram:
         self._render(get_default_choice_key(), get_default_choice_value())
 
     def _render(self, choice, values):
-        IPython.display.clear_output(wait=True)
+        from IPython.core.display import display
+        from IPython.display import clear_output
+        clear_output(wait=True)
         display(self.choice_widget)
         self.diagram_renderer(choice, *values)
 
@@ -68,6 +83,13 @@ class InteractiveDiagram_2:
     """A dropdown widget wrapper"""
 
     def __init__(self, choices: List, description: str):
+        if _choice_hook is not None:
+            for choice, renderer in choices.items():
+                _choice_hook(choice, lambda: renderer(title=choice))
+            return
+
+        from ipywidgets import widgets
+        from IPython.core.display import display
 
         def get_default_choice():
             return list(self.choices.keys())[0]
@@ -90,7 +112,9 @@ class InteractiveDiagram_2:
         self._render(get_default_choice(), get_default_renderer())
 
     def _render(self, title, renderer):
-        IPython.display.clear_output(wait=True)
+        from IPython.core.display import display
+        from IPython.display import clear_output
+        clear_output(wait=True)
         display(self.choice_widget)
         renderer(title=title)
 
@@ -0,0 +1,207 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to export engine plans to Arrow/Parquet files.
+
+A plan is normalized into four tables with typed columns:
+    layers:  one row per layer (layer_id, Name, type, latency, sizes, ...).
+             Layer-specific attributes are stored as a JSON string.
+    tensors: one row per layer port (layer_id, is_output, port, Name, shape, ...).
+    edges:   one row per (producer layer, consumer layer, tensor).
+    metrics: plan-level key/value pairs (summary, device properties,
+             performance summary and builder configuration).
+
+The tables are written to a directory, one file per table, as Parquet files
+(compact) or Arrow IPC files (which are memory-mapped when read back, without
+copying). They can be read without trex. pyarrow is only required for writing
+and reading the files.
+"""
+
+import os
+import json
+from typing import Dict, NamedTuple
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .activations import parse_format, volume
+from .plan_cache import json_default
+
+INTERCHANGE_SCHEMA_VERSION = 1
+TABLE_NAMES = ("layers", "tensors", "edges", "metrics")
+FILE_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Plan dataframe columns which are stored as typed columns of the layers table.
+_LAYER_COLUMNS = {
+    "Name": "string",
+    "type": "string",
+    "subtype": "string",
+    "tactic": "string",
+    "precision": "string",
+    "latency.avg_time": "float64",
+    "latency.time": "float64",
+    "latency.pct_time": "float64",
+    "weights_size": "int64",
+    "total_io_size_bytes": "int64",
+    "total_footprint_bytes": "int64",
+}
+# Raw layer keys which are not stored as layer attributes.
+_NOT_ATTRIBUTES = {"Name", "LayerType", "ParameterType", "TacticName", "Inputs", "Outputs"}
+
+class PlanTables(NamedTuple):
+    """The normalized tables of an engine plan (pandas or Arrow tables)"""
+    layers: object
+    tensors: object
+    edges: object
+    metrics: object
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Arrow/Parquet interchange requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def _layer_attributes(plan: EnginePlan) -> list:
+    # The plan layers and the dataframe rows are in the same order.
+    return [json.dumps({k: v for k, v in layer.raw_dict.items() if k not in _NOT_ATTRIBUTES}, default=json_default) for layer in plan.layers]
+
+def _tensors_table(df: pd.DataFrame, bindings: set) -> pd.DataFrame:
+    cols = {"layer_id": [], "is_output": [], "port": [], "Name": [], "location": [], "format": [], "precision": [], "shape": [], "volume": [], "size_bytes": []}
+    for layer_id, (inputs, outputs) in enumerate(zip(df["Inputs"], df["Outputs"])):
+        for is_output, tensors in ((False, inputs), (True, outputs)):
+            for port, tensor in enumerate(tensors):
+                _, precision, data_size = parse_format(tensor["Format/Datatype"])
+                vol = volume(tensor["Dimensions"])
+                for col, value in zip(cols.values(), (layer_id, is_output, port, tensor["Name"], tensor.get("Location", ""), tensor["Format/Datatype"], precision, list(tensor["Dimensions"]), vol, vol * data_size)):
+                    col.append(value)
+    tensors = pd.DataFrame(cols)
+    tensors = tensors.astype({"layer_id": "int32", "is_output": "bool", "port": "int32", "volume": "int64", "size_bytes": "int64"})
+    tensors["is_binding"] = tensors["Name"].isin(bindings)
+    return tensors
+
+def _edges_table(tensors: pd.DataFrame) -> pd.DataFrame:
+    producers = tensors.loc[tensors["is_output"], ["Name", "layer_id", "size_bytes"]]
+    consumers = tensors.loc[~tensors["is_output"], ["Name", "layer_id"]]
+    edges = producers.merge(consumers, on="Name", suffixes=("_producer", "_consumer"))
+    edges = edges.rename(columns={"Name": "tensor", "layer_id_producer": "producer_id", "layer_id_consumer": "consumer_id"})
+    return edges[["producer_id", "consumer_id", "tensor", "size_bytes"]].reset_index(drop=True)
+
+def _metrics_table(plan: EnginePlan) -> pd.DataFrame:
+    sections = {
+        "plan": {
+            "schema_version": INTERCHANGE_SCHEMA_VERSION,
+            "name": plan.name,
+            "layers": len(plan.df),
+            "total_runtime": plan.total_runtime,
+            "total_act_size": plan.total_act_size,
+            "total_weights_size": plan.total_weights_size,
+            "bindings": list(plan.bindings),
+        },
+        "device_properties": plan.device_properties,
+        "performance_summary": plan.performance_summary,
+        "builder_cfg": plan.builder_cfg,
+    }
+    rows = []
+    for section, values in sections.items():
+        for key, value in values.items():
+            is_number = isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+            rows.append((section, key, json.dumps(value, default=json_default), float(value) if is_number else np.nan))
+    return pd.DataFrame(rows, columns=["section", "key", "value", "number"])
+
+def plan_tables(plan: EnginePlan) -> PlanTables:
+    """Normalize a plan into layers, tensors, edges and metrics dataframes"""
+    df = plan.df.reset_index(drop=True)
+    layers = pd.DataFrame({"layer_id": np.arange(len(df), dtype=np.int32)})
+    for col, dtype in _LAYER_COLUMNS.items():
+        if col in df.columns:
+            if dtype == "string":
+                layers[col] = [None if value is None or value == "" else str(value) for value in df[col]]
+            else:
+                layers[col] = df[col].replace("", np.nan).astype(dtype)
+    layers["attributes"] = _layer_attributes(plan)
+    tensors = _tensors_table(df, set(plan.bindings))
+    return PlanTables(layers, tensors, _edges_table(tensors), _metrics_table(plan))
+
+def _arrow_schemas(pa) -> Dict:
+    """The Arrow schemas of the tables (the layers schema lists the typed columns only)"""
+    arrow_types = {"string": pa.string(), "float64": pa.float64(), "int64": pa.int64()}
+    return {
+        "layers": pa.schema([("layer_id", pa.int32())] + [(col, arrow_types[dtype]) for col, dtype in _LAYER_COLUMNS.items()] + [("attributes", pa.string())]),
+        "tensors": pa.schema([
+            ("layer_id", pa.int32()),
+            ("is_output", pa.bool_()),
+            ("port", pa.int32()),
+            ("Name", pa.string()),
+            ("location", pa.string()),
+            ("format", pa.string()),
+            ("precision", pa.string()),
+            ("shape", pa.list_(pa.int64())),
+            ("volume", pa.int64()),
+            ("size_bytes", pa.int64()),
+            ("is_binding", pa.bool_()),
+        ]),
+        "edges": pa.schema([("producer_id", pa.int32()), ("consumer_id", pa.int32()), ("tensor", pa.string()), ("size_bytes", pa.int64())]),
+        "metrics": pa.schema([("section", pa.string()), ("key", pa.string()), ("value", pa.string()), ("number", pa.float64())]),
+    }
+
+def export_plan(plan: EnginePlan, output_dir: str, file_format: str = "parquet", compression: str = "zstd"):
+    """Write the normalized tables of a plan to `output_dir`.
+
+    `file_format` is "parquet" or "arrow" (Arrow IPC files, which are
+    uncompressed so that they can be memory-mapped).
+    """
+    pa = _import_pyarrow()
+    ext = FILE_EXTENSIONS[file_format]
+    schemas = _arrow_schemas(pa)
+    os.makedirs(output_dir, exist_ok=True)
+    for name, df in plan_tables(plan)._asdict().items():
+        schema = schemas[name]
+        # Plans without profiling data or builder metadata lack some columns.
+        schema = pa.schema([field for field in schema if field.name in df.columns])
+        table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+        path = os.path.join(output_dir, name + ext)
+        if file_format == "parquet":
+            pa.parquet.write_table(table, path, compression=compression)
+        else:
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+def read_plan_tables(input_dir: str, as_pandas: bool = True) -> PlanTables:
+    """Read the tables written by `export_plan`.
+
+    Arrow IPC files are memory-mapped, so the Arrow tables (`as_pandas=False`)
+    are read without copying.
+    """
+    pa = _import_pyarrow()
+    tables = {}
+    for name in TABLE_NAMES:
+        arrow_path = os.path.join(input_dir, name + FILE_EXTENSIONS["arrow"])
+        if os.path.exists(arrow_path):
+            table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+        else:
+            table = pa.parquet.read_table(os.path.join(input_dir, name + FILE_EXTENSIONS["parquet"]), memory_map=True)
+        tables[name] = table.to_pandas() if as_pandas else table
+    return PlanTables(**tables)
+
+def plan_metrics(metrics: pd.DataFrame) -> Dict[str, Dict]:
+    """Convert a metrics table back to a dictionary of sections"""
+    sections = {}
+    for section, key, value in zip(metrics["section"], metrics["key"], metrics["value"]):
+        sections.setdefault(section, {})[key] = json.loads(value)
+    return sections
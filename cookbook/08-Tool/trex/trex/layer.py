@@ -19,11 +19,13 @@ TensorRT Engine Exploration API - Layer
 """
 
 from .activations import *
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
 import numpy as np
 
 class Layer:
 
+    __slots__ = ("raw_dict", "name", "type", "subtype", "inputs", "outputs", "outputs_size_bytes", "inputs_size_bytes", "precision", "total_io_size_bytes", "weights_cnt", "weights_type", "weights_size", "bias_cnt", "bias_type", "bias_size", "total_footprint_bytes")
+
     def __init__(self, raw_dict: Dict):
         self.raw_dict = raw_dict
         self.name = raw_dict["Name"]
@@ -34,10 +36,10 @@ class Layer:
         self.subtype = raw_dict["LayerType"]
         self.inputs = [Activation(tensor) for tensor in raw_dict["Inputs"]]
         self.outputs = [Activation(tensor) for tensor in raw_dict["Outputs"]]
-        self.outputs_size_bytes = np.sum([i.size_bytes for i in self.outputs])
+        self.outputs_size_bytes = sum([o.size_bytes for o in self.outputs])
         if self.inputs:
             self.precision = self.inputs[0].precision
-            self.inputs_size_bytes = np.sum([i.size_bytes for i in self.inputs])
+            self.inputs_size_bytes = sum([i.size_bytes for i in self.inputs])
         else:
             self.inputs_size_bytes = 0
             self.precision = None
@@ -83,6 +85,18 @@ class Layer:
         rep = f"Layer({self.name})"
         return rep
 
+def constants_size(constants: Iterable[Optional[Dict]]) -> np.ndarray:
+    """Return the size (bytes) of each raw constant (e.g. the "Weights" of
+    the raw layers), or 0 where a layer has none"""
+
+    def size(const) -> int:
+        try:
+            return Layer._parse_constant(const)[2]
+        except (KeyError, TypeError):
+            return 0
+
+    return np.array([size(const) for const in constants], dtype=np.int64)
+
 def fold_no_ops(layers: List, bindings: List) -> List:
     """Remove layers of type No-Op"""
 
@@ -0,0 +1,160 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains an analysis of the layout overhead of engine plans.
+
+Layout layers (Reformat, Shuffle and Slice) move data between the compute
+layers without computing anything. Connected layout layers form a chain
+(which may fork), and each chain is attributed to the compute layers that
+produce its inputs and consume its outputs. Chains are grouped by the
+layout transition they perform (input formats -> output formats), so that
+the most expensive transitions can be ranked by their end-to-end time.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Sequence
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .dag import LayerDAG
+
+LAYOUT_LAYER_TYPES = ("Reformat", "Shuffle", "Slice")
+
+class LayoutChains(NamedTuple):
+    """The results of the layout analysis (latencies in ms).
+
+    `chains` has one row per chain of layout layers, `transitions` one row
+    per layout transition (most expensive first) and `by_layer` one row per
+    compute layer adjacent to a chain.
+    """
+    latency: float
+    pct_time: float
+    chains: pd.DataFrame
+    transitions: pd.DataFrame
+    by_layer: pd.DataFrame
+
+def _unique(values: Iterable) -> List:
+    return list(dict.fromkeys(values))
+
+def _find_chains(dag: LayerDAG, is_layout: np.ndarray) -> List[List[int]]:
+    """Return the connected components of the layout layers, each in
+    topological order"""
+    rank = np.empty(len(dag), dtype=np.int64)
+    rank[dag.order] = np.arange(len(dag))
+    visited = np.zeros(len(dag), dtype=bool)
+    chains = []
+    for i in dag.order:
+        if not is_layout[i] or visited[i]:
+            continue
+        visited[i] = True
+        chain, stack = [], [i]
+        while stack:
+            j = stack.pop()
+            chain.append(j)
+            for k in dag.preds[j] + dag.succs[j]:
+                if is_layout[k] and not visited[k]:
+                    visited[k] = True
+                    stack.append(k)
+        chains.append(sorted(chain, key=lambda j: rank[j]))
+    return chains
+
+def layout_chains(plan: EnginePlan, layer_types: Sequence[str] = LAYOUT_LAYER_TYPES, node_ids: Iterable[int] = None, dag: LayerDAG = None) -> LayoutChains:
+    """Find the chains of layout layers of a plan (or of the subgraph
+    `node_ids` of `dag`) and account for their cost.
+
+    Bytes moved are the sizes of the inputs and outputs of the layout layers.
+    The `origin` of a chain lists the origins of its layers (`attr.origin`,
+    e.g. REFORMAT or QDQ). Chains which read or write a binding have no
+    producer or consumer layer on that side.
+    """
+    dag = dag or LayerDAG(plan)
+    layers = dag.layers
+    in_scope = dag.scope_mask(node_ids)
+    is_layout = in_scope & np.array([layer.type in layer_types for layer in layers], dtype=bool)
+    total_latency = dag.latency[in_scope].sum()
+
+    def pct(latency: float) -> float:
+        return 100. * latency / total_latency if total_latency > 0 else 0.
+
+    rows = []
+    produced, consumed = {}, {}
+    for chain_id, chain in enumerate(_find_chains(dag, is_layout)):
+        members = set(chain)
+        producers = _unique(p for i in chain for p in dag.preds[i] if p not in members)
+        consumers = _unique(s for i in chain for s in dag.succs[i] if s not in members)
+        internal_outputs = {t.name for i in chain for t in layers[i].outputs}
+        internal_inputs = {t.name for i in chain for t in layers[i].inputs}
+        external_inputs = {t.name for s in consumers for t in layers[s].inputs}
+        input_formats = _unique(t.format for i in chain for t in layers[i].inputs if t.name not in internal_outputs)
+        # Outputs which leave the chain (consumed outside of it, or bindings).
+        output_formats = _unique(t.format for i in chain for t in layers[i].outputs if t.name in external_inputs or t.name not in internal_inputs)
+        latency = dag.latency[chain].sum()
+        rows.append({
+            "chain": chain_id,
+            "layers": len(chain),
+            "types": ", ".join(_unique(layers[i].type for i in chain)),
+            "origin": ", ".join(_unique(str(layers[i].raw_dict["Origin"]) for i in chain if layers[i].raw_dict.get("Origin"))),
+            "producers": ", ".join(layers[p].name for p in producers),
+            "producer_types": ", ".join(_unique(layers[p].type for p in producers)),
+            "consumers": ", ".join(layers[s].name for s in consumers),
+            "consumer_types": ", ".join(_unique(layers[s].type for s in consumers)),
+            "input_formats": ", ".join(input_formats),
+            "output_formats": ", ".join(output_formats),
+            "latency.avg_time": latency,
+            "latency.pct_time": pct(latency),
+            "bytes": sum(layers[i].total_io_size_bytes for i in chain),
+            "first": layers[chain[0]].name,
+            "last": layers[chain[-1]].name,
+            "names": [layers[i].name for i in chain],
+        })
+        for p in producers:
+            produced.setdefault(p, []).append(latency)
+        for s in consumers:
+            consumed.setdefault(s, []).append(latency)
+
+    chain_cols = ["chain", "layers", "types", "origin", "producers", "producer_types", "consumers", "consumer_types", "input_formats", "output_formats", "latency.avg_time", "latency.pct_time", "bytes", "first", "last", "names"]
+    chains = pd.DataFrame(rows, columns=chain_cols)
+    chains["transition"] = chains["input_formats"] + " -> " + chains["output_formats"]
+
+    transitions = chains.groupby("transition", sort=False).agg(
+        chains=("chain", "size"),
+        layers=("layers", "sum"),
+        latency=("latency.avg_time", "sum"),
+        pct_time=("latency.pct_time", "sum"),
+        bytes=("bytes", "sum"),
+        producer_types=("producer_types", lambda v: ", ".join(_unique(t for types in v for t in types.split(", ") if t))),
+        consumer_types=("consumer_types", lambda v: ", ".join(_unique(t for types in v for t in types.split(", ") if t))),
+    )
+    transitions = transitions.rename(columns={"latency": "latency.avg_time", "pct_time": "latency.pct_time"})
+    transitions = transitions.sort_values("latency.avg_time", ascending=False, kind="mergesort").reset_index()
+
+    by_layer = _by_layer(layers, produced, consumed)
+    latency = dag.latency[is_layout].sum()
+    return LayoutChains(latency, pct(latency), chains, transitions, by_layer)
+
+def _by_layer(layers: List, produced: Dict[int, List[float]], consumed: Dict[int, List[float]]) -> pd.DataFrame:
+    """The layout chains cost attributed to each adjacent compute layer"""
+    ids = sorted(set(produced) | set(consumed))
+    df = pd.DataFrame({
+        "Name": [layers[i].name for i in ids],
+        "type": [layers[i].type for i in ids],
+        "output_chains": [len(produced.get(i, ())) for i in ids],
+        "output_chains_latency": [sum(produced.get(i, ())) for i in ids],
+        "input_chains": [len(consumed.get(i, ())) for i in ids],
+        "input_chains_latency": [sum(consumed.get(i, ())) for i in ids],
+    })
+    df["chains_latency"] = df["output_chains_latency"] + df["input_chains_latency"]
+    return df.sort_values("chains_latency", ascending=False, kind="mergesort").reset_index(drop=True)
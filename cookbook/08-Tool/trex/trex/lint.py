@@ -16,205 +16,246 @@
 #
 """
 This file contains layer linting functions.
+
+Lint rules are evaluated as vectorized predicates over the plan dataframe,
+extended with the attributes of each layer's first input and output tensors
+(see `io_attributes`).
 """
 
+import weakref
 from collections import OrderedDict
-from collections import OrderedDict
-from typing import Dict
+from typing import Callable, Dict, List, NamedTuple
+import numpy as np
 import pandas as pd
-from .activations import create_activations
+from .df_preprocessing import io_attributes
 from .engine_plan import EnginePlan
 
+class LintRule(NamedTuple):
+    """A vectorized lint rule.
+
+    `predicate` receives the lint frame of the layers of type `layer_type`
+    (all layers if `layer_type` is None) and returns a boolean mask of the
+    offending layers.
+    `report` receives the frame of the offending layers and returns an
+    ordered dictionary of report columns (Series or scalars).
+    """
+    name: str
+    layer_type: str
+    predicate: Callable[[pd.DataFrame], pd.Series]
+    report: Callable[[pd.DataFrame], Dict]
+
+# Registered lint rules, grouped by linter name.
+lint_rules: Dict[str, List[LintRule]] = OrderedDict()
+
+def register_lint_rule(linter: str, rule: LintRule):
+    """Register a lint rule with a linter (new linters are created on demand)."""
+    lint_rules.setdefault(linter, []).append(rule)
+
+# Lint frames are computed once per plan.
+_lint_frames = weakref.WeakKeyDictionary()
+
+def lint_frame(plan: EnginePlan) -> pd.DataFrame:
+    """Return the plan dataframe extended with the layers' I/O attributes"""
+    try:
+        return _lint_frames[plan]
+    except KeyError:
+        frame = pd.concat((plan.df, io_attributes(plan.df)), axis=1)
+        _lint_frames[plan] = frame
+        return frame
+
+def evaluate_lint_rules(plan: EnginePlan, rules: List[LintRule]) -> pd.DataFrame:
+    """Evaluate a list of rules and return a report indexed by layer name.
+
+    A layer reported by several rules is reported by the last one.
+    """
+    frame = lint_frame(plan)
+    reports = []
+    for rule in rules:
+        layers = frame if rule.layer_type is None else frame[frame["type"] == rule.layer_type]
+        if len(layers) == 0:
+            continue
+        hits = layers[rule.predicate(layers).to_numpy(dtype=bool)]
+        if len(hits) == 0:
+            continue
+        report = pd.DataFrame(rule.report(hits), index=hits.index)
+        report.index = hits["Name"].to_numpy()
+        reports.append(report)
+    if not reports:
+        return pd.DataFrame()
+    report = pd.concat(reports)
+    return report[~report.index.duplicated(keep="last")]
+
+def lint_plan(plan: EnginePlan, linters: List[str] = None) -> Dict[str, pd.DataFrame]:
+    """Run the registered linters (default: all) and return a report per linter"""
+    linters = linters or list(lint_rules.keys())
+    return OrderedDict((linter, evaluate_lint_rules(plan, lint_rules[linter])) for linter in linters)
+
+def _type_conversion(layers: pd.DataFrame) -> pd.Series:
+    return layers["in.format"].str[:4] + " -> " + layers["out.format"].str[:4]
+
+def _shape_conversion(layers: pd.DataFrame) -> pd.Series:
+    return layers["in.shape"].astype(str) + " -> " + layers["out.shape"].astype(str)
+
+def _quantization_mitigation(layers: pd.DataFrame) -> pd.Series:
+    is_int8 = (layers["in.format"].str[:4] == "Int8") | (layers["out.format"].str[:4] == "Int8")
+    return pd.Series(np.where(is_int8, "Consider adding quantization around float operations.", ""), index=layers.index)
+
+def _is_type_conversion(layers: pd.DataFrame) -> pd.Series:
+    return layers["in.format"].str[:4] != layers["out.format"].str[:4]
+
+# Convolution rules
+
+def _conv_not_accelerated(convs: pd.DataFrame) -> pd.Series:
+    """Convolutions which are not accelerated by TensorCores"""
+    tc_tactic = convs["tactic"].str.contains("imma|hmma|xmma|i88|884", na=False)
+    return (convs["precision"] != "FP32") & ~tc_tactic
+
+def _conv_not_accelerated_report(convs: pd.DataFrame) -> Dict:
+    is_small_conv = (convs["in.rank"] == 4) & (convs["in.channels"] < 32)
+    mitigation = np.where(is_small_conv, "This Convolution has a small number of input channels so acceleration may not be possible.", "")
+    return OrderedDict({"name": convs["Name"], "tactic": convs["tactic"], "subtype": convs["subtype"], "hazard": "Convolution is not accelerated.", "mitigation": mitigation, "help": "TensorCores accelerate large Convolution and GEMM operations."})
+
+def _conv_mixed_precision(convs: pd.DataFrame) -> pd.Series:
+    """Convolutions with Int8 inputs and Float outputs"""
+    return (convs["precision"] == "INT8") & (convs["in.format"].str[:4] == "Int8") & (convs["out.format"].str[:4] != "Int8")
+
+def _conv_mixed_precision_report(convs: pd.DataFrame) -> Dict:
+    return OrderedDict({
+        "name": convs["Name"],
+        "tactic": convs["tactic"],
+        "subtype": convs["subtype"],
+        "hazard": "Quantized Convolution has float outputs.",
+        "mitigation": "Consider adding quantization after the convolution.",
+        "help": "Quantized Convolution with float outputs is ill advised "
+        "for memory-limited convolutions."
+    })
+
+def _conv_misaligned(convs: pd.DataFrame) -> pd.Series:
+    """Convolutions with channels which are not aligned for TensorCores"""
+    is_4d = (convs["in.rank"] == 4) & (convs["out.rank"] == 4)
+    alignment = np.where(convs["precision"] == "INT8", 16, 8)
+    aligned = (convs["in.channels"] % alignment == 0) & (convs["out.channels"] % alignment == 0)
+    return is_4d & ~aligned
+
+def _conv_misaligned_report(convs: pd.DataFrame) -> Dict:
+    return OrderedDict({
+        "name": convs["Name"],
+        "tactic": convs["tactic"],
+        "subtype": convs["subtype"],
+        "hazard": "Convolution channels are not optimally aligned.",
+        "mitigation": "Consider changing the alignment of the convolution's channels.",
+        "help": "For best performance, the input and outputs channels of a Tensor Core"
+        "accelerated convolution should be aligned to 8 (FP32/FP16) or 16 (INT8)"
+    })
+
+register_lint_rule("Convolution", LintRule("tc", "Convolution", _conv_not_accelerated, _conv_not_accelerated_report))
+register_lint_rule("Convolution", LintRule("mixed_precision", "Convolution", _conv_mixed_precision, _conv_mixed_precision_report))
+register_lint_rule("Convolution", LintRule("alignment", "Convolution", _conv_misaligned, _conv_misaligned_report))
+
+# Reformat and Slice rules
+
+def _reformat_type_conversion_report(reformats: pd.DataFrame) -> Dict:
+    return OrderedDict({
+        "name": reformats["Name"],
+        "origin": reformats["Origin"] if "Origin" in reformats else "",
+        'type conversion': _type_conversion(reformats),
+        'shape conversion': _shape_conversion(reformats),
+        "hazard": "Reformat layer is converting operand data type.",
+        "mitigation": _quantization_mitigation(reformats),
+        "help": "Conversions between float32 and float16 are a red "
+        "flag, as are conversions between float32/16 and INT8."
+    })
+
+def _slice_type_conversion_report(slices: pd.DataFrame) -> Dict:
+    return OrderedDict({
+        "name": slices["Name"],
+        'type conversion': _type_conversion(slices),
+        'shape conversion': _shape_conversion(slices),
+        "hazard": "Slice layer is converting operand data type.",
+        "mitigation": _quantization_mitigation(slices),
+        "help": "Conversions between float32 and float16 are a red "
+        "flag, as are conversions between float32/16 <=> INT8."
+    })
+
+register_lint_rule("Reformat", LintRule("type_conversion", "Reformat", _is_type_conversion, _reformat_type_conversion_report))
+register_lint_rule("Slice", LintRule("type_conversion", "Slice", _is_type_conversion, _slice_type_conversion_report))
+
+# Q/DQ rules
+
+def _dangling_qdq(scales: pd.DataFrame) -> pd.Series:
+    """Scale layers which quantize or dequantize"""
+    return scales["in.format"].str.contains("Int8") ^ scales["out.format"].str.contains("Int8")
+
+def _dangling_qdq_report(scales: pd.DataFrame) -> Dict:
+    role = pd.Series(np.where(scales["in.format"].str.contains("Int8"), "Dequanitize", "Quantize"), index=scales.index)
+    return OrderedDict({
+        "name": scales["Name"],
+        'type conversion': _type_conversion(scales),
+        "hazard": "Unfused " + role + " layer",
+        "mitigation": "Check why the " + role + " layer is not fused",
+        "help": f"Unfused Quantize/Dequantize nodes are wasteful and "
+        "should be avoided. Quantize nodes may be necessary "
+        "for quantizing inputs."
+    })
+
+register_lint_rule("Q/DQ", LintRule("dangling_qdq", "Scale", _dangling_qdq, _dangling_qdq_report))
+
+def _report_dict(report: pd.DataFrame) -> OrderedDict:
+    return OrderedDict((name, OrderedDict(row)) for name, row in report.to_dict(orient="index", into=OrderedDict).items())
+
 class ConvLinter():
     """Convolution layer linter."""
 
     def __init__(self, plan: EnginePlan):
         self.plan = plan
-        self.convs = plan.get_layers_by_type("Convolution")
+
+    def _rule(self, name: str) -> List[LintRule]:
+        return [rule for rule in lint_rules["Convolution"] if rule.name == name]
 
     def tc_lint(self):
         """Search for Convolutions which are not accelerated by TensorCode"""
-
-        def is_small_conv(conv):
-            inputs, _ = create_activations(conv)
-            if len(inputs[0].shape) != 4:
-                return False
-            n, c, h, w = inputs[0].shape
-            return c < 32
-
-        report = OrderedDict()
-
-        # Look for kernels that are not scheduled for TensorCore acceleration
-        tc_candidates = self.convs.query(f"precision != \"FP32\"").copy()
-
-        # Identify acceleration from tactic name
-        df = tc_candidates
-        df = df[df["tactic"].str.contains("imma|hmma|xmma|i88|884", na=False) == False]
-        for _, conv in df.iterrows():
-            mitigation = ""
-            if is_small_conv(conv):
-                mitigation = "This Convolution has a small number " \
-                    "of input channels so acceleration may not be possible."
-
-            report[conv.Name] = OrderedDict({"name": conv.Name, "tactic": conv.tactic, "subtype": conv.subtype, "hazard": "Convolution is not accelerated.", "mitigation": mitigation, "help": "TensorCores accelerate large Convolution and GEMM operations."})
-        return report
+        return _report_dict(evaluate_lint_rules(self.plan, self._rule("tc")))
 
     def mixed_precision_lint(self):
         """Search for Convolutions with Int8 inputs and Float outputs"""
-        report = OrderedDict()
-
-        df = self.convs
-        df = df.loc[df["precision"] == "INT8"].copy()
-        for index, conv in df.iterrows():
-            inputs, outputs = create_activations(conv)
-            inf = inputs[0].format[:4]
-            outf = outputs[0].format[:4]
-            found = inf == "Int8" and outf != "Int8"
-            if found:
-                report[conv.Name] = OrderedDict({
-                    "name": conv.Name,
-                    "tactic": conv.tactic,
-                    "subtype": conv.subtype,
-                    "hazard": "Quantized Convolution has float outputs.",
-                    "mitigation": "Consider adding quantization after the convolution.",
-                    "help": "Quantized Convolution with float outputs is ill advised "
-                    "for memory-limited convolutions."
-                })
-        return report
+        return _report_dict(evaluate_lint_rules(self.plan, self._rule("mixed_precision")))
 
     def alignment_lint(self):
-
-        def alignment_ok(conv):
-            inputs, outputs = create_activations(conv)
-            prec = conv["precision"]
-            if len(inputs[0].shape) != 4 or len(outputs[0].shape) != 4:
-                return True
-            N, C, H, W = inputs[0].shape
-            _, K, P, Q = outputs[0].shape
-            if prec == "INT8":
-                ok = (C % 16 == 0) and (K % 16 == 0)
-            else:
-                ok = (C % 8 == 0) and (K % 8 == 0)
-            return ok
-
-        report = OrderedDict()
-        for _, conv in self.convs.iterrows():
-            if not alignment_ok(conv):
-                report[conv.Name] = {
-                    "name": conv.Name,
-                    "tactic": conv.tactic,
-                    "subtype": conv.subtype,
-                    "hazard": "Convolution channels are not optimally aligned.",
-                    "mitigation": "Consider changing the alignment of the convolution's channels.",
-                    "help": "For best performance, the input and outputs channels of a Tensor Core"
-                    "accelerated convolution should be aligned to 8 (FP32/FP16) or 16 (INT8)"
-                }
-        return report
+        return _report_dict(evaluate_lint_rules(self.plan, self._rule("alignment")))
 
     def lint(self):
-        report = self.tc_lint()
-        report.update(self.mixed_precision_lint())
-        report.update(self.alignment_lint())
-        df = pd.DataFrame.from_dict(report, orient="index")
-        return df
+        return evaluate_lint_rules(self.plan, lint_rules["Convolution"])
 
 class ReformatLinter():
     """Reformat layer linter."""
 
     def __init__(self, plan: EnginePlan):
         self.plan = plan
-        self.reformats = plan.get_layers_by_type("Reformat")
 
     def lint(self):
         """Search for conversions between types.
 
         Conversions between layouts are assumed to be optimized."""
-        report = OrderedDict()
-
-        for index, reformat in self.reformats.iterrows():
-            inputs, outputs = create_activations(reformat)
-            inf = inputs[0].format[:4]
-            outf = outputs[0].format[:4]
-            if inf != outf:
-                mitigation = ""
-                if "INT8" in [inf, outf]:
-                    mitigation = "Consider adding quantization around float operations."
-                report[reformat.Name] = OrderedDict({
-                    "name": reformat.Name,
-                    "origin": reformat["attr.origin"],
-                    'type conversion': f"{inf} -> {outf}",
-                    'shape conversion': f"{inputs[0].shape} -> {outputs[0].shape}",
-                    "hazard": "Reformat layer is converting operand data type.",
-                    "mitigation": mitigation,
-                    "help": "Conversions between float32 and float16 are a red "
-                    "flag, as are conversions between float32/16 and INT8."
-                })
-
-        df = pd.DataFrame.from_dict(report, orient="index")
-        return df
+        return evaluate_lint_rules(self.plan, lint_rules["Reformat"])
 
 class SliceLinter():
     """Slice layer linter."""
 
     def __init__(self, plan: EnginePlan):
         self.plan = plan
-        self.slices = plan.get_layers_by_type("Slice")
 
     def lint(self):
         """Search for conversions between types.
 
         Conversions between layouts are assumed to be optimized."""
-        report = OrderedDict()
-
-        for index, slice in self.slices.iterrows():
-            inputs, outputs = create_activations(slice)
-            inf = inputs[0].format[:4]
-            outf = outputs[0].format[:4]
-            if inf != outf:
-                mitigation = ""
-                if "INT8" in [inf, outf]:
-                    mitigation = "Consider adding quantization around float operations."
-                report[slice.Name] = OrderedDict({
-                    "name": slice.Name,
-                    'type conversion': f"{inf} -> {outf}",
-                    'shape conversion': f"{inputs[0].shape} -> {outputs[0].shape}",
-                    "hazard": "Slice layer is converting operand data type.",
-                    "mitigation": mitigation,
-                    "help": "Conversions between float32 and float16 are a red "
-                    "flag, as are conversions between float32/16 <=> INT8."
-                })
-
-        df = pd.DataFrame.from_dict(report, orient="index")
-        return df
+        return evaluate_lint_rules(self.plan, lint_rules["Slice"])
 
 class QDQLinter():
     """Q/DQ layer linter."""
 
     def __init__(self, plan: EnginePlan):
         self.plan = plan
-        self.scales = plan.get_layers_by_type("Scale")
 
     def lint(self):
         """Search for dangling Q/DQ layers."""
-        report = OrderedDict()
-
-        for index, scale in self.scales.iterrows():
-            inputs, outputs = create_activations(scale)
-            inf = inputs[0].format[:4]
-            outf = outputs[0].format[:4]
-            is_qdq = ("Int8" in inputs[0].format) ^ ("Int8" in outputs[0].format)
-            if is_qdq:
-                dq = "Int8" in inputs[0].format
-                role = "Quantize" if not dq else "Dequanitize"
-                report[scale.Name] = OrderedDict({
-                    "name": scale.Name,
-                    'type conversion': f"{inf} -> {outf}",
-                    "hazard": f"Unfused {role} layer",
-                    "mitigation": f"Check why the {role} layer is not fused",
-                    "help": f"Unfused Quantize/Dequantize nodes are wasteful and "
-                    "should be avoided. Quantize nodes may be necessary "
-                    "for quantizing inputs."
-                })
-
-        df = pd.DataFrame.from_dict(report, orient="index")
-        return df
+        return evaluate_lint_rules(self.plan, lint_rules["Q/DQ"])
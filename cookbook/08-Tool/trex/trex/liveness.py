@@ -0,0 +1,119 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains an activation-memory liveness analysis of engine plans.
+
+The layers execute serially, in the order of `plan.layers`. An activation
+region is live from the step of the layer that first produces it until the
+step of the layer that last consumes it. All the generations of a region
+share the same memory, so a region written in-place stays live across its
+generations.
+"""
+
+from typing import NamedTuple
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .activations import TensorTable
+
+class Liveness(NamedTuple):
+    """The results of the liveness analysis (sizes in bytes).
+
+    `timeline` has one row per layer (execution step), `regions` one row per
+    activation region, and `live_at_peak` lists the regions which are live
+    at the peak.
+    """
+    peak_bytes: int
+    peak_layer: str
+    timeline: pd.DataFrame
+    regions: pd.DataFrame
+    live_at_peak: pd.DataFrame
+
+def activation_liveness(plan: EnginePlan, include_bindings: bool = False) -> Liveness:
+    """Simulate the activation memory usage of the plan's layers.
+
+    Input and output bindings are allocated by the user, and are not counted
+    unless `include_bindings` is True. Regions which are not produced by any
+    layer (e.g. the outputs of Constant layers) hold weights, and are not
+    counted.
+    """
+    layers = plan.layers
+    nb_steps = len(layers)
+    tensors = TensorTable(layers)
+    codes, names = pd.factorize(pd.Series(tensors.names, dtype=object))
+    nb_regions = len(names)
+
+    # Regions may be viewed with different formats; use the largest view.
+    size = np.zeros(nb_regions, dtype=np.int64)
+    np.maximum.at(size, codes, tensors.size_bytes)
+    start = np.full(nb_regions, nb_steps, dtype=np.int64)
+    np.minimum.at(start, codes[tensors.is_output], tensors.layer_id[tensors.is_output])
+    end = np.full(nb_regions, -1, dtype=np.int64)
+    np.maximum.at(end, codes, tensors.layer_id)
+
+    is_binding = np.isin(names, list(plan.bindings))
+    is_produced = start < nb_steps
+    # Input bindings are live from the first step and output bindings until
+    # the last step.
+    start = np.where(is_produced, start, 0)
+    end = np.where(is_binding & is_produced, nb_steps - 1, end)
+    counted = is_produced | is_binding
+    if not include_bindings:
+        counted &= ~is_binding
+
+    # Allocate at the start step and free after the end step.
+    delta = np.zeros(nb_steps + 1, dtype=np.int64)
+    np.add.at(delta, start[counted], size[counted])
+    np.add.at(delta, end[counted] + 1, -size[counted])
+    live_bytes = np.cumsum(delta)[:nb_steps]
+
+    # The sizes of the regions which become live at each step.
+    allocated_bytes = np.zeros(nb_steps, dtype=np.int64)
+    np.add.at(allocated_bytes, start[counted], size[counted])
+
+    layer_names = [layer.name for layer in layers]
+    timeline = pd.DataFrame({
+        "Name": layer_names,
+        "type": [layer.type for layer in layers],
+        "live_bytes": live_bytes,
+        "allocated_bytes": allocated_bytes,
+    })
+
+    def layer_name(step: int) -> str:
+        return layer_names[step] if 0 <= step < nb_steps else None
+
+    regions = pd.DataFrame({
+        "Name": names,
+        "size_bytes": size,
+        "start": start,
+        "end": end,
+        "first_producer": [layer_name(s) if p else None for s, p in zip(start, is_produced)],
+        "last_use": [layer_name(e) for e in end],
+        "is_binding": is_binding,
+        "counted": counted,
+    })
+
+    if nb_steps == 0:
+        return Liveness(0, None, timeline, regions, regions[:0])
+    peak_step = int(np.argmax(live_bytes))
+    at_peak = counted & (start <= peak_step) & (end >= peak_step)
+    live_at_peak = regions[at_peak].sort_values("size_bytes", ascending=False, kind="mergesort")
+    return Liveness(int(live_bytes[peak_step]), layer_names[peak_step], timeline, regions, live_at_peak)
+
+def peak_activation_memory(plan: EnginePlan, include_bindings: bool = False) -> int:
+    """Return the peak live activation memory (bytes) of the plan"""
+    return activation_liveness(plan, include_bindings).peak_bytes
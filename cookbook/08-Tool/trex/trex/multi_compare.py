@@ -0,0 +1,141 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to compare the layers of N engine plans.
+
+Every plan is aligned against a reference plan (see `alignment.py`) and the
+per-layer latencies of all the plans are gathered in one table, indexed by
+the layers of the reference plan. The alignments are computed in parallel.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from .engine_plan import EnginePlan
+from .alignment import plan_signatures, intern_signatures, align_sequences
+
+# Speedup histogram bins (speedup = reference latency / plan latency).
+DEFAULT_SPEEDUP_BINS = (0, 0.5, 0.8, 0.95, 1.05, 1.25, 2, np.inf)
+
+class PlansComparison(NamedTuple):
+    """The results of comparing N plans against a reference plan.
+
+    `latencies`, `deltas` and `speedups` are indexed by the layers of the
+    reference plan and have one column per plan.
+    """
+    reference: str
+    latencies: pd.DataFrame
+    deltas: pd.DataFrame
+    speedups: pd.DataFrame
+    histograms: pd.DataFrame
+    top_regressors: pd.DataFrame
+    summary: pd.DataFrame
+
+def get_plans_names(plans: List[EnginePlan]):
+    """Create unique plans names"""
+    engine_names = [plan.name for plan in plans]
+    if len(set(engine_names)) != len(plans):
+        engine_names = [plan.name + str(i) for i, plan in enumerate(plans)]
+    return engine_names
+
+def align_to_reference(plans: List[EnginePlan], reference_id: int = 0, exact_matching: bool = True, max_workers: Optional[int] = None) -> List[List[Tuple]]:
+    """Align each plan against the reference plan.
+
+    Returns one list of (reference position, plan position) pairs per plan.
+    The layer signatures of each plan are computed once (and cached), and the
+    alignments run in a pool of `max_workers` processes (set to 1 to align
+    serially).
+    """
+    codes = intern_signatures(*[plan_signatures(plan, exact_matching) for plan in plans])
+    ref_codes = codes[reference_id]
+    if max_workers == 1 or len(plans) <= 2:
+        return [align_sequences(ref_codes, plan_codes) for plan_codes in codes]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(align_sequences, [ref_codes] * len(codes), codes))
+
+def _matched_positions(pairs: List[Tuple]) -> Tuple[np.ndarray, np.ndarray]:
+    matched = [(i, j) for i, j in pairs if i is not None and j is not None]
+    if not matched:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    ref_pos, plan_pos = zip(*matched)
+    return np.array(ref_pos), np.array(plan_pos)
+
+def compare_plans(
+    plans: List[EnginePlan],
+    reference_id: int = 0,
+    exact_matching: bool = True,
+    top_k: int = 10,
+    speedup_bins: Sequence[float] = DEFAULT_SPEEDUP_BINS,
+    max_workers: Optional[int] = None,
+) -> PlansComparison:
+    """Compare the per-layer latencies of several plans to a reference plan.
+
+    Layers of the reference plan without a matching layer in a plan have a
+    NaN latency in that plan's column. The latency of unmatched layers is
+    reported in the summary table.
+    """
+    names = get_plans_names(plans)
+    ref_name, ref_df = names[reference_id], plans[reference_id].df
+    alignments = align_to_reference(plans, reference_id, exact_matching, max_workers)
+
+    latencies = pd.DataFrame({"Name": ref_df["Name"].values, "type": ref_df["type"].values})
+    summary = []
+    for name, plan, pairs in zip(names, plans, alignments):
+        plan_latency = plan.df["latency.avg_time"].to_numpy(dtype=float)
+        ref_pos, plan_pos = _matched_positions(pairs)
+        col = np.full(len(ref_df), np.nan)
+        col[ref_pos] = plan_latency[plan_pos]
+        latencies[name] = col
+        summary.append({
+            "plan": name,
+            "layers": len(plan_latency),
+            "matched layers": len(plan_pos),
+            "unmatched layers": len(plan_latency) - len(plan_pos),
+            "latency": plan_latency.sum(),
+            "matched latency": plan_latency[plan_pos].sum(),
+            "unmatched latency": plan_latency.sum() - plan_latency[plan_pos].sum(),
+        })
+
+    others = [name for i, name in enumerate(names) if i != reference_id]
+    ref_latency = latencies[ref_name].to_numpy()
+    deltas = latencies[["Name", "type"]].copy()
+    speedups = latencies[["Name", "type"]].copy()
+    histograms = pd.DataFrame(index=pd.cut([], speedup_bins).categories)
+    regressors = []
+    for name in others:
+        deltas[name] = latencies[name] - ref_latency
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speedups[name] = ref_latency / latencies[name].to_numpy()
+        histograms[name] = pd.cut(speedups[name], speedup_bins).value_counts(sort=False)
+        top = deltas[name][deltas[name] > 0].nlargest(top_k)
+        regressors.append(
+            pd.DataFrame({
+                "plan": name,
+                "Name": latencies.loc[top.index, "Name"],
+                "type": latencies.loc[top.index, "type"],
+                "reference latency": ref_latency[top.index],
+                "latency": latencies.loc[top.index, name],
+                "delta": top,
+                "speedup": speedups.loc[top.index, name],
+            }))
+    top_regressors = pd.concat(regressors, ignore_index=True) if regressors else pd.DataFrame()
+    histograms.index.name = "speedup"
+
+    summary = pd.DataFrame(summary).set_index("plan")
+    summary["speedup"] = summary.loc[ref_name, "latency"] / summary["latency"]
+    return PlansComparison(ref_name, latencies, deltas, speedups, histograms, top_regressors, summary)
@@ -18,16 +18,21 @@
 Miscellanous functions used in Jupyter notebooks
 """
 
+import functools
 import pandas as pd
-import dtale
-from IPython.core.display import display, HTML
-from ipyfilechooser import FileChooser
-import qgrid
-import pandas as pd
 
-dtale.global_state.set_app_settings(dict(max_column_width=600))  # pixels
+# The notebook packages (IPython, dtale, qgrid, ipyfilechooser) are imported
+# on first use, so that the reports can be rendered without them (see
+# `headless_report.py`).
+
+@functools.lru_cache(maxsize=None)
+def _import_dtale():
+    import dtale
+    dtale.global_state.set_app_settings(dict(max_column_width=600))  # pixels
+    return dtale
 
 def section_header(title):
+    from IPython.core.display import HTML
     style = "text-align:center;background:#76b900;padding:20px;color:#ffffff;font-size:2em;"
     return HTML('<div style="{}">{}</div>'.format(style, title))
 
@@ -35,10 +40,13 @@ def set_wide_display(width_pct: int = 90):
     """Configure a wider rendering of the notebook
     (for easier viewing of wide tables and graphs).
     """
+    from IPython.core.display import display, HTML
     display(HTML(f"<style>.container {{width:{width_pct}% !important;}}</style>"))
 
 def display_df_qgrid(df: pd.DataFrame):
     """Display a Pandas dataframe using a qgrid widget"""
+    import qgrid
+    from IPython.core.display import display
     grid = qgrid.show_grid(df, grid_options={
         "forceFitColumns": False,
         "fullWidthRows": True
@@ -58,16 +66,26 @@ def display_df_qgrid(df: pd.DataFrame):
 
 def display_df_dtale(df: pd.DataFrame, range_highlights: dict = None, nan_display: str = "...", precision: int = 4):
     """Display a Pandas dataframe using a dtale widget"""
-    d = dtale.show(df, drop_index=True, allow_cell_edits=False, precision=precision, nan_display=nan_display)
+    from IPython.core.display import display
+    d = _import_dtale().show(df, drop_index=True, allow_cell_edits=False, precision=precision, nan_display=nan_display)
     if range_highlights is not None:
         d.update_settings(range_highlights=range_highlights, background_mode="range")
     display(d)
 
+# While a headless report is rendered (see `headless_report.py`), the
+# dataframes passed to `display_df` are passed to this function instead.
+_display_df_hook = None
+
 def display_df(df: pd.DataFrame, **kwargs):
+    if _display_df_hook is not None:
+        _display_df_hook(df)
+        return
     display_df_dtale(df, **kwargs)
 
-def display_filechooser(rootdir: str) -> FileChooser:
+def display_filechooser(rootdir: str) -> "FileChooser":
     """Create and display a FileChooser widget"""
+    from ipyfilechooser import FileChooser
+    from IPython.core.display import display
     fc = FileChooser(rootdir)
     fc.filter_pattern = '*.engine'
     fc.title = 'Press Select to choose an engine file'
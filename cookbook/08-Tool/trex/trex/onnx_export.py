@@ -0,0 +1,288 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to export engine plans to ONNX files (e.g. to view
+them in Netron).
+
+Each layer is exported as a node with the layer's tensors as inputs and
+outputs. Layers which are valid onnx.ai operators (e.g. a pooling layer as
+MaxPool) are nodes of the default domain; the other layers are nodes of the
+custom "trex" domain, whose op type is the TensorRT layer type. The tensors
+have value infos (shape and data type), and the nodes carry the layer's
+metrics (latency, tactic, precision, sizes) as metadata props.
+
+The model is written node by node: each node is serialized as soon as it is
+created and appended to the serialized graph, so the memory used does not
+grow with the number of nodes. This relies on protobuf's encoding, where
+the elements of a repeated field may be written in separate chunks.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from typing import Dict, List, Sequence
+from .engine_plan import EnginePlan
+from .layer import Layer
+from .activations import Activation
+
+# The ONNX domain of the nodes of TensorRT layers (which are not onnx.ai ops).
+TREX_DOMAIN = "trex"
+TREX_DOMAIN_VERSION = 1
+# Plan dataframe columns which are exported as node metadata.
+NODE_METRIC_COLUMNS = ("latency.avg_time", "latency.pct_time", "tactic", "precision", "output_precision", "weights_size", "total_io_size_bytes", "total_footprint_bytes")
+# Raw layer keys which are not exported as node attributes.
+_NOT_ATTRIBUTES = {"Name", "name", "LayerName", "LayerType", "ParameterType", "Inputs", "Outputs", "InputRegions", "OutputRegions"}
+# TensorProto data types of the tensor precisions.
+_ONNX_DATA_TYPES = {"INT8": "INT8", "FP32": "FLOAT", "FP16": "FLOAT16", "INT32": "INT32", "BOOL": "BOOL"}
+
+def import_onnx():
+    """Import onnx, which is an optional dependency of the ONNX export"""
+    try:
+        import onnx
+    except ImportError:
+        raise ImportError("ONNX export requires onnx (pip install onnx)")
+    return onnx
+
+def onnx_data_type(precision: str) -> int:
+    """Return the ONNX data type (TensorProto enum) of a tensor precision"""
+    onnx = import_onnx()
+    return getattr(onnx.TensorProto, _ONNX_DATA_TYPES.get(precision, "UNDEFINED"))
+
+def onnx_value_info(tensor: Activation, name: str = None):
+    """Create the value info (shape and data type) of a tensor"""
+    onnx = import_onnx()
+    return onnx.helper.make_tensor_value_info(name or tensor.name, onnx_data_type(tensor.precision), tensor.shape)
+
+def onnx_op_type(layer: Layer) -> str:
+    """Return the onnx.ai op type of a layer, or else its layer type"""
+    if layer.type == "Convolution":
+        return "Conv"
+    if layer.type == "Pooling":
+        pooling_type = str(layer.raw_dict.get("PoolingType", "")).upper()
+        if pooling_type == "AVERAGE":
+            return "AveragePool"
+        if pooling_type == "MAX":
+            return "MaxPool"
+    return layer.type
+
+def _onnx_op_attributes(layer: Layer, op_type: str) -> Dict:
+    """Convert the raw attributes of a convolution or pooling layer to the
+    attributes of the onnx.ai op"""
+    raw = layer.raw_dict
+    attributes = {}
+    for onnx_key, raw_key in (("kernel_shape", "Kernel" if layer.type == "Convolution" else "WindowSize"), ("strides", "Stride"), ("dilations", "Dilation"), ("group", "Groups")):
+        if raw.get(raw_key) is not None:
+            attributes[onnx_key] = raw[raw_key]
+    if raw.get("PrePadding") is not None and raw.get("PostPadding") is not None:
+        attributes["pads"] = list(raw["PrePadding"]) + list(raw["PostPadding"])
+    if raw.get("AverageCountExcludesPadding") is not None and op_type == "AveragePool":
+        attributes["count_include_pad"] = 1 - int(raw["AverageCountExcludesPadding"])
+    return attributes
+
+def _attribute_value(value):
+    """Convert a raw layer attribute to a type supported by ONNX attributes"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)) and len(value) > 0:
+        if all(isinstance(v, str) for v in value):
+            return list(value)
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in value):
+            return list(value)
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            return [float(v) for v in value]
+    return json.dumps(value, default=str)
+
+def _raw_attributes(layer: Layer) -> Dict:
+    return {key: value for key, value in sorted(layer.raw_dict.items()) if key not in _NOT_ATTRIBUTES and value is not None}
+
+def layer_attributes(layer: Layer) -> List:
+    """Return the ONNX attributes of a layer's raw attributes"""
+    onnx = import_onnx()
+    return [onnx.helper.make_attribute(key, _attribute_value(value)) for key, value in _raw_attributes(layer).items()]
+
+def make_layer_node(layer: Layer, inputs: List[str], outputs: List[str], metrics: Dict = None, include_attributes: bool = True):
+    """Create the node of a layer.
+
+    The layer is a node of its onnx.ai op (e.g. Conv) if it is a valid node of
+    that op, and its raw attributes are then exported as "attr." metadata
+    (onnx.ai ops reject unknown attributes). Otherwise it is a node of the
+    "trex" domain, with its raw attributes as node attributes.
+    """
+    onnx = import_onnx()
+    metrics = dict(metrics or {})
+    op_type = onnx_op_type(layer)
+    # E.g. a convolution whose weights are not an input tensor is not a Conv.
+    if op_type != layer.type and len(inputs) >= onnx.defs.get_schema(op_type).min_input:
+        node = onnx.helper.make_node(op_type, inputs, outputs, layer.name, **_onnx_op_attributes(layer, op_type))
+        try:
+            onnx.checker.check_node(node)
+        except onnx.checker.ValidationError:
+            node = None
+        if node is not None:
+            if include_attributes:
+                metrics.update((f"attr.{key}", _attribute_value(value)) for key, value in _raw_attributes(layer).items())
+            set_node_metrics(node, metrics)
+            return node
+    node = onnx.helper.make_node(layer.type, inputs, outputs, layer.name, domain=TREX_DOMAIN)
+    if include_attributes:
+        node.attribute.extend(layer_attributes(layer))
+    set_node_metrics(node, metrics)
+    return node
+
+def set_node_metrics(node, metrics: Dict):
+    """Attach a layer's metrics to a node, as metadata props (ONNX 1.16+) and
+    as the node's doc string"""
+    metrics = {key: str(value) for key, value in metrics.items() if value is not None and value == value}
+    if "metadata_props" in type(node).DESCRIPTOR.fields_by_name:
+        for key, value in metrics.items():
+            node.metadata_props.add(key=key, value=value)
+    node.doc_string = "\n".join(f"{key}: {value}" for key, value in metrics.items())
+
+def _varint(value: int) -> bytes:
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append((value & 0x7F) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+class OnnxModelWriter:
+    """Write an ONNX model, one graph element at a time.
+
+    The serialized graph elements (nodes, value infos, inputs and outputs)
+    are appended to a temporary file, and the model is written when the
+    writer is closed.
+    """
+
+    # The ModelProto field number of the graph.
+    _GRAPH_FIELD = 7
+
+    def __init__(self, path: str, graph_name: str, producer_name: str = "trex", metadata: Dict = None, custom_domains: Sequence = ((TREX_DOMAIN, TREX_DOMAIN_VERSION), )):
+        self.onnx = import_onnx()
+        self.path = path
+        self.nb_nodes = 0
+        opset_imports = [self.onnx.helper.make_opsetid("", self.onnx.defs.onnx_opset_version())]
+        opset_imports += [self.onnx.helper.make_opsetid(domain, version) for domain, version in custom_domains]
+        self.model = self.onnx.helper.make_model(self.onnx.GraphProto(), producer_name=producer_name, opset_imports=opset_imports)
+        self.model.ClearField("graph")
+        if metadata:
+            self.onnx.helper.set_model_props(self.model, {key: str(value) for key, value in metadata.items()})
+        self._graph = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+        self._write_graph(name=graph_name)
+
+    def _write_graph(self, **fields):
+        self._graph.write(self.onnx.GraphProto(**fields).SerializeToString())
+
+    def add_node(self, node):
+        self._write_graph(node=[node])
+        self.nb_nodes += 1
+
+    def add_input(self, value_info):
+        self._write_graph(input=[value_info])
+
+    def add_output(self, value_info):
+        self._write_graph(output=[value_info])
+
+    def add_value_info(self, value_info):
+        self._write_graph(value_info=[value_info])
+
+    def close(self):
+        """Write the model file"""
+        graph_size = self._graph.tell()
+        self._graph.seek(0)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.model.SerializeToString())
+            f.write(_varint(self._GRAPH_FIELD << 3 | 2) + _varint(graph_size))
+            shutil.copyfileobj(self._graph, f)
+        os.replace(tmp_path, self.path)
+        self._graph.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._graph.close()
+
+def _layer_metrics(plan: EnginePlan) -> Dict[str, Dict]:
+    cols = [col for col in NODE_METRIC_COLUMNS if col in plan.df.columns]
+    return {name: dict(zip(cols, values)) for name, *values in zip(plan.df["Name"], *[plan.df[col] for col in cols])}
+
+def _plan_metadata(plan: EnginePlan) -> Dict:
+    metadata = {
+        "trex.name": plan.name,
+        "trex.layers": len(plan.df),
+        "trex.total_runtime": plan.total_runtime,
+        "trex.total_act_size": plan.total_act_size,
+        "trex.total_weights_size": plan.total_weights_size,
+    }
+    for key, value in (("device", plan.device_properties.get("Selected Device")), ("precision", plan.builder_cfg.get("Precision"))):
+        if value is not None:
+            metadata[f"trex.{key}"] = value
+    return metadata
+
+def export_onnx(plan: EnginePlan, path: str, include_attributes: bool = True) -> int:
+    """Export a plan to an ONNX file and return the number of nodes.
+
+    Every layer, including Constant layers, is a node (see
+    `make_layer_node`). Tensors which are written by several layers
+    (in-place) are renamed after their first generation (`name:1`, `name:2`,
+    ...), so that each tensor has a single producer. The layers' raw
+    attributes are exported if `include_attributes` is True.
+    """
+    metrics = _layer_metrics(plan)
+    bindings = set(plan.bindings)
+    # The current generation of each produced tensor: (name, tensor).
+    current, generations = {}, {}
+    external_inputs = set()
+    with OnnxModelWriter(path, plan.name, metadata=_plan_metadata(plan)) as writer:
+        for layer in plan.all_layers:
+            inputs = []
+            for tensor in layer.inputs:
+                if tensor.name in current:
+                    inputs.append(current[tensor.name][0])
+                    continue
+                # An input binding, or a region which no layer produces: both
+                # are graph inputs, so that every node input has a producer.
+                if tensor.name not in external_inputs:
+                    external_inputs.add(tensor.name)
+                    writer.add_input(onnx_value_info(tensor))
+                inputs.append(tensor.name)
+            outputs = []
+            for tensor in layer.outputs:
+                generation = generations.get(tensor.name, -1) + 1
+                generations[tensor.name] = generation
+                name = tensor.name if generation == 0 else f"{tensor.name}:{generation}"
+                previous = current.get(tensor.name)
+                if previous is not None and tensor.name in bindings:
+                    # Only the last generation of an output binding is a graph output.
+                    writer.add_value_info(onnx_value_info(previous[1], previous[0]))
+                current[tensor.name] = (name, tensor)
+                if tensor.name not in bindings:
+                    writer.add_value_info(onnx_value_info(tensor, name))
+                outputs.append(name)
+            writer.add_node(make_layer_node(layer, inputs, outputs, metrics.get(layer.name), include_attributes))
+        for name in plan.bindings:
+            if name in current and name not in external_inputs:
+                writer.add_output(onnx_value_info(current[name][1], current[name][0]))
+        return writer.nb_nodes
@@ -19,7 +19,8 @@ JSON file parsing
 """
 
 import json
-from typing import Dict, List, Tuple, BinaryIO
+import re
+from typing import Any, Dict, Iterator, List, Tuple, BinaryIO, TextIO
 
 def read_json(json_file: str) -> BinaryIO:
     try:
@@ -28,25 +29,143 @@ def read_json(json_file: str) -> BinaryIO:
         raise ValueError(f"Could not load JSON file {json_file}")
     return data
 
-def read_graph_file(graph_file: str) -> List:
-    err_msg = f"File {graph_file} does not conform to the expected JSON format."
-    with open(graph_file) as json_file:
-        graph = read_json(json_file)
-        if not isinstance(graph, dict):
-            raise ValueError(err_msg)
-        layers = graph["Layers"]
-        try:
-            bindings = graph["Bindings"]
-        except KeyError:
-            # Older TRT didn't include bindings
-            bindings = list()
-        if not isinstance(layers, list):
+class _JsonStream:
+    """Incremental scanner over a JSON text file.
+
+    The file is read in chunks and JSON values are decoded one at a time, so
+    only the value being decoded (and at most one chunk) is held in memory.
+    """
+
+    _whitespace = re.compile(r"[ \t\n\r]*")
+    _number = re.compile(r"[-+0-9.eE]*")
+
+    def __init__(self, json_file: TextIO, chunk_size: int):
+        self.json_file = json_file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.json_file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the consumed prefix of the buffer.
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ("" at EOF)."""
+        while True:
+            self.pos = self._whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}")
+        self.pos += 1
+        return c
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            # A number which ends the buffer may continue in the next chunk
+            # (a prefix such as "3" of "3.5" is itself a valid number).
+            if self._number.match(self.buf, self.pos).end() == len(self.buf) and self.fill():
+                continue
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # The value may be truncated at the chunk boundary.
+                if not self.fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+def iter_json_members(json_file: TextIO, stream_keys: Tuple[str] = (), chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+    """Incrementally parse a JSON object and yield its (key, value) members.
+
+    The elements of array members listed in `stream_keys` are decoded and
+    yielded one at a time, as (key, element) pairs.
+    """
+    stream = _JsonStream(json_file, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key in stream_keys and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.expect("]")
+            else:
+                while True:
+                    yield key, stream.value()
+                    if stream.expect(",]") == "]":
+                        break
+        else:
+            yield key, stream.value()
+        if stream.expect(",}") == "}":
+            break
+
+class GraphFileReader:
+    """Iterate over the raw layers of a plan-graph JSON file.
+
+    The layers are parsed one at a time so that the JSON file is never loaded
+    into memory as a whole. The engine bindings are available once the
+    iteration is done.
+
+    This bounds the memory used by the JSON text, not by the parsed layers:
+    `EnginePlan` keeps every raw layer dictionary (`Layer.raw_dict`, which
+    the dataframe columns share), so its memory usage still grows with the
+    number of layers.
+    """
+
+    def __init__(self, graph_file: str, chunk_size: int = 1 << 20):
+        self.graph_file = graph_file
+        self.chunk_size = chunk_size
+        # Older TRT didn't include bindings
+        self.bindings = list()
+
+    def __iter__(self) -> Iterator[Dict]:
+        err_msg = f"File {self.graph_file} does not conform to the expected JSON format."
+        found_layers = False
+        with open(self.graph_file) as json_file:
+            members = iter_json_members(json_file, ("Layers", ), self.chunk_size)
+            while True:
+                try:
+                    key, value = next(members)
+                except StopIteration:
+                    break
+                except ValueError:
+                    raise ValueError(f"Could not load JSON file {self.graph_file}")
+                if key == "Bindings":
+                    self.bindings = value
+                elif key == "Layers":
+                    if not isinstance(value, dict):
+                        details_msg = "\nMake sure to enable detailed ProfilingVerbosity."
+                        details_msg += "\nSee https://docs.nvidia.com/deeplearning/tensorrt/developer-guide/index.html#engine-inspector"
+                        raise ValueError(err_msg + details_msg)
+                    found_layers = True
+                    yield value
+        if not found_layers:
             raise ValueError(err_msg)
-        if not isinstance(layers[0], dict):
-            details_msg = "\nMake sure to enable detailed ProfilingVerbosity."
-            details_msg += "\nSee https://docs.nvidia.com/deeplearning/tensorrt/developer-guide/index.html#engine-inspector"
-            raise ValueError(err_msg + details_msg)
-        return layers, bindings
+
+def read_graph_file(graph_file: str) -> List:
+    reader = GraphFileReader(graph_file)
+    layers = list(reader)
+    return layers, reader.bindings
 
 def read_profiling_file(profiling_file: str) -> List[Dict[str, any]]:
     perf = None
@@ -61,11 +180,15 @@ def read_metadata_file(metadata_file: str, device: int = 0):
         metadata = read_json(json_file)
         return metadata[device]
 
-def read_timing_file(timing_json_file: str):
+def read_timing_records(timing_json_file: str) -> List[Dict[str, float]]:
+    """Read the per-inference timing records exported by trtexec (--exportTimes)"""
     with open(timing_json_file) as json_file:
-        timing_recs = read_json(json_file)
-        latencies_list = [rec["latencyMs"] for rec in timing_recs]
-        return latencies_list
+        return read_json(json_file)
+
+def read_timing_file(timing_json_file: str):
+    timing_recs = read_timing_records(timing_json_file)
+    latencies_list = [rec["latencyMs"] for rec in timing_recs]
+    return latencies_list
 
 def read_perf_metadata_file(metadata_file: str, section: str):
     with open(metadata_file) as json_file:
@@ -92,33 +215,31 @@ def get_builder_config(metadata_file: str) -> Dict:
     except (FileNotFoundError, TypeError):
         return {}
 
-def import_graph_file(graph_file: str):
+def convert_deconv(raw_layer: Dict) -> Dict:
+    """Distinguish between convolution and convolution-transpose (deconvolution)"""
+    try:
+        is_deconv = (raw_layer["ParameterType"] == "Convolution" and raw_layer["LayerType"] == "CaskDeconvolutionV2")
+        if is_deconv:
+            raw_layer["ParameterType"] = "Deconvolution"
+    except KeyError:
+        pass
+    return raw_layer
 
-    def disambiguate_layer_names(raw_layers: List) -> List:
-        """If a layer name appears twice we need to disabmiguate it"""
-        names_cnt = {}
-        for raw_layer in raw_layers:
-            name = raw_layer["Name"]
-            if name in names_cnt:
-                names_cnt[name] += 1
-                name += "_" + str(names_cnt[name])
-                raw_layer["Name"] = name
-            else:
-                names_cnt[name] = 1
-        return raw_layers
+def iter_graph_file(reader: GraphFileReader) -> Iterator[Dict]:
+    """Import the raw layers of a plan-graph file, one layer at a time"""
+    names_cnt = {}
+    for raw_layer in reader:
+        raw_layer = convert_deconv(raw_layer)
+        # If a layer name appears twice we need to disabmiguate it
+        name = raw_layer["Name"]
+        if name in names_cnt:
+            names_cnt[name] += 1
+            raw_layer["Name"] = name + "_" + str(names_cnt[name])
+        else:
+            names_cnt[name] = 1
+        yield raw_layer
 
-    def convert_deconv(raw_layers: List) -> List:
-        """Distinguish between convolution and convolution-transpose (deconvolution)"""
-        for raw_layer in raw_layers:
-            try:
-                is_deconv = (raw_layer["ParameterType"] == "Convolution" and raw_layer["LayerType"] == "CaskDeconvolutionV2")
-                if is_deconv:
-                    raw_layer["ParameterType"] = "Deconvolution"
-            except KeyError:
-                pass
-        return raw_layers
-
-    raw_layers, bindings = read_graph_file(graph_file)
-    raw_layers = convert_deconv(raw_layers)
-    raw_layers = disambiguate_layer_names(raw_layers)
-    return raw_layers, bindings
+def import_graph_file(graph_file: str):
+    reader = GraphFileReader(graph_file)
+    raw_layers = list(iter_graph_file(reader))
+    return raw_layers, reader.bindings
@@ -0,0 +1,164 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains a persistent (on-disk) cache of processed engine plans.
+"""
+
+import os
+import json
+import hashlib
+import functools
+import warnings
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+# Bump this whenever the layout of the cached data changes.
+CACHE_FORMAT_VERSION = 1
+
+# The modules which produce the cached data: a change to any of them
+# invalidates the cache entries.
+PREPROCESSING_MODULES = ("activations.py", "df_preprocessing.py", "engine_plan.py", "layer.py", "parser.py", "plan_cache.py")
+
+@functools.lru_cache(maxsize=None)
+def preprocessing_hash() -> str:
+    """Return a hash of the sources of the preprocessing modules"""
+    h = hashlib.sha1()
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in PREPROCESSING_MODULES:
+        h.update(module.encode() + b"\0")
+        try:
+            with open(os.path.join(source_dir, module), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b"\0missing")
+    return h.hexdigest()
+
+def hash_files(files: List[str]) -> str:
+    """Return a hash of the contents of the input files and of the
+    preprocessing sources.
+
+    Files which are not provided (None) or do not exist are hashed as empty.
+    """
+    h = hashlib.sha1(f"trex-cache-v{CACHE_FORMAT_VERSION}-{preprocessing_hash()}".encode())
+    for file_name in files:
+        h.update(b"\0")
+        if file_name is None:
+            continue
+        try:
+            with open(file_name, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except FileNotFoundError:
+            h.update(b"\0missing")
+    return h.hexdigest()
+
+def json_default(o: Any):
+    """JSON encoder `default` hook for numpy scalars (e.g. in layer attributes)"""
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def _encode_json(obj: Any) -> np.ndarray:
+    return np.frombuffer(json.dumps(obj, default=json_default).encode(), dtype=np.uint8)
+
+def _decode_json(arr: np.ndarray) -> Any:
+    return json.loads(arr.tobytes().decode())
+
+def df_to_columns(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], List]:
+    """Convert a dataframe to a dictionary of column arrays.
+
+    Numeric and boolean columns are stored as-is. Object columns (strings,
+    lists and dictionaries) are stored as one JSON document per column.
+    JSON has no tuples, so the positions of the tuple values of an object
+    column are stored separately (nested tuples become lists).
+    """
+    arrays, columns = {"index": df.index.to_numpy()}, []
+    for i, (col_name, col) in enumerate(df.items()):
+        key = f"col{i}"
+        if col.dtype.kind in "biufc":
+            arrays[key] = col.to_numpy()
+            columns.append((col_name, "array"))
+        else:
+            values = col.tolist()
+            arrays[key] = _encode_json(values)
+            columns.append((col_name, "json"))
+            is_tuple = np.array([isinstance(value, tuple) for value in values], dtype=bool)
+            if is_tuple.any():
+                arrays[f"{key}.tuples"] = is_tuple
+    return arrays, columns
+
+def columns_to_df(arrays: Dict[str, np.ndarray], columns: List) -> pd.DataFrame:
+    """Convert a dictionary of column arrays (see `df_to_columns`) to a dataframe"""
+    index = arrays["index"]
+    data = {}
+    for i, (col_name, kind) in enumerate(columns):
+        arr = arrays[f"col{i}"]
+        if kind == "array":
+            data[col_name] = pd.Series(arr, index=index)
+        else:
+            values = _decode_json(arr)
+            is_tuple = arrays.get(f"col{i}.tuples")
+            if is_tuple is not None:
+                values = [tuple(value) if t else value for value, t in zip(values, is_tuple)]
+            data[col_name] = pd.Series(values, index=index, dtype=object)
+    return pd.DataFrame(data, index=index)
+
+class PlanCache:
+    """A cache entry of a processed EnginePlan.
+
+    The entry is keyed by the content hash of the plan's input files and of
+    the preprocessing sources, and is stored as an uncompressed npz file of
+    columns, so it can be read back without parsing any JSON file.
+    """
+
+    def __init__(self, cache_dir: str, input_files: List[str]):
+        self.cache_dir = cache_dir
+        self.key = hash_files(input_files)
+        self.path = os.path.join(cache_dir, f"{self.key}.npz")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def save(self, df: pd.DataFrame, raw_layers: List[Dict], metadata: Dict):
+        """Store the processed dataframe, the raw layers and the plan metadata."""
+        try:
+            arrays, columns = df_to_columns(df)
+            arrays["raw_layers"] = _encode_json(raw_layers)
+            arrays["metadata"] = _encode_json({**metadata, "columns": columns})
+        except (TypeError, ValueError) as e:
+            warnings.warn(f"Could not cache the engine plan: {e}")
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary file and rename, so that readers never see
+        # a partially-written entry.
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> Tuple[pd.DataFrame, Callable[[], List[Dict]], Dict]:
+        """Load the cached dataframe and metadata.
+
+        The raw layers are returned as a callable which decodes them on demand.
+        """
+        with np.load(self.path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+        metadata = _decode_json(arrays.pop("metadata"))
+        raw_layers = arrays.pop("raw_layers")
+        df = columns_to_df(arrays, metadata.pop("columns"))
+        return df, lambda: _decode_json(raw_layers), metadata
@@ -0,0 +1,214 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains an analysis of the precision transitions of engine plans.
+
+The precision of a layer is the precision of its (first) input, as in the
+plan's `precision` column. A precision boundary is a DAG edge between two
+layers of different precisions: the tensor on the edge is converted by the
+producer (which writes it in the consumer's precision) or by the consumer.
+
+The cost of a boundary is estimated as the bytes of the conversion (the
+tensor is read in one precision and written in the other) over the memory
+bandwidth. Conversions performed by standalone layers (e.g. Reformat) also
+have a measured latency.
+
+Connected layers of the same precision form a precision island.
+"""
+
+from typing import Iterable, List, NamedTuple, Sequence
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .dag import LayerDAG
+from .activations import PRECISIONS, PRECISION_DATA_SIZES, volume
+from .roofline import device_roofline
+
+# Precisions of the tensors which carry data (not shapes or indices).
+DATA_PRECISIONS = ("FP32", "FP16", "INT8")
+# Layers whose only work is converting their input (besides Q/DQ layers).
+CONVERSION_LAYER_TYPES = ("Reformat", "Quantize", "Dequantize")
+
+class PrecisionTransitions(NamedTuple):
+    """The results of the precision transitions analysis (latencies in ms).
+
+    `boundaries` has one row per precision boundary edge, `summary` one row
+    per (from, to) transition (most expensive first) and `islands` one row
+    per precision island. `bandwidth` (bytes/s) is the memory bandwidth used
+    for the cost estimates.
+    """
+    boundaries: pd.DataFrame
+    summary: pd.DataFrame
+    islands: pd.DataFrame
+    bandwidth: float
+
+def layer_precision(layer) -> str:
+    """The precision of a layer's first input (or output, if it has no inputs)"""
+    tensors = layer.inputs or layer.outputs
+    return tensors[0].precision if tensors else None
+
+def _output_precision(layer) -> str:
+    return layer.outputs[0].precision if layer.outputs else None
+
+def _is_conversion_layer(layer) -> bool:
+    return layer.type in CONVERSION_LAYER_TYPES or layer.raw_dict.get("Origin") == "QDQ"
+
+def _sum_known(values: pd.Series) -> float:
+    """Sum values which may be unknown (NaN when no bandwidth is available):
+    the sum of only unknown values is unknown, not 0"""
+    return values.sum(min_count=1)
+
+def _data_size(precision: str) -> int:
+    return int(PRECISION_DATA_SIZES[PRECISIONS.index(precision)])
+
+def _default_bandwidth(plan: EnginePlan, dag: LayerDAG) -> float:
+    """The device memory bandwidth, or else the throughput (bytes/s) of the
+    plan's standalone conversion layers"""
+    try:
+        return device_roofline(plan.device_properties).memory_bandwidth
+    except ValueError:
+        pass
+    converters = [i for i, layer in enumerate(dag.layers) if _is_conversion_layer(layer) and layer_precision(layer) != _output_precision(layer)]
+    latency_s = dag.latency[converters].sum() / 1000.
+    if latency_s <= 0:
+        return np.nan
+    return sum(dag.layers[i].total_io_size_bytes for i in converters) / latency_s
+
+def _islands(dag: LayerDAG, precisions: List[str], in_scope: np.ndarray) -> np.ndarray:
+    """Label the connected components of same-precision layers"""
+    island = np.full(len(dag), -1, dtype=np.int64)
+    nb_islands = 0
+    for i in dag.order:
+        if not in_scope[i] or island[i] >= 0:
+            continue
+        island[i] = nb_islands
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            for k in dag.preds[j] + dag.succs[j]:
+                if in_scope[k] and island[k] < 0 and precisions[k] == precisions[i]:
+                    island[k] = nb_islands
+                    stack.append(k)
+        nb_islands += 1
+    return island
+
+def precision_transitions(
+    plan: EnginePlan,
+    node_ids: Iterable[int] = None,
+    dag: LayerDAG = None,
+    bandwidth: float = None,
+    data_precisions: Sequence[str] = DATA_PRECISIONS,
+) -> PrecisionTransitions:
+    """Find the precision boundaries of a plan (or of the subgraph `node_ids`
+    of `dag`) and estimate their cost.
+
+    Only boundaries between `data_precisions` are reported (shape tensors
+    are usually INT32). `bandwidth` (bytes/s) defaults to the bandwidth of
+    the profiling device.
+    """
+    dag = dag or LayerDAG(plan)
+    layers = dag.layers
+    in_scope = dag.scope_mask(node_ids)
+    precisions = [layer_precision(layer) for layer in layers]
+    island = _islands(dag, precisions, in_scope)
+    if bandwidth is None:
+        bandwidth = _default_bandwidth(plan, dag)
+    total_latency = dag.latency[in_scope].sum()
+
+    rows = []
+    for p in dag.order:
+        if not in_scope[p] or precisions[p] not in data_precisions:
+            continue
+        outputs = {t.name: t for t in layers[p].outputs}
+        for s in dag.succs[p]:
+            if not in_scope[s] or precisions[s] == precisions[p] or precisions[s] not in data_precisions:
+                continue
+            tensor = next((t for t in layers[s].inputs if t.name in outputs), layers[p].outputs[0])
+            converter = p if _output_precision(layers[p]) != precisions[p] else s
+            rows.append({
+                "producer": layers[p].name,
+                "producer_type": layers[p].type,
+                "consumer": layers[s].name,
+                "consumer_type": layers[s].type,
+                "tensor": tensor.name,
+                "from": precisions[p],
+                "to": precisions[s],
+                "converter": layers[converter].name,
+                "standalone": _is_conversion_layer(layers[converter]),
+                "converter_id": converter,
+                "from_island": island[p],
+                "to_island": island[s],
+                "bytes": volume(tensor.shape) * (_data_size(precisions[p]) + _data_size(precisions[s])),
+            })
+
+    cols = ["producer", "producer_type", "consumer", "consumer_type", "tensor", "from", "to", "converter", "standalone", "converter_id", "from_island", "to_island", "bytes"]
+    boundaries = pd.DataFrame(rows, columns=cols)
+    boundaries["est_latency"] = 1000. * boundaries["bytes"] / bandwidth if bandwidth else np.nan
+    # A standalone conversion layer's latency is shared by its boundary edges.
+    edges_per_converter = boundaries.groupby("converter_id")["converter_id"].transform("size")
+    measured = dag.latency[boundaries["converter_id"].to_numpy(dtype=np.int64)] / edges_per_converter
+    boundaries["measured_latency"] = measured.where(boundaries["standalone"])
+    boundaries["latency"] = boundaries["measured_latency"].fillna(boundaries["est_latency"])
+    boundaries["pct_time"] = 100. * boundaries["latency"] / total_latency if total_latency > 0 else 0.
+    boundaries = boundaries.drop(columns=["converter_id"])
+
+    summary = boundaries.groupby(["from", "to"]).agg(
+        edges=("tensor", "size"),
+        standalone=("standalone", "sum"),
+        bytes=("bytes", "sum"),
+        est_latency=("est_latency", _sum_known),
+        measured_latency=("measured_latency", _sum_known),
+        latency=("latency", _sum_known),
+        pct_time=("pct_time", _sum_known),
+    )
+    summary = summary.sort_values("latency", ascending=False, kind="mergesort").reset_index()
+
+    islands = _islands_summary(dag, precisions, island, boundaries, total_latency)
+    return PrecisionTransitions(boundaries, summary, islands, bandwidth)
+
+def _islands_summary(dag: LayerDAG, precisions: List[str], island: np.ndarray, boundaries: pd.DataFrame, total_latency: float) -> pd.DataFrame:
+    members = {}
+    for i in dag.order:
+        if island[i] >= 0:
+            members.setdefault(island[i], []).append(i)
+    ids = sorted(members)
+    latency = np.array([dag.latency[members[k]].sum() for k in ids], dtype=float)
+    islands = pd.DataFrame({
+        "island": ids,
+        "precision": [precisions[members[k][0]] for k in ids],
+        "layers": [len(members[k]) for k in ids],
+        "latency.avg_time": latency,
+        "latency.pct_time": 100. * latency / total_latency if total_latency > 0 else 0.,
+        "first": [dag.layers[members[k][0]].name for k in ids],
+        "last": [dag.layers[members[k][-1]].name for k in ids],
+    })
+    # Islands without boundaries have no conversion cost.
+    entering = boundaries.groupby("to_island")["latency"].agg(["size", _sum_known])
+    leaving = boundaries.groupby("from_island")["latency"].agg(["size", _sum_known])
+    islands["boundaries_in"] = islands["island"].map(entering["size"]).fillna(0).astype("int64")
+    islands["conversion_in_latency"] = islands["island"].map(entering["_sum_known"]).where(islands["boundaries_in"] > 0, 0.)
+    islands["boundaries_out"] = islands["island"].map(leaving["size"]).fillna(0).astype("int64")
+    islands["conversion_out_latency"] = islands["island"].map(leaving["_sum_known"]).where(islands["boundaries_out"] > 0, 0.)
+    return islands
+
+def transition_matrix(transitions: PrecisionTransitions, values: str = "latency") -> pd.DataFrame:
+    """Pivot the transitions summary to a from x to matrix of `values`
+    (e.g. latency, bytes or edges)"""
+    summary = transitions.summary
+    order = [p for p in PRECISIONS if p in set(summary["from"]) | set(summary["to"])]
+    matrix = summary.pivot(index="from", columns="to", values=values)
+    return matrix.reindex(index=order, columns=order)
@@ -0,0 +1,257 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains a regression database of engine metrics (SQLite).
+
+Each ingested plan is a build, with its summary, builder configuration and
+device properties, and the metrics of its layers. Layer names usually change
+between builds, so layers are also identified by their signature (see
+`alignment.layer_signature`) and the occurrence of the signature in the
+build (the n-th layer with the same signature).
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .alignment import plan_signatures
+from .plan_cache import json_default
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    build_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    label TEXT,
+    timestamp REAL NOT NULL,
+    layers INTEGER,
+    total_runtime REAL,
+    total_act_size INTEGER,
+    total_weights_size INTEGER,
+    device TEXT,
+    precision TEXT,
+    builder_cfg TEXT,
+    device_properties TEXT,
+    performance_summary TEXT
+);
+CREATE INDEX IF NOT EXISTS builds_name ON builds (name, timestamp);
+CREATE TABLE IF NOT EXISTS layers (
+    build_id INTEGER NOT NULL REFERENCES builds (build_id) ON DELETE CASCADE,
+    layer_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    signature TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    precision TEXT,
+    tactic TEXT,
+    latency REAL,
+    weights_size INTEGER,
+    io_size INTEGER,
+    PRIMARY KEY (build_id, layer_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS layers_signature ON layers (signature, occurrence, build_id);
+CREATE UNIQUE INDEX IF NOT EXISTS layers_build_signature ON layers (build_id, signature, occurrence);
+CREATE INDEX IF NOT EXISTS layers_name ON layers (name, build_id);
+"""
+
+def signature_id(signature: Tuple) -> str:
+    """Return a short, stable identifier of a layer signature"""
+    return hashlib.sha1(repr(signature).encode()).hexdigest()[:16]
+
+def layer_signature_ids(plan: EnginePlan) -> Tuple[List[str], List[int]]:
+    """Return the signature identifier of each layer of the plan and the
+    occurrence of the signature in the plan (in dataframe order)"""
+    ids, occurrences, counts = [], [], {}
+    for signature in plan_signatures(plan, exact_matching=True):
+        sig_id = signature_id(signature)
+        occurrence = counts.get(sig_id, 0)
+        counts[sig_id] = occurrence + 1
+        ids.append(sig_id)
+        occurrences.append(occurrence)
+    return ids, occurrences
+
+class RegressionDB:
+    """A file-backed database of engine builds and layer metrics"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def ingest(self, plan: EnginePlan, name: str = None, label: str = None, timestamp: float = None) -> int:
+        """Add a plan to the database and return its build id.
+
+        Builds are grouped by `name` (default: the plan name) and ordered by
+        `timestamp` (default: now). `label` is free text (e.g. a nightly tag).
+        """
+        df = plan.df
+        signatures, occurrences = layer_signature_ids(plan)
+        dumps = lambda d: json.dumps(d, default=json_default)
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO builds (name, label, timestamp, layers, total_runtime, total_act_size, total_weights_size, device, precision, builder_cfg, device_properties, performance_summary)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                    name or plan.name,
+                    label,
+                    time.time() if timestamp is None else timestamp,
+                    len(df),
+                    float(plan.total_runtime),
+                    int(plan.total_act_size),
+                    int(plan.total_weights_size),
+                    plan.device_properties.get("Selected Device"),
+                    plan.builder_cfg.get("Precision"),
+                    dumps(plan.builder_cfg),
+                    dumps(plan.device_properties),
+                    dumps(plan.performance_summary),
+                ))
+            build_id = cursor.lastrowid
+            rows = zip(
+                [build_id] * len(df),
+                range(len(df)),
+                df["Name"].tolist(),
+                df["type"].tolist(),
+                signatures,
+                occurrences,
+                [p if isinstance(p, str) else None for p in df["precision"]],
+                df["tactic"].tolist(),
+                df["latency.avg_time"].astype(float).tolist(),
+                df["weights_size"].astype(int).tolist(),
+                df["total_io_size_bytes"].astype(int).tolist(),
+            )
+            self.conn.executemany("INSERT INTO layers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return build_id
+
+    def delete_build(self, build_id: int):
+        with self.conn:
+            self.conn.execute("DELETE FROM builds WHERE build_id = ?", (build_id, ))
+
+    def query(self, sql: str, params: Tuple = ()) -> pd.DataFrame:
+        """Run a SQL query and return the results as a dataframe"""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def builds(self, name: str = None, last: int = None) -> pd.DataFrame:
+        """Return the builds (oldest first), optionally the `last` builds of
+        the builds group `name`"""
+        where, params = ("WHERE name = ?", (name, )) if name else ("", ())
+        limit = f"LIMIT {int(last)}" if last else ""
+        cols = "build_id, name, label, timestamp, layers, total_runtime, total_act_size, total_weights_size, device, precision"
+        df = self.query(f"SELECT * FROM (SELECT {cols} FROM builds {where} ORDER BY timestamp DESC, build_id DESC {limit}) ORDER BY timestamp, build_id", params)
+        df["time"] = pd.to_datetime(df["timestamp"], unit="s")
+        return df
+
+    def build_metadata(self, build_id: int) -> dict:
+        """Return the builder configuration, device properties and performance
+        summary of a build"""
+        row = self.conn.execute("SELECT builder_cfg, device_properties, performance_summary FROM builds WHERE build_id = ?", (build_id, )).fetchone()
+        if row is None:
+            raise KeyError(build_id)
+        return dict(zip(("builder_cfg", "device_properties", "performance_summary"), (json.loads(v) for v in row)))
+
+    def layers(self, build_id: int) -> pd.DataFrame:
+        """Return the layer metrics of a build"""
+        return self.query("SELECT * FROM layers WHERE build_id = ? ORDER BY layer_id", (build_id, ))
+
+    def layer_history(self, signature: str = None, layer_name: str = None, occurrence: int = 0, name: str = None, last: int = 30) -> pd.DataFrame:
+        """Return the latency of a layer over the `last` builds (oldest first).
+
+        The layer is identified either by its signature identifier (and the
+        occurrence of the signature), which is stable across builds, or by
+        its name.
+        """
+        if signature is not None:
+            layer_cond, params = "l.signature = ? AND l.occurrence = ?", [signature, occurrence]
+        elif layer_name is not None:
+            layer_cond, params = "l.name = ?", [layer_name]
+        else:
+            raise ValueError("Either signature or layer_name is required")
+        build_cond = ""
+        if name is not None:
+            build_cond = "AND b.name = ?"
+            params.append(name)
+        params.append(int(last))
+        sql = ("SELECT * FROM ("
+               " SELECT b.build_id, b.name AS build_name, b.label, b.timestamp, l.name, l.type, l.precision, l.tactic, l.latency"
+               " FROM layers l JOIN builds b ON b.build_id = l.build_id"
+               f" WHERE {layer_cond} {build_cond}"
+               " ORDER BY b.timestamp DESC, b.build_id DESC LIMIT ?"
+               ") ORDER BY timestamp, build_id")
+        return self.query(sql, tuple(params))
+
+    def first_regression(self, name: str, metric: str = "total_runtime", threshold: float = 0.05, baseline: str = "previous") -> Optional[pd.Series]:
+        """Return the first build of group `name` whose `metric` regressed by
+        more than `threshold` (relative), or None.
+
+        The baseline of each build is the previous build ("previous"), the
+        first build ("first") or the best preceding build ("best").
+        """
+        builds = self.builds(name)
+        values = builds[metric].to_numpy(dtype=float)
+        if len(values) < 2:
+            return None
+        if baseline == "previous":
+            reference = np.concatenate(([np.nan], values[:-1]))
+        elif baseline == "first":
+            reference = np.full(len(values), values[0])
+        elif baseline == "best":
+            reference = np.concatenate(([np.nan], np.minimum.accumulate(values)[:-1]))
+        else:
+            raise ValueError(f"Unknown baseline: {baseline}")
+        with np.errstate(invalid="ignore"):
+            change = values / reference - 1
+        regressed = np.flatnonzero(change[1:] > threshold) + 1
+        if len(regressed) == 0:
+            return None
+        build = builds.iloc[regressed[0]].copy()
+        build["baseline"] = reference[regressed[0]]
+        build["change"] = change[regressed[0]]
+        return build
+
+    def compare_builds(self, baseline_id: int, build_id: int, threshold: float = 0.05) -> pd.DataFrame:
+        """Match the layers of two builds by signature and occurrence, and
+        return the layers whose latency changed by more than `threshold`
+        (relative), largest absolute change first.
+
+        Layers without a match in the other build have a NaN latency.
+        """
+        sql = ("SELECT b.signature, b.occurrence, b.name AS baseline_name, n.name, COALESCE(n.type, b.type) AS type,"
+               " b.latency AS baseline_latency, n.latency AS latency"
+               " FROM layers b LEFT JOIN layers n ON n.build_id = ? AND n.signature = b.signature AND n.occurrence = b.occurrence"
+               " WHERE b.build_id = ?"
+               " UNION ALL "
+               "SELECT n.signature, n.occurrence, NULL, n.name, n.type, NULL, n.latency"
+               " FROM layers n WHERE n.build_id = ? AND NOT EXISTS"
+               " (SELECT 1 FROM layers b WHERE b.build_id = ? AND b.signature = n.signature AND b.occurrence = n.occurrence)")
+        df = self.query(sql, (build_id, baseline_id, build_id, baseline_id))
+        df["delta"] = df["latency"] - df["baseline_latency"]
+        df["change"] = df["delta"] / df["baseline_latency"]
+        changed = (df["change"].abs() > threshold) | df["delta"].isna()
+        df = df[changed]
+        return df.reindex(df["delta"].abs().sort_values(ascending=False, na_position="last").index).reset_index(drop=True)
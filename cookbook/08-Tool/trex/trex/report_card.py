@@ -28,6 +28,8 @@ from .df_preprocessing import clean_for_display
 from .plotting import *
 from .graphing import *
 from .parser import read_timing_file
+from .roofline import layer_roofline, device_roofline
+from .precision_transitions import precision_transitions, transition_matrix
 
 def report_card_perf_overview(plan: EnginePlan):
     """Display performance overview diagrams.
@@ -141,7 +143,7 @@ def report_card_table_view(plan: EnginePlan):
         else:
             df = plan.get_layers_by_type(choice)
             print(f"There are {len(df)} {choice} layers which account for"
-                  f"{df["latency.pct_time"].sum(): .2f}% ({df["latency.avg_time"].sum(): .5f} ms) of the overall latency.")
+                  f"{df['latency.pct_time'].sum(): .2f}% ({df['latency.avg_time'].sum(): .5f} ms) of the overall latency.")
             display_df(clean_for_display(df))
 
     types = ["All"] + list(set(plan.df["type"]))
@@ -305,6 +307,34 @@ def report_card_efficiency_vs_latency_3d(plan: pd.DataFrame):
     trex_base_layout(fig)
     fig.show()
 
+def report_card_roofline(plan: EnginePlan):
+    """Plot the GEMM-like layers on the device roofline (log-log)"""
+    device = device_roofline(plan.device_properties)
+    layers = layer_roofline(plan, device).dropna(subset=["arithmetic_intensity", "achieved_flops"])
+    fig = px.scatter(layers, x="arithmetic_intensity", y="achieved_flops", color="precision", symbol="below_roofline", hover_name="Name", hover_data=["type", "latency.avg_time", "efficiency", "bound"], log_x=True, log_y=True)
+    intensity = [min(layers["arithmetic_intensity"].min(), 1), max(layers["arithmetic_intensity"].max(), 1e4)]
+    # Precisions without a peak (e.g. TF32 before Ampere, or INT32) have no roofline.
+    for precision in sorted(set(layers["precision"]) & set(device.peak_flops)):
+        ridge = device.ridge_point(precision)
+        x = [intensity[0], ridge, intensity[1]] if intensity[0] < ridge < intensity[1] else intensity
+        y = [min(device.peak_flops[precision], ai * device.memory_bandwidth) for ai in x]
+        fig.add_trace(go.Scatter(x=x, y=y, mode="lines", name=f"{precision} roofline", line=dict(dash="dash")))
+    fig.update_layout({"xaxis_title": "Arithmetic intensity (FLOP/byte)", "yaxis_title": "Throughput (FLOP/s)", "title": f"Roofline ({device.name})", "title_x": 0.5})
+    trex_base_layout(fig)
+    fig.show()
+
+def report_card_precision_transitions(plan: EnginePlan):
+    """Plot a heatmap of the cost of the precision transitions (from x to)"""
+    transitions = precision_transitions(plan)
+    latency = transition_matrix(transitions, "latency")
+    edges = transition_matrix(transitions, "edges").fillna(0).astype(int)
+    fig = px.imshow(latency, labels=dict(x="To", y="From", color="Latency (ms)"), color_continuous_scale="Reds")
+    fig.update_traces(text=edges.to_numpy(), hovertemplate="%{y} -> %{x}: %{z:.3f} ms (%{text} edges)")
+    fig.update_layout({"title": "Precision transitions (estimated conversion latency)", "title_x": 0.5})
+    trex_base_layout(fig)
+    fig.show()
+    display_df(transitions.islands.sort_values("latency.avg_time", ascending=False))
+
 def report_card_perf_scatter(plan: pd.DataFrame):
 
     def render_scatter(choice, x, y, color, size):
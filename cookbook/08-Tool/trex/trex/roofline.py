@@ -0,0 +1,181 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains a roofline model of the GEMM-like layers of a plan.
+
+The FLOPs of Convolution, Deconvolution, FullyConnected and MatrixMultiply
+layers are computed from their shapes, and the bytes moved are the sizes of
+the layers' inputs, outputs and weights (i.e. each tensor is accessed once).
+The attainable throughput of a layer is the lower of the device's peak
+compute throughput (for the layer's precision) and the arithmetic intensity
+times the peak memory bandwidth.
+"""
+
+from typing import Dict, List, NamedTuple
+import numpy as np
+import pandas as pd
+from .engine_plan import EnginePlan
+from .activations import volume
+
+ROOFLINE_LAYER_TYPES = ("Convolution", "Deconvolution", "FullyConnected", "MatrixMultiply")
+
+# Dense multiply-accumulates per clock cycle per SM, by compute capability.
+# INT8 on compute capability 7.0 uses DP4A (no INT8 TensorCores).
+_MACS_PER_CLOCK = {
+    7.0: {"FP32": 64, "FP16": 512, "INT8": 256},
+    7.5: {"FP32": 64, "FP16": 512, "INT8": 1024},
+    8.0: {"FP32": 64, "TF32": 512, "FP16": 1024, "INT8": 2048},
+    8.6: {"FP32": 128, "TF32": 256, "FP16": 512, "INT8": 1024},
+    8.9: {"FP32": 128, "TF32": 256, "FP16": 512, "INT8": 1024},
+    9.0: {"FP32": 128, "TF32": 1024, "FP16": 2048, "INT8": 4096},
+}
+
+class DeviceRoofline(NamedTuple):
+    """The peak throughputs of a device.
+
+    `peak_flops` maps a precision (FP32, TF32, FP16, INT8) to its peak
+    throughput (FLOP/s) and `memory_bandwidth` is in bytes/s.
+    """
+    name: str
+    peak_flops: Dict[str, float]
+    memory_bandwidth: float
+
+    def ridge_point(self, precision: str) -> float:
+        """The arithmetic intensity (FLOP/byte) above which a layer is compute-bound"""
+        return self.peak_flops[precision] / self.memory_bandwidth
+
+def device_roofline(device_properties: Dict) -> DeviceRoofline:
+    """Create the roofline of a device from the device properties reported by
+    trtexec (see `EnginePlan.device_properties`)."""
+    try:
+        capability = float(device_properties["Compute Capability"])
+        nb_sms = float(device_properties["SMs"])
+        clock_hz = float(device_properties["Compute Clock Rate"]) * 1e9
+        memory_clock_hz = float(device_properties["Memory Clock Rate"]) * 1e9
+        bus_width_bits = float(device_properties["Memory Bus Width"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("The device properties are missing (was the profiling metadata file provided?)")
+    # Use the closest known (older) architecture.
+    known = [cc for cc in _MACS_PER_CLOCK if cc <= capability]
+    macs_per_clock = _MACS_PER_CLOCK[max(known) if known else min(_MACS_PER_CLOCK)]
+    peak_flops = {precision: 2. * macs * nb_sms * clock_hz for precision, macs in macs_per_clock.items()}
+    # Double data rate memory.
+    memory_bandwidth = 2. * memory_clock_hz * bus_width_bits / 8
+    return DeviceRoofline(device_properties.get("Selected Device", ""), peak_flops, memory_bandwidth)
+
+def _kernel_volume(kernel) -> int:
+    return volume(kernel) if isinstance(kernel, (list, tuple)) and len(kernel) else 1
+
+def _first_shapes(tensors: pd.Series) -> List[List[int]]:
+    """The shape of the first tensor of each layer (None if there is none)"""
+    return [t[0]["Dimensions"] if isinstance(t, list) and len(t) else None for t in tensors]
+
+def _dim(shapes: List[List[int]], axis: int) -> np.ndarray:
+    return np.array([s[axis] if s is not None and len(s) > max(axis, -axis - 1) else np.nan for s in shapes], dtype=float)
+
+def _numeric_column(layers: pd.DataFrame, column: str, default: float) -> np.ndarray:
+    if column not in layers:
+        return np.full(len(layers), default, dtype=float)
+    values = pd.to_numeric(layers[column], errors="coerce").to_numpy(dtype=float)
+    return np.where(np.isnan(values) | (values == 0), default, values)
+
+def layers_flops(layers: pd.DataFrame) -> np.ndarray:
+    """Return the floating-point operations (2 per multiply-accumulate) of
+    GEMM-like layers, or NaN for the layers whose shapes are not supported.
+
+    The FLOPs are computed from the layers' raw `Inputs` and `Outputs`
+    columns, for all the layers at once.
+    """
+    inp, out = _first_shapes(layers["Inputs"]), _first_shapes(layers["Outputs"])
+    inp_vol = np.array([volume(s) if s is not None else np.nan for s in inp], dtype=float)
+    out_vol = np.array([volume(s) if s is not None else np.nan for s in out], dtype=float)
+    kernel_vol = np.array([_kernel_volume(k) for k in layers["Kernel"]], dtype=float) if "Kernel" in layers else np.ones(len(layers))
+    groups = _numeric_column(layers, "Groups", 1.)
+    out_maps = _numeric_column(layers, "OutMaps", np.nan)
+    out_maps = np.where(np.isnan(out_maps), _dim(out, 1), out_maps)
+    op_a = layers["MatrixOpA"].astype(str).str.upper() if "MatrixOpA" in layers else pd.Series("", index=layers.index)
+    transpose_a = op_a.str.contains("TRANSPOSE").to_numpy()
+    gemm_k = np.where(transpose_a & ~np.isnan(_dim(inp, -2)), _dim(inp, -2), _dim(inp, -1))
+
+    layer_type = layers["type"].to_numpy()
+    with np.errstate(invalid="ignore"):
+        flops = np.select(
+            [layer_type == "Convolution", layer_type == "Deconvolution", layer_type == "FullyConnected", layer_type == "MatrixMultiply"],
+            [2. * out_vol * _dim(inp, 1) / groups * kernel_vol,
+             2. * inp_vol * _dim(out, 1) / groups * kernel_vol,
+             2. * inp_vol * np.nan_to_num(out_maps),
+             2. * out_vol * gemm_k],
+            default=np.nan)
+    # Convolutions need the channels of both their input and output.
+    is_conv = np.isin(layer_type, ("Convolution", "Deconvolution"))
+    flops[is_conv & (np.isnan(_dim(inp, 1)) | np.isnan(_dim(out, 1)))] = np.nan
+    return flops
+
+def layer_flops(layer: pd.Series) -> float:
+    """Return the floating-point operations (2 per multiply-accumulate) of a
+    GEMM-like layer, or NaN if the layer's shapes are not supported."""
+    return float(layers_flops(layer.to_frame().T)[0])
+
+def _compute_precision(precision: str, tactic: str) -> str:
+    if precision == "FP32" and "tf32" in str(tactic).lower():
+        return "TF32"
+    return precision
+
+def layer_roofline(plan: EnginePlan, device: DeviceRoofline = None, threshold: float = 0.25, layer_types: List[str] = ROOFLINE_LAYER_TYPES) -> pd.DataFrame:
+    """Place the GEMM-like layers of a plan on the device's roofline.
+
+    Throughputs are in FLOP/s and bytes/s. `efficiency` is the achieved
+    throughput relative to the attainable throughput, and `lost_time` is the
+    latency (ms) above the roofline's minimum latency. Layers with an
+    efficiency below `threshold` are flagged in column `below_roofline`.
+    """
+    device = device or device_roofline(plan.device_properties)
+    layers = plan.df[plan.df["type"].isin(layer_types)]
+    flops = layers_flops(layers)
+    bytes_moved = layers["total_footprint_bytes"].to_numpy(dtype=float)
+    latency_s = layers["latency.avg_time"].to_numpy(dtype=float) / 1000.
+    precisions = [_compute_precision(p, t) for p, t in zip(layers["precision"], layers["tactic"])]
+    peak = np.array([device.peak_flops.get(p, np.nan) for p in precisions], dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        intensity = flops / bytes_moved
+        memory_bound_flops = intensity * device.memory_bandwidth
+        # Without a peak throughput for the precision, the layer cannot be
+        # placed on the roofline (np.minimum propagates the NaN).
+        attainable = np.minimum(peak, memory_bound_flops)
+        achieved = np.where(latency_s > 0, flops / latency_s, np.nan)
+        efficiency = achieved / attainable
+        min_latency = 1000. * flops / attainable
+
+    df = pd.DataFrame({
+        "Name": layers["Name"].to_numpy(),
+        "type": layers["type"].to_numpy(),
+        "precision": precisions,
+        "latency.avg_time": 1000. * latency_s,
+        "flops": flops,
+        "bytes": bytes_moved,
+        "arithmetic_intensity": intensity,
+        "achieved_flops": achieved,
+        "achieved_bandwidth": np.where(latency_s > 0, bytes_moved / latency_s, np.nan),
+        "attainable_flops": attainable,
+        "bound": np.where(np.isnan(attainable), "unknown", np.where(memory_bound_flops < peak, "memory", "compute")),
+        "efficiency": efficiency,
+        "min_latency": min_latency,
+        "lost_time": 1000. * latency_s - min_latency,
+        "below_roofline": efficiency < threshold,
+    }, index=layers.index)
+    return df
@@ -0,0 +1,108 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains code to analyze the tactics timed by the TensorRT builder.
+
+The tactic timings are extracted from a verbose trtexec build log with
+`parseTrtexecLog.parse_tactic_timings` (and optionally stored as JSON).
+"""
+
+import json
+from typing import Dict, List, Union
+import pandas as pd
+from .engine_plan import EnginePlan
+
+# Tactics that failed to run are timed as FLT_MAX.
+_FAILED_TACTIC_TIME = 1e38
+
+def normalize_tactic_id(tactic: str) -> str:
+    """Return a tactic id (hexadecimal or decimal, possibly negative) as a
+    zero-padded 64-bit hexadecimal string."""
+    try:
+        value = int(tactic, 16) if tactic.lower().startswith("0x") else int(tactic)
+    except (AttributeError, ValueError):
+        return None
+    return f"0x{value & 0xFFFFFFFFFFFFFFFF:016x}"
+
+def tactic_timings_df(timings: Union[Dict[str, List], str], plan: EnginePlan = None) -> pd.DataFrame:
+    """Create a dataframe of tactic timings.
+
+    `timings` is the dictionary returned by `parse_tactic_timings`, or the name
+    of a JSON file which stores it. Each tactic is ranked among the valid
+    tactics timed for its layer. If a plan is provided, the tactics selected
+    for the engine are flagged.
+    """
+    if isinstance(timings, str):
+        with open(timings) as f:
+            timings = json.load(f)
+    df = pd.DataFrame(timings)
+    if df.empty:
+        return df
+    df["tactic_id"] = [normalize_tactic_id(t) for t in df["tactic"]]
+    df["valid"] = df["time"] < _FAILED_TACTIC_TIME
+    valid_time = df["time"].where(df["valid"])
+    df["rank"] = valid_time.groupby(df["layer"]).rank(method="min")
+    df["slowdown"] = valid_time / valid_time.groupby(df["layer"]).transform("min")
+    if plan is not None:
+        flag_selected_tactics(df, plan)
+    return df
+
+def flag_selected_tactics(timings: pd.DataFrame, plan: EnginePlan):
+    """Flag the tactic timings of the tactics selected for the engine (in-place).
+
+    Plans without tactic ids (no TacticValue column) have no selected tactics.
+    """
+    if "TacticValue" not in plan.df.columns:
+        timings["selected"] = False
+        return
+    engine_tactics = set(zip(plan.df["Name"], [normalize_tactic_id(t) for t in plan.df["TacticValue"]]))
+    timings["selected"] = [key in engine_tactics for key in zip(timings["layer"], timings["tactic_id"])]
+
+def join_tactic_timings(plan: EnginePlan, timings: Union[pd.DataFrame, Dict[str, List], str]) -> pd.DataFrame:
+    """Summarize the tactic timings of each layer and join them onto the plan's
+    dataframe.
+
+    The summary of each layer includes the number of tactics timed, the total
+    measured time, the fastest and runner-up tactic times, and the time of the
+    tactic selected for the engine. Layers which were not timed (e.g. because
+    their timing was cached) have NaN summary values.
+    """
+    if not isinstance(timings, pd.DataFrame):
+        timings = tactic_timings_df(timings, plan)
+    elif not timings.empty and "selected" not in timings.columns:
+        timings = timings.copy()
+        flag_selected_tactics(timings, plan)
+    cols = ["Name", "type", "tactic", "TacticValue", "latency.avg_time"]
+    df = plan.df[[col for col in cols if col in plan.df.columns]]
+    if timings.empty:
+        return df
+
+    valid = timings[timings["valid"]]
+    by_layer = valid.groupby("layer")["time"]
+    # The second-fastest distinct time of each layer.
+    distinct = valid[["layer", "time"]].drop_duplicates().sort_values(["layer", "time"], kind="mergesort")
+    runner_up = distinct[distinct.groupby("layer").cumcount() == 1].set_index("layer")["time"]
+
+    summary = pd.DataFrame({
+        "timing.tactics": timings.groupby("layer").size(),
+        "timing.total_time": by_layer.sum(),
+        "timing.best_time": by_layer.min(),
+        "timing.runner_up_time": runner_up,
+        "timing.selected_time": valid[valid["selected"]].groupby("layer")["time"].min(),
+    })
+    summary["timing.runner_up_gap"] = summary["timing.runner_up_time"] / summary["timing.best_time"] - 1
+    return df.merge(summary, how="left", left_on="Name", right_index=True)
@@ -0,0 +1,317 @@
+#
+# SPDX-FileCopyrightText: Copyright (c) 1993-2022 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+This file contains statistics of the latency distribution of an engine.
+
+The latencies are read from the per-inference timing records exported by
+trtexec (--exportTimes). Tail latencies are reported with bootstrap
+confidence intervals, after discarding the warm-up samples.
+"""
+
+import math
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from .parser import read_timing_records
+
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+# Samples slower than Q3 + OUTLIER_THRESHOLD * IQR are outliers.
+OUTLIER_THRESHOLD = 3.
+# Relative latency increase over the run which is reported as throttling.
+THROTTLING_THRESHOLD = 0.05
+
+Timings = Union[str, pd.DataFrame, Sequence[float]]
+
+class TimingStats(NamedTuple):
+    """The latency statistics of a timing run (latencies in ms).
+
+    `percentiles` has one row per percentile, with its bootstrap confidence
+    interval, and `outliers` one row per cluster of outlier samples.
+    """
+    samples: int
+    warmup_samples: int
+    percentiles: pd.DataFrame
+    summary: Dict
+    outliers: pd.DataFrame
+    trend: Dict
+
+class TimingsComparison(NamedTuple):
+    """The statistical comparison of two timing runs.
+
+    `table` reports the difference (candidate - baseline) of each statistic
+    with its bootstrap confidence interval. `p_value` is the p-value of a
+    Mann-Whitney U test and `prob_slower` the probability that a candidate
+    sample is slower than a baseline sample.
+    """
+    table: pd.DataFrame
+    p_value: float
+    prob_slower: float
+
+def percentile_label(q: float) -> str:
+    return f"p{q:g}"
+
+def read_latencies(timings: Timings, metric: str = "latencyMs") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return the latencies (ms) and the start times (seconds) of the samples.
+
+    `timings` is a timing JSON file, a dataframe of timing records, or a
+    sequence of latencies (which have no start times).
+    """
+    if isinstance(timings, str):
+        timings = pd.DataFrame(read_timing_records(timings))
+    if not isinstance(timings, pd.DataFrame):
+        return np.asarray(timings, dtype=float), None
+    latencies = timings[metric].to_numpy(dtype=float)
+    for col in ("startEnqMs", "startComputeMs"):
+        if col in timings.columns and len(timings):
+            start = timings[col].to_numpy(dtype=float)
+            return latencies, (start - start[0]) / 1000.
+    return latencies, None
+
+def detect_warmup(latencies: np.ndarray, batch_size: int = 5) -> int:
+    """Return the number of warm-up samples (MSER-5 truncation rule).
+
+    The samples are averaged in batches, and the truncation point is the one
+    which minimizes the standard error of the mean of the remaining batches.
+    At most half the samples are truncated. Outliers are clipped first, so
+    that a late latency spike is not mistaken for the end of the warm-up.
+    """
+    nb_batches = len(latencies) // batch_size
+    if nb_batches < 4:
+        return 0
+    clipped = np.minimum(latencies, outlier_fence(latencies[len(latencies) // 2:]))
+    means = clipped[:nb_batches * batch_size].reshape(nb_batches, batch_size).mean(axis=1)
+    # Sums over the batches [d:], for every truncation point d.
+    sums = np.cumsum(means[::-1])[::-1]
+    sums_sq = np.cumsum((means**2)[::-1])[::-1]
+    remaining = np.arange(nb_batches, 0, -1)
+    mser = (sums_sq - sums**2 / remaining) / remaining**2
+    return int(np.argmin(mser[:nb_batches // 2 + 1])) * batch_size
+
+def outlier_fence(latencies: np.ndarray, threshold: float = OUTLIER_THRESHOLD) -> float:
+    """Return the latency above which a sample is a (slow) outlier.
+
+    The fence is Q3 + threshold * IQR. If most samples have the same latency
+    (IQR of zero), the standard deviation is used instead of the IQR.
+    """
+    q1, q3 = np.percentile(latencies, [25, 75])
+    spread = (q3 - q1) or np.std(latencies)
+    return q3 + threshold * spread
+
+def outlier_clusters(latencies: np.ndarray, times: np.ndarray = None, threshold: float = OUTLIER_THRESHOLD, max_gap: int = 5) -> pd.DataFrame:
+    """Group the slow outlier samples into clusters.
+
+    Outliers which are at most `max_gap` samples apart belong to the same
+    cluster. Recurring clusters usually point to interference (e.g. other
+    processes, clock changes) rather than to the engine itself.
+    """
+    columns = ["first_sample", "last_sample", "start_time", "end_time", "samples", "max_latency", "mean_latency"]
+    outliers = np.flatnonzero(latencies > outlier_fence(latencies, threshold))
+    if len(outliers) == 0:
+        return pd.DataFrame(columns=columns)
+    cluster_ids = np.concatenate(([0], np.cumsum(np.diff(outliers) > max_gap)))
+    df = pd.DataFrame({"sample": outliers, "cluster": cluster_ids, "latency": latencies[outliers]})
+    grouped = df.groupby("cluster")
+    clusters = pd.DataFrame({
+        "first_sample": grouped["sample"].min(),
+        "last_sample": grouped["sample"].max(),
+        "samples": grouped.size(),
+        "max_latency": grouped["latency"].max(),
+        "mean_latency": grouped["latency"].mean(),
+    })
+    if times is not None:
+        clusters["start_time"] = times[clusters["first_sample"].to_numpy()]
+        clusters["end_time"] = times[clusters["last_sample"].to_numpy()]
+    else:
+        clusters["start_time"] = np.nan
+        clusters["end_time"] = np.nan
+    return clusters[columns].reset_index(drop=True)
+
+def _spearman(x: np.ndarray, y: np.ndarray) -> float:
+    rx, ry = pd.Series(x).rank().to_numpy(), pd.Series(y).rank().to_numpy()
+    if np.std(rx) == 0 or np.std(ry) == 0:
+        return 0.
+    return float(np.corrcoef(rx, ry)[0, 1])
+
+def latency_trend(latencies: np.ndarray, times: np.ndarray = None, threshold: float = THROTTLING_THRESHOLD) -> Dict:
+    """Detect a latency drift or a level shift over the run.
+
+    The drift is the latency change over the run according to a linear fit,
+    relative to the median. The level shift is the largest change of the
+    median latency at a single change point (found with a CUSUM). A
+    sustained increase larger than `threshold` (relative) is reported as
+    throttling.
+    """
+    n = len(latencies)
+    x = times if times is not None else np.arange(n, dtype=float)
+    median = float(np.median(latencies)) if n else np.nan
+    trend = {"slope": np.nan, "drift_pct": np.nan, "spearman_rho": np.nan, "change_point": None, "median_before": np.nan, "median_after": np.nan, "shift_pct": np.nan, "throttling": False}
+    if n < 10 or x[-1] == x[0]:
+        return trend
+    slope = float(np.polyfit(x, latencies, 1)[0])
+    trend.update(slope=slope, drift_pct=100. * slope * (x[-1] - x[0]) / median, spearman_rho=_spearman(x, latencies))
+
+    # Only consider change points which leave 10% of the samples on each side.
+    cusum = np.cumsum(latencies - latencies.mean())
+    margin = max(1, n // 10)
+    change_point = margin + int(np.argmax(np.abs(cusum[margin - 1:n - margin])))
+    before, after = np.median(latencies[:change_point]), np.median(latencies[change_point:])
+    trend.update(change_point=change_point, median_before=float(before), median_after=float(after), shift_pct=100. * (after / before - 1))
+
+    drifting = trend["drift_pct"] > 100. * threshold and trend["spearman_rho"] > 0.3
+    trend["throttling"] = bool(drifting or trend["shift_pct"] > 100. * threshold)
+    return trend
+
+def _bootstrap(latencies: np.ndarray, stats: Sequence, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """Return the statistics (percentiles, or "mean") of `n_resamples`
+    resamples of the latencies, as an array of shape (n_resamples, len(stats))."""
+    n = len(latencies)
+    percentiles = [q for q in stats if q != "mean"]
+    results = np.empty((n_resamples, len(stats)))
+    # Resample in chunks to bound the memory usage.
+    chunk = max(1, (1 << 22) // max(n, 1))
+    for start in range(0, n_resamples, chunk):
+        stop = min(start + chunk, n_resamples)
+        samples = latencies[rng.integers(0, n, size=(stop - start, n))]
+        values = iter(np.percentile(samples, percentiles, axis=1)) if percentiles else iter(())
+        for i, stat in enumerate(stats):
+            results[start:stop, i] = samples.mean(axis=1) if stat == "mean" else next(values)
+    return results
+
+def _statistics(latencies: np.ndarray, stats: Sequence) -> np.ndarray:
+    percentiles = iter(np.percentile(latencies, [q for q in stats if q != "mean"]))
+    return np.array([latencies.mean() if stat == "mean" else next(percentiles) for stat in stats])
+
+def bootstrap_percentiles(
+    latencies: np.ndarray,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    confidence: float = 0.95,
+    n_resamples: int = 1000,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Return the percentiles of the latencies with their bootstrap
+    confidence intervals.
+
+    Extreme percentiles (e.g. p99.9) need many samples: with fewer than
+    ~10/(1-q) samples their intervals are not reliable.
+    """
+    stats = list(percentiles) + ["mean"]
+    resampled = _bootstrap(latencies, stats, n_resamples, np.random.default_rng(seed))
+    alpha = 100. * (1 - confidence) / 2
+    low, high = np.percentile(resampled, [alpha, 100 - alpha], axis=0)
+    index = [percentile_label(q) for q in percentiles] + ["mean"]
+    return pd.DataFrame({"latency": _statistics(latencies, stats), "ci_low": low, "ci_high": high}, index=index)
+
+def timing_stats(
+    timings: Timings,
+    metric: str = "latencyMs",
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    drop_warmup: bool = True,
+    confidence: float = 0.95,
+    n_resamples: int = 1000,
+    seed: int = 0,
+) -> TimingStats:
+    """Compute the statistics of the latency distribution of a timing run.
+
+    If `drop_warmup` is True, the warm-up samples are excluded from all the
+    statistics.
+    """
+    latencies, times = read_latencies(timings, metric)
+    warmup = detect_warmup(latencies) if drop_warmup else 0
+    latencies = latencies[warmup:]
+    times = times[warmup:] if times is not None else None
+    if len(latencies) == 0:
+        raise ValueError("No timing samples")
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    q1, q3 = np.percentile(latencies, [25, 75])
+    summary = {
+        "mean": float(latencies.mean()),
+        "std": float(latencies.std()),
+        "min": float(latencies.min()),
+        "max": float(latencies.max()),
+        "cv": float(latencies.std() / latencies.mean()),
+        "iqr": float(q3 - q1),
+        "tail_ratio": float(p99 / p50),
+        # Mean absolute difference between consecutive samples.
+        "jitter": float(np.abs(np.diff(latencies)).mean()) if len(latencies) > 1 else 0.,
+    }
+    outliers = outlier_clusters(latencies, times)
+    # Number the samples from the start of the run.
+    outliers[["first_sample", "last_sample"]] += warmup
+    return TimingStats(
+        len(latencies),
+        warmup,
+        bootstrap_percentiles(latencies, percentiles, confidence, n_resamples, seed),
+        summary,
+        outliers,
+        latency_trend(latencies, times),
+    )
+
+def mann_whitney_u(a: np.ndarray, b: np.ndarray) -> Tuple[float, float]:
+    """Return the U statistic of `b` and the two-sided p-value (normal
+    approximation with tie correction) of a Mann-Whitney U test"""
+    n1, n2 = len(a), len(b)
+    ranks = pd.Series(np.concatenate((a, b))).rank().to_numpy()
+    u = ranks[n1:].sum() - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    ties = pd.Series(ranks).value_counts().to_numpy(dtype=float)
+    sigma = math.sqrt(n1 * n2 / 12. * ((n + 1) - (ties**3 - ties).sum() / (n * (n - 1))))
+    if sigma == 0:
+        return u, 1.
+    z = (u - n1 * n2 / 2.) / sigma
+    return u, math.erfc(abs(z) / math.sqrt(2))
+
+def compare_timings(
+    baseline: Timings,
+    candidate: Timings,
+    metric: str = "latencyMs",
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    drop_warmup: bool = True,
+    confidence: float = 0.95,
+    n_resamples: int = 1000,
+    seed: int = 0,
+) -> TimingsComparison:
+    """Compare the latency distributions of two timing runs.
+
+    The confidence interval of the difference of each statistic is computed
+    by resampling both runs independently. A difference is significant if
+    its interval excludes zero.
+    """
+    runs = []
+    for timings in (baseline, candidate):
+        latencies, _ = read_latencies(timings, metric)
+        warmup = detect_warmup(latencies) if drop_warmup else 0
+        runs.append(latencies[warmup:])
+    a, b = runs
+
+    stats = list(percentiles) + ["mean"]
+    rng = np.random.default_rng(seed)
+    deltas = _bootstrap(b, stats, n_resamples, rng) - _bootstrap(a, stats, n_resamples, rng)
+    alpha = 100. * (1 - confidence) / 2
+    low, high = np.percentile(deltas, [alpha, 100 - alpha], axis=0)
+    a_stats, b_stats = _statistics(a, stats), _statistics(b, stats)
+    table = pd.DataFrame({
+        "baseline": a_stats,
+        "candidate": b_stats,
+        "delta": b_stats - a_stats,
+        "delta_pct": 100. * (b_stats / a_stats - 1),
+        "ci_low": low,
+        "ci_high": high,
+        "significant": (low > 0) | (high < 0),
+    }, index=[percentile_label(q) for q in percentiles] + ["mean"])
+    u, p_value = mann_whitney_u(a, b)
+    return TimingsComparison(table, p_value, u / (len(a) * len(b)))